@@ -24,4 +24,13 @@ CREATE TABLE IF NOT EXISTS tags (
     timestamp INTEGER NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
     PRIMARY KEY (user_id, movie_id)
+);
+
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    table_name VARCHAR(255) NOT NULL,
+    watermark INTEGER NOT NULL,
+    pending_watermark INTEGER,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (table_name)
 );
\ No newline at end of file
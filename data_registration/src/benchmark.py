@@ -0,0 +1,117 @@
+import time
+from typing import Dict, List, Optional
+
+import click
+
+from src.infrastructure.database.db_client import PostgreSQLClient
+from src.infrastructure.repository.movies_repository import MoviesRepository
+from src.infrastructure.repository.ratings_repository import RatingsRepository
+from src.infrastructure.repository.tables_repository import TablesRepository
+from src.infrastructure.repository.tags_repository import TagsRepository
+from src.infrastructure.schema.tables_schema import TABLES
+from src.middleware.logger import configure_logger
+from src.usecase.data_register_usecase import INSERT_MODE, DataRegisterUsecase
+
+logger = configure_logger(__name__)
+
+
+@click.command()
+@click.option(
+    "--tables_filepath",
+    type=str,
+    required=True,
+)
+@click.option(
+    "--movies_filepath",
+    type=str,
+    required=True,
+)
+@click.option(
+    "--ratings_filepath",
+    type=str,
+    required=True,
+)
+@click.option(
+    "--tags_filepath",
+    type=str,
+    required=True,
+)
+@click.option(
+    "--insert_modes",
+    type=click.Choice(INSERT_MODE.get_list()),
+    multiple=True,
+    default=INSERT_MODE.get_list(),
+    required=False,
+)
+def main(
+    tables_filepath: str,
+    movies_filepath: str,
+    ratings_filepath: str,
+    tags_filepath: str,
+    insert_modes: Optional[List[str]] = None,
+):
+    """Compare throughput of insert modes.
+
+    Every mode starts from truncated tables, so this must not be run against
+    a database whose data you want to keep.
+    """
+    if insert_modes is None:
+        insert_modes = INSERT_MODE.get_list()
+
+    logger.info("START benchmark")
+    db_client = PostgreSQLClient()
+    tables_repository = TablesRepository(db_client=db_client)
+    movies_repository = MoviesRepository(db_client=db_client)
+    ratings_repository = RatingsRepository(db_client=db_client)
+    tags_repository = TagsRepository(db_client=db_client)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for insert_mode in insert_modes:
+        data_register_usecase = DataRegisterUsecase(
+            tables_filepath=tables_filepath,
+            movies_filepath=movies_filepath,
+            ratings_filepath=ratings_filepath,
+            tags_filepath=tags_filepath,
+            tables_repository=tables_repository,
+            movies_repository=movies_repository,
+            ratings_repository=ratings_repository,
+            tags_repository=tags_repository,
+            insert_mode=insert_mode,
+        )
+        data_register_usecase.create_tables()
+        data_register_usecase.truncate_tables(
+            table_names=[t.value for t in TABLES],
+        )
+
+        registers = {
+            TABLES.MOVIES.value: data_register_usecase.register_movies,
+            TABLES.RATINGS.value: data_register_usecase.register_ratings,
+            TABLES.TAGS.value: data_register_usecase.register_tags,
+        }
+        for table_name, register in registers.items():
+            start = time.perf_counter()
+            rows = register().rows
+            elapsed = time.perf_counter() - start
+            results[f"{insert_mode}.{table_name}"] = {
+                "rows": rows,
+                "seconds": elapsed,
+                "rows_per_second": rows / max(elapsed, 1e-9),
+            }
+
+    summary = "\n".join(
+        [f"{'mode.table':<20}{'rows':>12}{'seconds':>12}{'rows/sec':>14}"]
+        + [
+            f"{k:<20}{v['rows']:>12.0f}{v['seconds']:>12.2f}{v['rows_per_second']:>14.0f}"
+            for k, v in results.items()
+        ]
+    )
+    logger.info(
+        f"""benchmark results:
+{summary}
+    """
+    )
+    logger.info("DONE benchmark")
+
+
+if __name__ == "__main__":
+    main()
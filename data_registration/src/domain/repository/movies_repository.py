@@ -1,8 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List
 
 from src.infrastructure.database.db_client import AbstractDBClient
-from src.infrastructure.schema.movies_schema import Movies
+from src.infrastructure.schema.columnar_schema import ColumnarBatch
 
 
 class AbstractMoviesRepository(ABC):
@@ -15,7 +14,31 @@ class AbstractMoviesRepository(ABC):
     @abstractmethod
     def bulk_insert(
         self,
-        records: List[Movies],
-    ):
+        batch: ColumnarBatch,
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def bulk_copy(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
         raise NotImplementedError
 
+    @abstractmethod
+    def bulk_append(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def bulk_upsert(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self) -> int:
+        raise NotImplementedError
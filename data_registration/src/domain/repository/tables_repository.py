@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 from src.infrastructure.database.db_client import AbstractDBClient
 
@@ -17,3 +18,71 @@ class AbstractTablesRepository(ABC):
     ):
         raise NotImplementedError
 
+    @abstractmethod
+    def truncate_tables(
+        self,
+        table_names: List[str],
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_unlogged(
+        self,
+        table_name: str,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_logged(
+        self,
+        table_name: str,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def drop_primary_key(
+        self,
+        table_name: str,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_column(
+        self,
+        table_name: str,
+        column: str,
+        data_type: str,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def drop_column(
+        self,
+        table_name: str,
+        column: str,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_duplicates(
+        self,
+        table_name: str,
+        primary_keys: List[str],
+        order_column: str,
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_primary_key(
+        self,
+        table_name: str,
+        primary_keys: List[str],
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def analyze(
+        self,
+        table_name: str,
+    ):
+        raise NotImplementedError
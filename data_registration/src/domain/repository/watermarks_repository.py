@@ -0,0 +1,33 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from src.infrastructure.database.db_client import AbstractDBClient
+
+
+class AbstractWatermarksRepository(ABC):
+    def __init__(
+        self,
+        db_client: AbstractDBClient,
+    ):
+        self.db_client = db_client
+
+    @abstractmethod
+    def select_watermark(
+        self,
+        table_name: str,
+    ) -> Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def reset_pending_watermark(
+        self,
+        table_name: str,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def commit_pending_watermark(
+        self,
+        table_name: str,
+    ):
+        raise NotImplementedError
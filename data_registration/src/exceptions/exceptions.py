@@ -1,5 +1,7 @@
 class BaseException(Exception):
     def __init__(self, message: str, detail: str):
+        # args are pickled, so exceptions raised in worker processes are rebuilt
+        super().__init__(message, detail)
         self.message = message
         self.detail = detail
 
@@ -11,3 +13,12 @@ class DatabaseException(BaseException):
 
     def __str__(self):
         return self.__message
+
+
+class ValidationException(BaseException):
+    def __init__(self, message: str, detail: str):
+        super().__init__(message=message, detail=detail)
+        self.__message = f"validation exception: {self.message}"
+
+    def __str__(self):
+        return self.__message
@@ -1,6 +1,10 @@
+import csv
 import os
+import re
+import sqlite3
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
 
 import psycopg2
 from psycopg2 import extras
@@ -11,6 +15,9 @@ from src.middleware.logger import configure_logger
 
 logger = configure_logger(__name__)
 
+# rows per statement of execute_values, its default
+PAGE_SIZE = 100
+
 
 class AbstractDBClient(ABC):
     def __init__(self):
@@ -25,7 +32,7 @@ class AbstractDBClient(ABC):
         self,
         query: str,
         parameters: Optional[Tuple] = None,
-    ):
+    ) -> int:
         raise NotImplementedError
 
     @abstractmethod
@@ -33,7 +40,17 @@ class AbstractDBClient(ABC):
         self,
         query: str,
         parameters: Optional[List[Tuple]] = None,
-    ):
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def execute_copy_query(
+        self,
+        query: str,
+        data: IO[str],
+        setup_query: Optional[str] = None,
+        merge_query: Optional[str] = None,
+    ) -> int:
         raise NotImplementedError
 
     @abstractmethod
@@ -61,13 +78,15 @@ class PostgreSQLClient(AbstractDBClient):
         self,
         query: str,
         parameters: Optional[Tuple] = None,
-    ):
+    ) -> int:
         logger.debug(f"create query: {query}, parameters: {parameters}")
         with self.get_connection() as conn:
             try:
                 with conn.cursor(cursor_factory=DictCursor) as cursor:
                     cursor.execute(query, parameters)
+                    rows = max(cursor.rowcount, 0)
                 conn.commit()
+                return rows
             except psycopg2.Error as e:
                 conn.rollback()
                 raise DatabaseException(
@@ -79,14 +98,24 @@ class PostgreSQLClient(AbstractDBClient):
         self,
         query: str,
         parameters: Optional[List[Tuple]] = None,
-    ) -> bool:
+    ) -> int:
         logger.debug(f"bulk insert or update query: {query}, parameters: {parameters}")
+        parameters = parameters or []
         with self.get_connection() as conn:
             try:
+                rows = 0
                 with conn.cursor(cursor_factory=DictCursor) as cursor:
-                    extras.execute_values(cursor, query, parameters)
+                    # execute_values keeps only the rowcount of its last page
+                    for start in range(0, len(parameters), PAGE_SIZE):
+                        extras.execute_values(
+                            cursor,
+                            query,
+                            parameters[start : start + PAGE_SIZE],
+                            page_size=PAGE_SIZE,
+                        )
+                        rows += max(cursor.rowcount, 0)
                 conn.commit()
-                return True
+                return rows
             except psycopg2.Error as e:
                 conn.rollback()
                 raise DatabaseException(
@@ -94,6 +123,35 @@ class PostgreSQLClient(AbstractDBClient):
                     detail=f"{query} {parameters}: {e}",
                 )
 
+    def execute_copy_query(
+        self,
+        query: str,
+        data: IO[str],
+        setup_query: Optional[str] = None,
+        merge_query: Optional[str] = None,
+    ) -> int:
+        logger.debug(
+            f"copy query: {query}, setup query: {setup_query}, merge query: {merge_query}"
+        )
+        with self.get_connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    if setup_query is not None:
+                        cursor.execute(setup_query)
+                    cursor.copy_expert(query, data)
+                    if merge_query is not None:
+                        cursor.execute(merge_query)
+                    # rows of the last statement run
+                    rows = max(cursor.rowcount, 0)
+                conn.commit()
+                return rows
+            except psycopg2.Error as e:
+                conn.rollback()
+                raise DatabaseException(
+                    message=f"failed to copy query: {e}",
+                    detail=f"{setup_query} {query} {merge_query}: {e}",
+                )
+
     def execute_select(
         self,
         query: str,
@@ -107,3 +165,134 @@ class PostgreSQLClient(AbstractDBClient):
                 rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
         logger.debug(f"rows: {rows}")
         return rows
+
+
+class SQLiteClient(AbstractDBClient):
+    COPY_PATTERN = re.compile(
+        r"^\s*COPY\s+(\w+)\s*\(([^)]*)\)\s+FROM\s+STDIN\s+WITH\s+\(FORMAT csv\)\s*$",
+        re.IGNORECASE,
+    )
+
+    def __init__(
+        self,
+        database_path: Optional[str] = None,
+    ):
+        self.database_path = (
+            database_path
+            if database_path is not None
+            else os.getenv("SQLITE_DATABASE_PATH", "movielens.sqlite3")
+        )
+        self.timeout = float(os.getenv("SQLITE_TIMEOUT", 60))
+
+    @contextmanager
+    def get_connection(self) -> Iterator[sqlite3.Connection]:
+        # sqlite3 connections do not close on exit of their context
+        conn = sqlite3.connect(self.database_path, timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def to_sqlite_query(self, query: str) -> str:
+        return query.replace("%s", "?")
+
+    def execute_create_query(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+    ) -> int:
+        logger.debug(f"create query: {query}, parameters: {parameters}")
+        with self.get_connection() as conn:
+            try:
+                changes = conn.total_changes
+                if parameters is None:
+                    # files such as tables.sql hold several statements
+                    conn.executescript(query)
+                else:
+                    conn.execute(self.to_sqlite_query(query), parameters)
+                conn.commit()
+                return conn.total_changes - changes
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException(
+                    message=f"failed to insert or update query: {e}",
+                    detail=f"{query} {parameters}: {e}",
+                )
+
+    def execute_bulk_insert_or_update_query(
+        self,
+        query: str,
+        parameters: Optional[List[Tuple]] = None,
+    ) -> int:
+        logger.debug(
+            f"bulk insert or update query: {query}, "
+            f"parameters: {len(parameters or [])} rows"
+        )
+        parameters = parameters or []
+        if len(parameters) == 0:
+            return 0
+        # VALUES %s of execute_values becomes one placeholder row per parameter
+        placeholders = "(" + ",".join("?" * len(parameters[0])) + ")"
+        sqlite_query = self.to_sqlite_query(query.replace("%s", placeholders, 1))
+        with self.get_connection() as conn:
+            try:
+                cursor = conn.executemany(sqlite_query, parameters)
+                conn.commit()
+                return max(cursor.rowcount, 0)
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException(
+                    message=f"failed to bulk insert or update query: {e}",
+                    detail=f"{query} {len(parameters)} rows: {e}",
+                )
+
+    def execute_copy_query(
+        self,
+        query: str,
+        data: IO[str],
+        setup_query: Optional[str] = None,
+        merge_query: Optional[str] = None,
+    ) -> int:
+        logger.debug(
+            f"copy query: {query}, setup query: {setup_query}, merge query: {merge_query}"
+        )
+        match = self.COPY_PATTERN.match(query)
+        if setup_query is not None or merge_query is not None or match is None:
+            raise DatabaseException(
+                message="sqlite supports only COPY FROM STDIN into a table",
+                detail=f"{setup_query} {query} {merge_query}",
+            )
+        # csv fields are text, column affinity converts them as COPY would
+        table_name, columns = match.group(1), match.group(2)
+        placeholders = ",".join("?" * len(columns.split(",")))
+        insert_query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        with self.get_connection() as conn:
+            try:
+                cursor = conn.executemany(insert_query, csv.reader(data))
+                conn.commit()
+                return max(cursor.rowcount, 0)
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException(
+                    message=f"failed to copy query: {e}",
+                    detail=f"{query}: {e}",
+                )
+
+    def execute_select(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+    ) -> List[Dict[str, Any]]:
+        logger.debug(f"select query: {query}, parameters: {parameters}")
+        with self.get_connection() as conn:
+            try:
+                cursor = conn.execute(self.to_sqlite_query(query), parameters or ())
+                columns = [desc[0] for desc in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            except sqlite3.Error as e:
+                raise DatabaseException(
+                    message=f"failed to select query: {e}",
+                    detail=f"{query} {parameters}: {e}",
+                )
+        logger.debug(f"rows: {rows}")
+        return rows
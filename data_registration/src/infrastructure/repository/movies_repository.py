@@ -1,9 +1,8 @@
-from typing import List
-
 from src.domain.repository.movies_repository import AbstractMoviesRepository
 from src.infrastructure.database.db_client import AbstractDBClient
-from src.infrastructure.schema.movies_schema import Movies
+from src.infrastructure.schema.columnar_schema import ColumnarBatch
 from src.infrastructure.schema.tables_schema import TABLES
+from src.middleware.file_writer import write_csv_to_buffer
 
 
 class MoviesRepository(AbstractMoviesRepository):
@@ -16,11 +15,9 @@ class MoviesRepository(AbstractMoviesRepository):
 
     def bulk_insert(
         self,
-        records: List[Movies],
-    ):
-        data = records[0].model_dump()
-        _columns = list(data.keys())
-        columns = ",".join(_columns)
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
         query = f"""
         INSERT INTO
             {self.table_name}
@@ -33,11 +30,143 @@ class MoviesRepository(AbstractMoviesRepository):
         ;
         """
 
-        parameters = []
-        for d in records:
-            values = tuple(d.model_dump().values())
-            parameters.append(values)
-        self.db_client.execute_bulk_insert_or_update_query(
+        parameters = list(batch.rows())
+        return self.db_client.execute_bulk_insert_or_update_query(
             query=query,
             parameters=parameters,
         )
+
+    def bulk_copy(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
+        staging_table_name = f"{self.table_name}_staging"
+        setup_query = f"""
+        CREATE TEMPORARY TABLE
+            {staging_table_name}
+            (LIKE {self.table_name} INCLUDING DEFAULTS)
+        ON COMMIT DROP
+        ;
+        """
+        query = f"""
+        COPY
+            {staging_table_name}
+            ({columns})
+        FROM
+            STDIN
+        WITH
+            (FORMAT csv)
+        """
+        merge_query = f"""
+        INSERT INTO
+            {self.table_name}
+            ({columns})
+        SELECT
+            {columns}
+        FROM
+            {staging_table_name}
+        ON CONFLICT
+            (movie_id)
+        DO NOTHING
+        ;
+        """
+
+        buffer = write_csv_to_buffer(batch.rows())
+        return self.db_client.execute_copy_query(
+            query=query,
+            data=buffer,
+            setup_query=setup_query,
+            merge_query=merge_query,
+        )
+
+    def bulk_append(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
+        query = f"""
+        COPY
+            {self.table_name}
+            ({columns})
+        FROM
+            STDIN
+        WITH
+            (FORMAT csv)
+        """
+
+        buffer = write_csv_to_buffer(batch.rows())
+        self.db_client.execute_copy_query(
+            query=query,
+            data=buffer,
+        )
+        # every row is appended, as the table has no keys during a fast load
+        return len(batch)
+
+    def bulk_upsert(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
+        staging_table_name = f"{self.table_name}_staging"
+        setup_query = f"""
+        CREATE TEMPORARY TABLE
+            {staging_table_name}
+            (LIKE {self.table_name} INCLUDING DEFAULTS)
+        ON COMMIT DROP
+        ;
+        """
+        query = f"""
+        COPY
+            {staging_table_name}
+            ({columns})
+        FROM
+            STDIN
+        WITH
+            (FORMAT csv)
+        """
+        # DISTINCT ON: a single INSERT cannot update the same row twice
+        merge_query = f"""
+        INSERT INTO
+            {self.table_name}
+            ({columns})
+        SELECT DISTINCT ON
+            (movie_id)
+            {columns}
+        FROM
+            {staging_table_name}
+        ORDER BY
+            movie_id
+        ON CONFLICT
+            (movie_id)
+        DO UPDATE SET
+            title = EXCLUDED.title,
+            genre = EXCLUDED.genre,
+            created_at = CURRENT_TIMESTAMP
+        WHERE
+            ({self.table_name}.title, {self.table_name}.genre)
+            IS DISTINCT FROM
+            (EXCLUDED.title, EXCLUDED.genre)
+        ;
+        """
+
+        buffer = write_csv_to_buffer(batch.rows())
+        return self.db_client.execute_copy_query(
+            query=query,
+            data=buffer,
+            setup_query=setup_query,
+            merge_query=merge_query,
+        )
+
+    def count(self) -> int:
+        query = f"""
+        SELECT
+            COUNT(*) AS count
+        FROM
+            {self.table_name}
+        ;
+        """
+        records = self.db_client.execute_select(
+            query=query,
+        )
+        return records[0]["count"]
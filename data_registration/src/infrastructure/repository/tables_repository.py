@@ -1,3 +1,5 @@
+from typing import List
+
 from src.domain.repository.tables_repository import AbstractTablesRepository
 from src.infrastructure.database.db_client import AbstractDBClient
 
@@ -15,3 +17,142 @@ class TablesRepository(AbstractTablesRepository):
         query: str,
     ):
         self.db_client.execute_create_query(query=query)
+
+    def truncate_tables(
+        self,
+        table_names: List[str],
+    ):
+        tables = ",".join(table_names)
+        query = f"""
+        TRUNCATE TABLE
+            {tables}
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
+
+    def set_unlogged(
+        self,
+        table_name: str,
+    ):
+        query = f"""
+        ALTER TABLE
+            {table_name}
+        SET UNLOGGED
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
+
+    def set_logged(
+        self,
+        table_name: str,
+    ):
+        query = f"""
+        ALTER TABLE
+            {table_name}
+        SET LOGGED
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
+
+    def drop_primary_key(
+        self,
+        table_name: str,
+    ):
+        query = f"""
+        ALTER TABLE
+            {table_name}
+        DROP CONSTRAINT IF EXISTS
+            {table_name}_pkey
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
+
+    def add_column(
+        self,
+        table_name: str,
+        column: str,
+        data_type: str,
+    ):
+        query = f"""
+        ALTER TABLE
+            {table_name}
+        ADD COLUMN IF NOT EXISTS
+            {column} {data_type}
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
+
+    def drop_column(
+        self,
+        table_name: str,
+        column: str,
+    ):
+        query = f"""
+        ALTER TABLE
+            {table_name}
+        DROP COLUMN IF EXISTS
+            {column}
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
+
+    def delete_duplicates(
+        self,
+        table_name: str,
+        primary_keys: List[str],
+        order_column: str,
+    ) -> int:
+        keys = ",".join(primary_keys)
+        # keeps the first row of each key in order_column, as the other modes do;
+        # rows that were already in the table have no order and come first
+        query = f"""
+        DELETE FROM
+            {table_name}
+        WHERE
+            ctid IN (
+                SELECT
+                    ctid
+                FROM (
+                    SELECT
+                        ctid,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY {keys}
+                            ORDER BY {order_column} NULLS FIRST, ctid
+                        ) AS rn
+                    FROM
+                        {table_name}
+                ) AS numbered
+                WHERE
+                    rn > 1
+            )
+        ;
+        """
+        return self.db_client.execute_create_query(query=query)
+
+    def add_primary_key(
+        self,
+        table_name: str,
+        primary_keys: List[str],
+    ):
+        keys = ",".join(primary_keys)
+        query = f"""
+        ALTER TABLE
+            {table_name}
+        ADD CONSTRAINT
+            {table_name}_pkey
+        PRIMARY KEY
+            ({keys})
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
+
+    def analyze(
+        self,
+        table_name: str,
+    ):
+        query = f"""
+        ANALYZE
+            {table_name}
+        ;
+        """
+        self.db_client.execute_create_query(query=query)
@@ -1,10 +1,8 @@
-
-from typing import List
-
 from src.domain.repository.tags_repository import AbstractTagsRepository
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.schema.columnar_schema import ColumnarBatch
 from src.infrastructure.schema.tables_schema import TABLES
-from src.infrastructure.schema.tags_schema import Tags
+from src.middleware.file_writer import write_csv_to_buffer
 
 
 class TagsRepository(AbstractTagsRepository):
@@ -17,11 +15,9 @@ class TagsRepository(AbstractTagsRepository):
 
     def bulk_insert(
         self,
-        records: List[Tags],
-    ):
-        data = records[0].model_dump()
-        _columns = list(data.keys())
-        columns = ",".join(_columns)
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
         query = f"""
         INSERT INTO
             {self.table_name}
@@ -34,11 +30,167 @@ class TagsRepository(AbstractTagsRepository):
         ;
         """
 
-        parameters = []
-        for d in records:
-            values = tuple(d.model_dump().values())
-            parameters.append(values)
-        self.db_client.execute_bulk_insert_or_update_query(
+        parameters = list(batch.rows())
+        return self.db_client.execute_bulk_insert_or_update_query(
             query=query,
             parameters=parameters,
         )
+
+    def bulk_copy(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
+        staging_table_name = f"{self.table_name}_staging"
+        setup_query = f"""
+        CREATE TEMPORARY TABLE
+            {staging_table_name}
+            (LIKE {self.table_name} INCLUDING DEFAULTS)
+        ON COMMIT DROP
+        ;
+        """
+        query = f"""
+        COPY
+            {staging_table_name}
+            ({columns})
+        FROM
+            STDIN
+        WITH
+            (FORMAT csv)
+        """
+        merge_query = f"""
+        INSERT INTO
+            {self.table_name}
+            ({columns})
+        SELECT
+            {columns}
+        FROM
+            {staging_table_name}
+        ON CONFLICT
+            (user_id, movie_id)
+        DO NOTHING
+        ;
+        """
+
+        buffer = write_csv_to_buffer(batch.rows())
+        return self.db_client.execute_copy_query(
+            query=query,
+            data=buffer,
+            setup_query=setup_query,
+            merge_query=merge_query,
+        )
+
+    def bulk_append(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
+        query = f"""
+        COPY
+            {self.table_name}
+            ({columns})
+        FROM
+            STDIN
+        WITH
+            (FORMAT csv)
+        """
+
+        buffer = write_csv_to_buffer(batch.rows())
+        self.db_client.execute_copy_query(
+            query=query,
+            data=buffer,
+        )
+        # every row is appended, as the table has no keys during a fast load
+        return len(batch)
+
+    def bulk_upsert(
+        self,
+        batch: ColumnarBatch,
+    ) -> int:
+        columns = ",".join(batch.names)
+        staging_table_name = f"{self.table_name}_staging"
+        setup_query = f"""
+        CREATE TEMPORARY TABLE
+            {staging_table_name}
+            (LIKE {self.table_name} INCLUDING DEFAULTS)
+        ON COMMIT DROP
+        ;
+        """
+        query = f"""
+        COPY
+            {staging_table_name}
+            ({columns})
+        FROM
+            STDIN
+        WITH
+            (FORMAT csv)
+        """
+        # DISTINCT ON: a single INSERT cannot update the same row twice;
+        # the upsert runs last, so its rowcount is returned.
+        # unlike the other modes, which keep the first row of a key in the file,
+        # the row with the latest timestamp wins, and the greatest tag on a tie;
+        # the rule depends on values only, so batches and shards in any order
+        # give the same result
+        merge_query = f"""
+        INSERT INTO
+            {TABLES.WATERMARKS.value}
+            (table_name, watermark, pending_watermark)
+        SELECT
+            '{self.table_name}',
+            -1,
+            MAX(timestamp)
+        FROM
+            {staging_table_name}
+        HAVING
+            COUNT(*) > 0
+        ON CONFLICT
+            (table_name)
+        DO UPDATE SET
+            pending_watermark = GREATEST(
+                {TABLES.WATERMARKS.value}.pending_watermark,
+                EXCLUDED.pending_watermark
+            )
+        ;
+        INSERT INTO
+            {self.table_name}
+            ({columns})
+        SELECT DISTINCT ON
+            (user_id, movie_id)
+            {columns}
+        FROM
+            {staging_table_name}
+        ORDER BY
+            user_id, movie_id, timestamp DESC, tag DESC
+        ON CONFLICT
+            (user_id, movie_id)
+        DO UPDATE SET
+            tag = EXCLUDED.tag,
+            timestamp = EXCLUDED.timestamp,
+            created_at = CURRENT_TIMESTAMP
+        WHERE
+            (EXCLUDED.timestamp, EXCLUDED.tag)
+            >
+            ({self.table_name}.timestamp, {self.table_name}.tag)
+        ;
+        """
+
+        buffer = write_csv_to_buffer(batch.rows())
+        return self.db_client.execute_copy_query(
+            query=query,
+            data=buffer,
+            setup_query=setup_query,
+            merge_query=merge_query,
+        )
+
+    def count(self) -> int:
+        query = f"""
+        SELECT
+            COUNT(*) AS count
+        FROM
+            {self.table_name}
+        ;
+        """
+        records = self.db_client.execute_select(
+            query=query,
+        )
+        return records[0]["count"]
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from src.domain.repository.watermarks_repository import AbstractWatermarksRepository
+from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.schema.tables_schema import TABLES
+
+
+class WatermarksRepository(AbstractWatermarksRepository):
+    def __init__(
+        self,
+        db_client: AbstractDBClient,
+    ):
+        super().__init__(db_client=db_client)
+        self.table_name = TABLES.WATERMARKS.value
+
+    def select_watermark(
+        self,
+        table_name: str,
+    ) -> Optional[int]:
+        query = f"""
+        SELECT
+            watermark
+        FROM
+            {self.table_name}
+        WHERE
+            table_name = %s
+        ;
+        """
+        records = self.db_client.execute_select(
+            query=query,
+            parameters=(table_name,),
+        )
+        if len(records) == 0 or records[0]["watermark"] < 0:
+            return None
+        return int(records[0]["watermark"])
+
+    def reset_pending_watermark(
+        self,
+        table_name: str,
+    ):
+        query = f"""
+        UPDATE
+            {self.table_name}
+        SET
+            pending_watermark = NULL
+        WHERE
+            table_name = %s
+        ;
+        """
+        self.db_client.execute_create_query(
+            query=query,
+            parameters=(table_name,),
+        )
+
+    def commit_pending_watermark(
+        self,
+        table_name: str,
+    ):
+        # pending_watermark is raised by every merged batch, and only becomes
+        # the watermark once the whole file has been registered
+        query = f"""
+        UPDATE
+            {self.table_name}
+        SET
+            watermark = GREATEST(watermark, pending_watermark),
+            pending_watermark = NULL,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE
+            table_name = %s
+            AND pending_watermark IS NOT NULL
+        ;
+        """
+        self.db_client.execute_create_query(
+            query=query,
+            parameters=(table_name,),
+        )
@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+INTEGER_MAX = 2147483647
+
 
 class AbstractSchema(BaseModel):
     pass
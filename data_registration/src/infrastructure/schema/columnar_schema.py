@@ -0,0 +1,167 @@
+import itertools
+import math
+from array import array
+from dataclasses import dataclass
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    cast,
+)
+
+from annotated_types import Ge, Le, MaxLen
+from pydantic import ValidationError
+
+from src.exceptions.exceptions import ValidationException
+from src.infrastructure.schema.abstract_schema import AbstractSchema
+
+ARRAY_TYPECODES = {
+    int: "q",
+    float: "d",
+}
+MAX_REPORTED_ROWS = 10
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    dtype: type
+    ge: Optional[float] = None
+    le: Optional[float] = None
+    max_length: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ColumnarBatch:
+    columns: Mapping[str, Sequence]
+
+    def __len__(self) -> int:
+        for values in self.columns.values():
+            return len(values)
+        return 0
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns.keys())
+
+    def rows(self) -> Iterator[Tuple]:
+        return zip(*self.columns.values())
+
+    def filter(self, mask: Sequence[bool]) -> "ColumnarBatch":
+        return ColumnarBatch(
+            columns={
+                name: list(itertools.compress(values, mask))
+                for name, values in self.columns.items()
+            }
+        )
+
+
+class ColumnarSchema(object):
+    def __init__(
+        self,
+        model: Type[AbstractSchema],
+    ):
+        """Validate a chunk of rows column by column.
+
+        Columns, types and constraints are derived from the pydantic model,
+        which is only instantiated per row when a chunk fails validation,
+        to report which rows are bad.
+
+        Args:
+            model (Type[AbstractSchema]): pydantic model of a table row.
+        """
+        self.model = model
+        self.columns: List[Column] = []
+        for name, field in model.model_fields.items():
+            if field.annotation is None:
+                raise ValueError(f"{name} of {model.__name__} has no type")
+            ge: Optional[float] = None
+            le: Optional[float] = None
+            max_length: Optional[int] = None
+            for m in field.metadata:
+                if isinstance(m, Ge):
+                    ge = cast(float, m.ge)
+                elif isinstance(m, Le):
+                    le = cast(float, m.le)
+                elif isinstance(m, MaxLen):
+                    max_length = m.max_length
+            self.columns.append(
+                Column(
+                    name=name,
+                    dtype=field.annotation,
+                    ge=ge,
+                    le=le,
+                    max_length=max_length,
+                )
+            )
+
+    @property
+    def names(self) -> List[str]:
+        return [c.name for c in self.columns]
+
+    def validate(
+        self,
+        data: Dict[str, List],
+        start: int = 0,
+    ) -> ColumnarBatch:
+        try:
+            columns = {
+                c.name: self.validate_column(c, data[c.name]) for c in self.columns
+            }
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return self.validate_rows(data=data, start=start)
+        return ColumnarBatch(columns=columns)
+
+    def validate_column(
+        self,
+        column: Column,
+        values: List,
+    ) -> Sequence:
+        typecode = ARRAY_TYPECODES.get(column.dtype)
+        if typecode is not None:
+            converted: Sequence = array(typecode, map(column.dtype, values))
+            # NaN is neither less nor greater than a bound, so min and max miss it
+            if column.dtype is float and any(map(math.isnan, converted)):
+                raise ValueError(f"{column.name} has NaN values")
+            if len(converted) > 0:
+                if column.ge is not None and min(converted) < column.ge:
+                    raise ValueError(f"{column.name} less than {column.ge}")
+                if column.le is not None and max(converted) > column.le:
+                    raise ValueError(f"{column.name} greater than {column.le}")
+            return converted
+
+        if any(v is None for v in values):
+            raise ValueError(f"{column.name} has null values")
+        if column.max_length is not None and len(values) > 0:
+            if max(map(len, values)) > column.max_length:
+                raise ValueError(f"{column.name} longer than {column.max_length}")
+        return values
+
+    def validate_rows(
+        self,
+        data: Dict[str, List],
+        start: int = 0,
+    ) -> ColumnarBatch:
+        names = [n for n in self.names if n in data]
+        size = max((len(v) for v in data.values()), default=0)
+        records = []
+        errors: Dict[int, str] = {}
+        for i in range(size):
+            row = {n: data[n][i] for n in names if data[n][i] is not None}
+            try:
+                records.append(self.model(**row))
+            except ValidationError as e:
+                errors[start + i] = str(e.errors(include_url=False))
+        if len(errors) > 0:
+            rows = list(errors.keys())[:MAX_REPORTED_ROWS]
+            raise ValidationException(
+                message=f"{len(errors)} invalid rows for {self.model.__name__}, rows: {rows}",
+                detail="\n".join(f"row {r}: {errors[r]}" for r in rows),
+            )
+        columns = {n: [getattr(r, n) for r in records] for n in self.names}
+        return ColumnarBatch(columns=columns)
@@ -1,10 +1,12 @@
-from src.infrastructure.schema.abstract_schema import AbstractSchema
+from pydantic import Field
+
+from src.infrastructure.schema.abstract_schema import INTEGER_MAX, AbstractSchema
 
 
 class Movies(AbstractSchema):
-    movie_id: int
-    title: str
-    genre: str
+    movie_id: int = Field(ge=1, le=INTEGER_MAX)
+    title: str = Field(max_length=255)
+    genre: str = Field(max_length=255)
 
     class Config:
         frozen = True
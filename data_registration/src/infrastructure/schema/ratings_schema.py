@@ -1,11 +1,13 @@
-from src.infrastructure.schema.abstract_schema import AbstractSchema
+from pydantic import Field
+
+from src.infrastructure.schema.abstract_schema import INTEGER_MAX, AbstractSchema
 
 
 class Ratings(AbstractSchema):
-    user_id: int
-    movie_id: int
-    rating: float
-    timestamp: int
+    user_id: int = Field(ge=1, le=INTEGER_MAX)
+    movie_id: int = Field(ge=1, le=INTEGER_MAX)
+    rating: float = Field(ge=0.5, le=5.0)
+    timestamp: int = Field(ge=0, le=INTEGER_MAX)
 
     class Config:
         frozen = True
@@ -1,7 +1,20 @@
 from enum import Enum
+from typing import Dict, List
 
 
 class TABLES(Enum):
     MOVIES = "movies"
     RATINGS = "ratings"
     TAGS = "tags"
+    WATERMARKS = "watermarks"
+
+
+PRIMARY_KEYS: Dict[str, List[str]] = {
+    TABLES.MOVIES.value: ["movie_id"],
+    TABLES.RATINGS.value: ["user_id", "movie_id"],
+    TABLES.TAGS.value: ["user_id", "movie_id"],
+    TABLES.WATERMARKS.value: ["table_name"],
+}
+
+# file position of each row appended by a fast load, dropped once deduplicated
+LOAD_ORDER_COLUMN = "load_order"
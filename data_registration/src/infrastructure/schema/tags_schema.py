@@ -1,11 +1,13 @@
-from src.infrastructure.schema.abstract_schema import AbstractSchema
+from pydantic import Field
+
+from src.infrastructure.schema.abstract_schema import INTEGER_MAX, AbstractSchema
 
 
 class Tags(AbstractSchema):
-    user_id: int
-    movie_id: int
-    tag: str
-    timestamp: int
+    user_id: int = Field(ge=1, le=INTEGER_MAX)
+    movie_id: int = Field(ge=1, le=INTEGER_MAX)
+    tag: str = Field(max_length=255)
+    timestamp: int = Field(ge=0, le=INTEGER_MAX)
 
     class Config:
         frozen = True
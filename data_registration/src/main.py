@@ -2,13 +2,19 @@ from typing import Optional
 
 import click
 
-from src.infrastructure.database.db_client import PostgreSQLClient
+from src.infrastructure.database.db_client import (
+    AbstractDBClient,
+    PostgreSQLClient,
+    SQLiteClient,
+)
+from src.middleware.checkpoint import CheckpointStore
 from src.middleware.logger import configure_logger
 from src.infrastructure.repository.movies_repository import MoviesRepository
 from src.infrastructure.repository.ratings_repository import RatingsRepository
 from src.infrastructure.repository.tables_repository import TablesRepository
 from src.infrastructure.repository.tags_repository import TagsRepository
-from src.usecase.data_register_usecase import DataRegisterUsecase
+from src.infrastructure.repository.watermarks_repository import WatermarksRepository
+from src.usecase.data_register_usecase import INSERT_MODE, DataRegisterUsecase
 
 logger = configure_logger(__name__)
 
@@ -34,11 +40,92 @@ logger = configure_logger(__name__)
     type=str,
     required=False,
 )
+@click.option(
+    "--insert_mode",
+    type=click.Choice(INSERT_MODE.get_list()),
+    default=INSERT_MODE.INSERT.value,
+    required=False,
+)
+@click.option(
+    "--encoding",
+    type=str,
+    default="utf-8",
+    required=False,
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    required=False,
+)
+@click.option(
+    "--ratings_shards",
+    type=click.IntRange(min=1),
+    default=1,
+    required=False,
+)
+@click.option(
+    "--fast_load",
+    is_flag=True,
+    default=False,
+    required=False,
+)
+@click.option(
+    "--checkpoint_dir",
+    type=str,
+    required=False,
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    required=False,
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    required=False,
+)
+@click.option(
+    "--batch_size",
+    type=click.IntRange(min=1),
+    default=10000,
+    required=False,
+)
+@click.option(
+    "--adaptive_batch_size/--fixed_batch_size",
+    default=True,
+    required=False,
+)
+@click.option(
+    "--sqlite_path",
+    type=str,
+    required=False,
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    default=False,
+    required=False,
+)
 def main(
     tables_filepath: Optional[str] = None,
     movies_filepath: Optional[str] = None,
     ratings_filepath: Optional[str] = None,
     tags_filepath: Optional[str] = None,
+    insert_mode: str = INSERT_MODE.INSERT.value,
+    encoding: str = "utf-8",
+    workers: int = 1,
+    ratings_shards: int = 1,
+    fast_load: bool = False,
+    checkpoint_dir: Optional[str] = None,
+    resume: bool = False,
+    incremental: bool = False,
+    batch_size: int = 10000,
+    adaptive_batch_size: bool = True,
+    sqlite_path: Optional[str] = None,
+    verify: bool = False,
 ):
 
     if tables_filepath is None:
@@ -53,6 +140,21 @@ def main(
     if tags_filepath is None:
         raise ValueError("tags_filepath cannot be None")
 
+    if resume and checkpoint_dir is None:
+        raise ValueError("checkpoint_dir cannot be None with resume")
+
+    if incremental and verify:
+        raise ValueError("verify cannot be used with incremental")
+
+    # staging tables, UNLOGGED tables and watermarks need PostgreSQL
+    if sqlite_path is not None and (
+        fast_load or incremental or insert_mode != INSERT_MODE.INSERT.value
+    ):
+        raise ValueError(
+            "sqlite_path can be used only with insert_mode insert, "
+            "without fast_load and incremental"
+        )
+
     logger.info("START data_registration")
     logger.info(
         f"""
@@ -61,13 +163,30 @@ tables_filepath: {tables_filepath}
 movies_filepath: {movies_filepath}
 ratings_filepath: {ratings_filepath}
 tags_filepath: {tags_filepath}
+insert_mode: {insert_mode}
+encoding: {encoding}
+workers: {workers}
+ratings_shards: {ratings_shards}
+fast_load: {fast_load}
+checkpoint_dir: {checkpoint_dir}
+resume: {resume}
+incremental: {incremental}
+batch_size: {batch_size}
+adaptive_batch_size: {adaptive_batch_size}
+sqlite_path: {sqlite_path}
+verify: {verify}
     """
     )
-    db_client = PostgreSQLClient()
-    tables_repository = TablesRepository(db_client=db_client)
-    movies_repository = MoviesRepository(db_client=db_client)
-    ratings_repository = RatingsRepository(db_client=db_client)
-    tags_repository = TagsRepository(db_client=db_client)
+
+    def db_client() -> AbstractDBClient:
+        if sqlite_path is not None:
+            return SQLiteClient(database_path=sqlite_path)
+        return PostgreSQLClient()
+
+    tables_repository = TablesRepository(db_client=db_client())
+    movies_repository = MoviesRepository(db_client=db_client())
+    ratings_repository = RatingsRepository(db_client=db_client())
+    tags_repository = TagsRepository(db_client=db_client())
 
     data_register_usecase = DataRegisterUsecase(
         tables_filepath=tables_filepath,
@@ -78,23 +197,42 @@ tags_filepath: {tags_filepath}
         movies_repository=movies_repository,
         ratings_repository=ratings_repository,
         tags_repository=tags_repository,
+        insert_mode=insert_mode,
+        encoding=encoding,
+        fast_load=fast_load,
+        checkpoint_store=(
+            CheckpointStore(checkpoint_dir=checkpoint_dir)
+            if checkpoint_dir is not None
+            else None
+        ),
+        resume=resume,
+        incremental=incremental,
+        watermarks_repository=WatermarksRepository(db_client=db_client()),
+        batch_size=batch_size,
+        adaptive_batch_size=adaptive_batch_size,
     )
 
     logger.info("create tables")
     data_register_usecase.create_tables()
     logger.info("done create tables")
 
-    logger.info("register movies")
-    data_register_usecase.register_movies()
-    logger.info("done register movies")
-
-    logger.info("register ratings")
-    data_register_usecase.register_ratings()
-    logger.info("done register ratings")
-
-    logger.info("register tags")
-    data_register_usecase.register_tags()
-    logger.info("done register tags")
+    logger.info("register tables")
+    results = data_register_usecase.register_tables(
+        workers=workers,
+        ratings_shards=ratings_shards,
+    )
+    logger.info("done register tables")
+
+    if verify:
+        logger.info("verify row counts")
+        verified = data_register_usecase.verify_row_counts(
+            expected_rows={
+                table_name: result.inserted for table_name, result in results.items()
+            },
+        )
+        if not verified:
+            raise ValueError("row counts of registered tables do not match inserts")
+        logger.info("done verify row counts")
 
     logger.info("DONE data_registration")
 
@@ -0,0 +1,137 @@
+from typing import Dict, Optional
+
+from src.middleware.logger import configure_logger
+
+logger = configure_logger(__name__)
+
+
+class BatchSizeTuner(object):
+    def __init__(
+        self,
+        batch_size: int = 10000,
+        min_batch_size: int = 1000,
+        max_batch_size: int = 200000,
+        factor: float = 2.0,
+        samples: int = 3,
+        max_commit_latency: float = 5.0,
+        tolerance: float = 0.05,
+        adaptive: bool = True,
+    ):
+        """Hill-climb the batch size on measured throughput.
+
+        Every `samples` batches the throughput of the current size is compared
+        with the best size so far. The size keeps moving by `factor` while
+        throughput improves by more than `tolerance`, turns around once when it
+        does not, and settles on the best size when both neighbours are worse.
+        Sizes whose mean commit latency exceeds `max_commit_latency` are
+        rejected and become the new upper bound.
+
+        Args:
+            batch_size (int): initial batch size.
+            min_batch_size (int): lower bound of the batch size.
+            max_batch_size (int): upper bound of the batch size.
+            factor (float): step between tried batch sizes.
+            samples (int): batches measured per batch size.
+            max_commit_latency (float): seconds a commit may take on average.
+            tolerance (float): relative improvement needed to move on.
+            adaptive (bool): keep the initial batch size when False.
+        """
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max(max_batch_size, min_batch_size)
+        self.factor = factor
+        self.samples = samples
+        self.max_commit_latency = max_commit_latency
+        self.tolerance = tolerance
+        # a fixed batch size is used as given, the bounds only limit the search
+        self.batch_size = self.clamp(batch_size) if adaptive else batch_size
+        self.adaptive = adaptive
+        self.settled = not adaptive
+        self.direction = 1
+        self.best_batch_size = self.batch_size
+        self.best_throughput = 0.0
+        self.throughputs: Dict[int, float] = {}
+        self.__rows = 0
+        self.__seconds = 0.0
+        self.__commit_seconds = 0.0
+        self.__batches = 0
+
+    def __call__(self) -> int:
+        return self.batch_size
+
+    def clamp(self, batch_size: float) -> int:
+        return int(min(max(batch_size, self.min_batch_size), self.max_batch_size))
+
+    def record(self, rows: int, seconds: float, commit_seconds: float):
+        self.__rows += rows
+        self.__seconds += seconds
+        self.__commit_seconds += commit_seconds
+        self.__batches += 1
+        if self.__batches < self.samples:
+            return
+
+        throughput = self.__rows / max(self.__seconds, 1e-9)
+        commit_latency = self.__commit_seconds / self.__batches
+        self.__rows = 0
+        self.__seconds = 0.0
+        self.__commit_seconds = 0.0
+        self.__batches = 0
+
+        if not self.adaptive:
+            self.best_throughput = throughput
+            return
+
+        if (
+            commit_latency > self.max_commit_latency
+            and self.batch_size > self.min_batch_size
+        ):
+            logger.info(
+                f"batch size {self.batch_size}: commit latency "
+                f"{commit_latency:.2f} sec exceeds {self.max_commit_latency:.2f} sec"
+            )
+            self.max_batch_size = self.clamp(self.batch_size / self.factor)
+            throughput = 0.0
+            if self.best_batch_size > self.max_batch_size:
+                self.best_batch_size = self.max_batch_size
+                self.best_throughput = 0.0
+                self.batch_size = self.max_batch_size
+                return
+
+        if self.settled:
+            if self.batch_size == self.best_batch_size:
+                self.best_throughput = throughput
+            return
+
+        self.throughputs[self.batch_size] = throughput
+        improved = throughput > self.best_throughput * (1 + self.tolerance)
+        logger.debug(
+            f"batch size {self.batch_size}: {throughput:.0f} rows/sec, "
+            f"commit latency {commit_latency:.2f} sec"
+        )
+        if improved:
+            self.best_batch_size = self.batch_size
+            self.best_throughput = throughput
+        else:
+            self.direction = -self.direction
+        candidate = self.next_batch_size()
+        if candidate is None and improved:
+            self.direction = -self.direction
+            candidate = self.next_batch_size()
+        if candidate is None:
+            self.settled = True
+            self.batch_size = self.best_batch_size
+            logger.info(f"settled on {self.summary()}")
+        else:
+            self.batch_size = candidate
+
+    def summary(self) -> str:
+        # no throughput with fewer batches than samples, as in a small table,
+        # or when every sample exceeded the commit latency
+        if self.best_throughput <= 0:
+            return f"batch size {self.batch_size} (not measured)"
+        return f"batch size {self.batch_size} ({self.best_throughput:.0f} rows/sec)"
+
+    def next_batch_size(self) -> Optional[int]:
+        candidate = self.clamp(self.best_batch_size * self.factor**self.direction)
+        if candidate == self.best_batch_size or candidate in self.throughputs:
+            return None
+        return candidate
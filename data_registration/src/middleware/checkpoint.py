@@ -0,0 +1,89 @@
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from typing import Optional
+
+logger = getLogger(name=__name__)
+
+
+@dataclass
+class Checkpoint:
+    file_path: str
+    file_size: int
+    file_mtime_ns: int
+    start: int
+    end: Optional[int]
+    offset: int
+    batch: int
+    rows: int
+    completed: bool = False
+    # rows written into the table, fewer than rows if keys are duplicated
+    inserted: int = 0
+
+    def matches(self, other: "Checkpoint") -> bool:
+        return (
+            self.file_path == other.file_path
+            and self.file_size == other.file_size
+            and self.file_mtime_ns == other.file_mtime_ns
+            and self.start == other.start
+            and self.end == other.end
+        )
+
+
+def new_checkpoint(
+    file_path: str,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Checkpoint:
+    stat = os.stat(file_path)
+    return Checkpoint(
+        file_path=os.path.abspath(file_path),
+        file_size=stat.st_size,
+        file_mtime_ns=stat.st_mtime_ns,
+        start=start,
+        end=end,
+        offset=start,
+        batch=0,
+        rows=0,
+    )
+
+
+class CheckpointStore(object):
+    def __init__(
+        self,
+        checkpoint_dir: str,
+    ):
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        name = re.sub(r"[^0-9A-Za-z_.-]+", "_", key).strip("_")
+        return os.path.join(self.checkpoint_dir, f"{name}.json")
+
+    def load(self, key: str) -> Optional[Checkpoint]:
+        path = self.path(key=key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return Checkpoint(**json.load(f))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"ignore broken checkpoint {path}: {e}")
+            return None
+
+    def save(self, key: str, checkpoint: Checkpoint):
+        path = self.path(key=key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(asdict(checkpoint), f)
+            f.flush()
+            os.fsync(f.fileno())
+        # readers see either the previous or the new checkpoint, never a partial one
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        for name in os.listdir(self.checkpoint_dir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.checkpoint_dir, name))
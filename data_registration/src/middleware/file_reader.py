@@ -1,9 +1,27 @@
 import csv
+import gzip
+import itertools
+import os
+import zipfile
+from contextlib import contextmanager
 from logging import getLogger
-from typing import Dict, List, Optional
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 logger = getLogger(name=__name__)
 
+DAT_DELIMITER = "::"
+
 
 def read_text_file(file_path: str) -> str:
     file_content = ""
@@ -13,21 +31,147 @@ def read_text_file(file_path: str) -> str:
     return file_content
 
 
-def read_csv_to_list(
-    csv_file: str,
+def is_dat_file(file_path: str) -> bool:
+    # original MovieLens files are "::" delimited without header
+    name = file_path[: -len(".gz")] if file_path.endswith(".gz") else file_path
+    return name.endswith(".dat") or name.endswith(".zip")
+
+
+def is_compressed_file(file_path: str) -> bool:
+    return file_path.endswith(".gz") or file_path.endswith(".zip")
+
+
+@contextmanager
+def open_binary_file(
+    file_path: str,
+    member: Optional[str] = None,
+) -> Iterator[BinaryIO]:
+    if file_path.endswith(".zip"):
+        with zipfile.ZipFile(file_path) as archive:
+            names = [n for n in archive.namelist() if os.path.basename(n) == member]
+            if len(names) == 0:
+                raise FileNotFoundError(f"{member} not found in {file_path}")
+            with archive.open(names[0]) as f:
+                yield cast(BinaryIO, f)
+    elif file_path.endswith(".gz"):
+        with gzip.open(file_path, "rb") as f:
+            yield cast(BinaryIO, f)
+    else:
+        with open(file_path, "rb") as f:
+            yield f
+
+
+def read_columns_in_chunks(
+    file_path: str,
+    chunk_size: int = 10000,
+    header: Optional[List[str]] = None,
+    is_first_line_header: bool = True,
+    start: int = 0,
+    end: Optional[int] = None,
+    member: Optional[str] = None,
+    encoding: str = "utf-8",
+) -> Iterator[Dict[str, List]]:
+    for columns, _ in read_columns_in_chunks_with_offsets(
+        file_path=file_path,
+        chunk_size=chunk_size,
+        header=header,
+        is_first_line_header=is_first_line_header,
+        start=start,
+        end=end,
+        member=member,
+        encoding=encoding,
+    ):
+        yield columns
+
+
+def read_columns_in_chunks_with_offsets(
+    file_path: str,
+    chunk_size: Union[int, Callable[[], int]] = 10000,
     header: Optional[List[str]] = None,
     is_first_line_header: bool = True,
-) -> List[Dict]:
-    logger.info(f"read csv {csv_file}")
-    csv_List: List[Dict] = []
-    with open(csv_file, "r") as f:
-        reader = csv.reader(f)
+    start: int = 0,
+    end: Optional[int] = None,
+    member: Optional[str] = None,
+    encoding: str = "utf-8",
+) -> Iterator[Tuple[Dict[str, List], int]]:
+    # chunk_size may be a callable, evaluated before each chunk, to vary sizes
+    initial_chunk_size = chunk_size() if callable(chunk_size) else chunk_size
+    logger.info(
+        f"read {file_path} [{start}:{end}] in chunks of {initial_chunk_size} rows"
+    )
+    is_dat = is_dat_file(file_path)
+    with open_binary_file(file_path=file_path, member=member) as f:
         if is_first_line_header or header is None:
-            header = next(reader)
+            first_line = f.readline().decode(encoding)
+            header = next(parse_lines(lines=[first_line], is_dat=is_dat))
         logger.info(f"header: {header}")
-        for r in reader:
-            row = {}
-            for _h, _r in zip(header, r):
-                row[_h] = _r
-            csv_List.append(row)
-    return csv_List
+        lines = read_lines_in_range(
+            f=f,
+            start=max(start, f.tell()),
+            end=end,
+            encoding=encoding,
+        )
+        reader = parse_lines(lines=lines, is_dat=is_dat)
+        while True:
+            size = chunk_size() if callable(chunk_size) else chunk_size
+            rows = list(itertools.islice(reader, size))
+            if len(rows) == 0:
+                break
+            # lines are pulled lazily, so the file position is right after the chunk
+            yield to_columns(header=header, rows=rows), f.tell()
+
+
+def parse_lines(
+    lines: Iterable[str],
+    is_dat: bool = False,
+) -> Iterator[List[str]]:
+    if is_dat:
+        return (line.rstrip("\r\n").split(DAT_DELIMITER) for line in lines)
+    return csv.reader(lines)
+
+
+def read_lines_in_range(
+    f: BinaryIO,
+    start: int = 0,
+    end: Optional[int] = None,
+    encoding: str = "utf-8",
+) -> Iterator[str]:
+    if f.tell() != start:
+        f.seek(start)
+    position = start
+    while end is None or position < end:
+        line = f.readline()
+        if not line:
+            break
+        position += len(line)
+        yield line.decode(encoding)
+
+
+def split_file_into_shards(
+    file_path: str,
+    shards: int,
+    is_first_line_header: bool = True,
+) -> List[Tuple[int, int]]:
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        if is_first_line_header:
+            f.readline()
+        data_start = f.tell()
+        boundaries = [data_start]
+        for k in range(1, shards):
+            f.seek(max(data_start + (size - data_start) * k // shards - 1, data_start))
+            f.readline()
+            boundaries.append(max(f.tell(), boundaries[-1]))
+        boundaries.append(size)
+    return [(s, e) for s, e in zip(boundaries[:-1], boundaries[1:]) if s < e]
+
+
+def to_columns(
+    header: List[str],
+    rows: List[List],
+) -> Dict[str, List]:
+    width = len(header)
+    if any(len(r) != width for r in rows):
+        # malformed rows are passed on as nulls to be reported by validation
+        rows = [r if len(r) == width else [None] * width for r in rows]
+    return {h: list(c) for h, c in zip(header, zip(*rows))}
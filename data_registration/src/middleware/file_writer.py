@@ -0,0 +1,11 @@
+import csv
+import io
+from typing import Iterable, Tuple
+
+
+def write_csv_to_buffer(rows: Iterable[Tuple]) -> io.StringIO:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n", quoting=csv.QUOTE_NONNUMERIC)
+    writer.writerows(rows)
+    buffer.seek(0)
+    return buffer
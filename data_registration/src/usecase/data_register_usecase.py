@@ -1,15 +1,58 @@
-from src.middleware.file_reader import read_csv_to_list, read_text_file
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from enum import Enum
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from src.middleware.batch_size_tuner import BatchSizeTuner
+from src.middleware.checkpoint import Checkpoint, CheckpointStore, new_checkpoint
+from src.middleware.file_reader import (
+    is_compressed_file,
+    is_dat_file,
+    read_columns_in_chunks_with_offsets,
+    read_text_file,
+    split_file_into_shards,
+)
 from src.middleware.logger import configure_logger
 from src.domain.repository.movies_repository import AbstractMoviesRepository
 from src.domain.repository.ratings_repository import AbstractRatingsRepository
 from src.domain.repository.tables_repository import AbstractTablesRepository
 from src.domain.repository.tags_repository import AbstractTagsRepository
+from src.domain.repository.watermarks_repository import AbstractWatermarksRepository
+from src.exceptions.exceptions import ValidationException
+from src.infrastructure.schema.columnar_schema import ColumnarBatch, ColumnarSchema
 from src.infrastructure.schema.movies_schema import Movies
 from src.infrastructure.schema.ratings_schema import Ratings
+from src.infrastructure.schema.tables_schema import (
+    LOAD_ORDER_COLUMN,
+    PRIMARY_KEYS,
+    TABLES,
+)
 from src.infrastructure.schema.tags_schema import Tags
 
 logger = configure_logger(__name__)
 
+WATERMARK_COLUMN = "timestamp"
+WATERMARKED_TABLES = [TABLES.RATINGS.value, TABLES.TAGS.value]
+
+
+class INSERT_MODE(Enum):
+    INSERT = "insert"
+    COPY = "copy"
+
+    @staticmethod
+    def get_list() -> List[str]:
+        return [v.value for v in INSERT_MODE.__members__.values()]
+
+
+@dataclass(frozen=True)
+class RegisterResult:
+    # rows read from the file and rows written into the table
+    rows: int
+    inserted: int
+    seconds: float = 0.0
+
 
 class DataRegisterUsecase(object):
     def __init__(
@@ -22,7 +65,26 @@ class DataRegisterUsecase(object):
         movies_repository: AbstractMoviesRepository,
         ratings_repository: AbstractRatingsRepository,
         tags_repository: AbstractTagsRepository,
+        insert_mode: str = INSERT_MODE.INSERT.value,
+        encoding: str = "utf-8",
+        fast_load: bool = False,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        resume: bool = False,
+        incremental: bool = False,
+        watermarks_repository: Optional[AbstractWatermarksRepository] = None,
+        batch_size: int = 10000,
+        adaptive_batch_size: bool = True,
     ):
+        if insert_mode not in INSERT_MODE.get_list():
+            raise ValueError(
+                f"invalid insert mode: {insert_mode}. Choose from {INSERT_MODE.get_list()}"
+            )
+        if resume and checkpoint_store is None:
+            raise ValueError("resume requires a checkpoint store")
+        if incremental and watermarks_repository is None:
+            raise ValueError("incremental requires a watermarks repository")
+        if incremental and fast_load:
+            raise ValueError("incremental cannot be combined with fast_load")
         self.tables_filepath = tables_filepath
         self.movies_filepath = movies_filepath
         self.ratings_filepath = ratings_filepath
@@ -31,87 +93,437 @@ class DataRegisterUsecase(object):
         self.movies_repository = movies_repository
         self.ratings_repository = ratings_repository
         self.tags_repository = tags_repository
+        self.insert_mode = insert_mode
+        self.encoding = encoding
+        self.fast_load = fast_load
+        self.checkpoint_store = checkpoint_store
+        self.resume = resume
+        self.incremental = incremental
+        self.watermarks_repository = watermarks_repository
+        self.batch_size = batch_size
+        self.adaptive_batch_size = adaptive_batch_size
 
     def create_tables(self):
         query = read_text_file(file_path=self.tables_filepath)
         self.tables_repository.create_tables(query=query)
 
-    def register_movies(self):
-        data = read_csv_to_list(
-            csv_file=self.movies_filepath,
-            header=None,
-            is_first_line_header=True,
+    def truncate_tables(self, table_names: List[str]):
+        self.tables_repository.truncate_tables(table_names=table_names)
+
+    def bulk_register(self, repository, batch: ColumnarBatch) -> int:
+        if self.fast_load:
+            return repository.bulk_append(batch=batch)
+        if self.incremental:
+            return repository.bulk_upsert(batch=batch)
+        if self.insert_mode == INSERT_MODE.COPY.value:
+            return repository.bulk_copy(batch=batch)
+        return repository.bulk_insert(batch=batch)
+
+    @property
+    def mode(self) -> str:
+        if self.fast_load:
+            return "fast_load"
+        if self.incremental:
+            return "incremental"
+        return self.insert_mode
+
+    def load_watermark(self, table_name: str) -> Optional[int]:
+        if not self.incremental or self.watermarks_repository is None:
+            return None
+        watermark = self.watermarks_repository.select_watermark(table_name=table_name)
+        if watermark is None:
+            logger.info(f"{table_name}: no watermark, register all rows")
+        else:
+            logger.info(f"{table_name}: register rows with timestamp >= {watermark}")
+        return watermark
+
+    def prepare_fast_load(self, table_names: List[str]) -> Dict[str, float]:
+        phases: Dict[str, float] = {}
+        start = time.perf_counter()
+        for table_name in table_names:
+            self.tables_repository.set_unlogged(table_name=table_name)
+        phases["set_unlogged"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for table_name in table_names:
+            self.tables_repository.drop_primary_key(table_name=table_name)
+        phases["drop_primary_keys"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for table_name in table_names:
+            # rows are appended in parallel, so their order is kept in a column
+            self.tables_repository.add_column(
+                table_name=table_name,
+                column=LOAD_ORDER_COLUMN,
+                data_type="BIGINT",
+            )
+        phases["add_load_order"] = time.perf_counter() - start
+        return phases
+
+    def finalize_fast_load(
+        self,
+        table_names: List[str],
+    ) -> Tuple[Dict[str, float], Dict[str, int]]:
+        phases: Dict[str, float] = {}
+        duplicates: Dict[str, int] = {}
+        start = time.perf_counter()
+        for table_name in table_names:
+            duplicates[table_name] = self.tables_repository.delete_duplicates(
+                table_name=table_name,
+                primary_keys=PRIMARY_KEYS[table_name],
+                order_column=LOAD_ORDER_COLUMN,
+            )
+            self.tables_repository.drop_column(
+                table_name=table_name,
+                column=LOAD_ORDER_COLUMN,
+            )
+        phases["delete_duplicates"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for table_name in table_names:
+            self.tables_repository.add_primary_key(
+                table_name=table_name,
+                primary_keys=PRIMARY_KEYS[table_name],
+            )
+        phases["add_primary_keys"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for table_name in table_names:
+            self.tables_repository.set_logged(table_name=table_name)
+        phases["set_logged"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for table_name in table_names:
+            self.tables_repository.analyze(table_name=table_name)
+        phases["analyze"] = time.perf_counter() - start
+        return phases, duplicates
+
+    def load_checkpoint(
+        self,
+        key: str,
+        filepath: str,
+        start_offset: int = 0,
+        end_offset: Optional[int] = None,
+    ) -> Checkpoint:
+        checkpoint = new_checkpoint(
+            file_path=filepath,
+            start=start_offset,
+            end=end_offset,
         )
-        limit = 10000
-        i = 0
-        records = []
-        while i < len(data):
-            d = data[i]
-            records.append(
-                Movies(
-                    movie_id=d["movie_id"],
-                    title=d["title"],
-                    genre=d["genre"],
-                )
+        if self.checkpoint_store is None or not self.resume:
+            return checkpoint
+        saved = self.checkpoint_store.load(key=key)
+        if saved is None:
+            return checkpoint
+        if not saved.matches(checkpoint):
+            logger.warning(
+                f"{key}: checkpoint does not match {filepath}, start from the beginning"
             )
-            i += 1
-            if i % limit == 0:
-                self.movies_repository.bulk_insert(records=records)
-                logger.info(f"movies: {i} ...")
-        if len(records) > 0:
-            self.movies_repository.bulk_insert(records=records)
-            logger.info(f"movies: {i} ...")
-
-    def register_ratings(self):
-        data = read_csv_to_list(
-            csv_file=self.ratings_filepath,
-            header=None,
-            is_first_line_header=True,
+            return checkpoint
+        logger.info(
+            f"{key}: resume from offset {saved.offset} "
+            f"after batch {saved.batch} ({saved.rows} rows)"
+        )
+        return saved
+
+    def save_checkpoint(self, key: str, checkpoint: Checkpoint):
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.save(key=key, checkpoint=checkpoint)
+
+    def log_throughput(self, table_name: str, rows: int, elapsed: float):
+        logger.info(
+            f"{table_name}: {rows} rows in {elapsed:.2f} sec "
+            f"({rows / max(elapsed, 1e-9):.0f} rows/sec, mode: {self.mode})"
+        )
+
+    def register_table(
+        self,
+        table_name: str,
+        filepath: str,
+        schema: ColumnarSchema,
+        repository,
+        start_offset: int = 0,
+        end_offset: Optional[int] = None,
+        label: Optional[str] = None,
+    ) -> RegisterResult:
+        label = label or table_name
+        checkpoint = self.load_checkpoint(
+            key=label,
+            filepath=filepath,
+            start_offset=start_offset,
+            end_offset=end_offset,
+        )
+        if checkpoint.completed:
+            logger.info(f"{label}: already registered {checkpoint.rows} rows, skip")
+            return RegisterResult(rows=checkpoint.rows, inserted=checkpoint.inserted)
+
+        start = time.perf_counter()
+        # one tuner per table and shard, as each of them has its own connection
+        tuner = BatchSizeTuner(
+            batch_size=self.batch_size,
+            adaptive=self.adaptive_batch_size,
         )
-        limit = 10000
-        i = 0
-        records = []
-        while i < len(data):
-            d = data[i]
-            records.append(
-                Ratings(
-                    user_id=d["user_id"],
-                    movie_id=d["movie_id"],
-                    rating=d["rating"],
-                    timestamp=d["timestamp"],
+        resumed_rows = checkpoint.rows
+        i = checkpoint.rows
+        registered = 0
+        watermark = (
+            self.load_watermark(table_name=table_name)
+            if WATERMARK_COLUMN in schema.names
+            else None
+        )
+        is_dat = is_dat_file(filepath)
+        batch_start = time.perf_counter()
+        chunk_offset = checkpoint.offset
+        for data, offset in read_columns_in_chunks_with_offsets(
+            file_path=filepath,
+            chunk_size=tuner,
+            header=schema.names,
+            is_first_line_header=not is_dat,
+            start=checkpoint.offset,
+            end=end_offset,
+            member=f"{table_name}.dat",
+            encoding=self.encoding,
+        ):
+            try:
+                batch = schema.validate(data=data, start=i)
+            except ValidationException as e:
+                # rows of a shard are counted from its start, not that of the file
+                raise ValidationException(
+                    message=f"{label}: {e.message}, "
+                    f"in chunk at byte offset {chunk_offset} of {filepath}",
+                    detail=e.detail,
+                )
+            rows = len(batch)
+            i += rows
+            if watermark is not None:
+                # rows at the watermark itself are merged again as no-op updates,
+                # so rows that arrived within the same second are not missed
+                batch = batch.filter(
+                    [t >= watermark for t in batch.columns[WATERMARK_COLUMN]]
+                )
+            if self.fast_load:
+                # a row takes a byte at least, so this increases in file order
+                # across chunks and shards
+                batch = ColumnarBatch(
+                    columns={
+                        **batch.columns,
+                        LOAD_ORDER_COLUMN: range(chunk_offset, chunk_offset + rows),
+                    }
                 )
+            commit_start = time.perf_counter()
+            if len(batch) > 0:
+                checkpoint.inserted += self.bulk_register(repository, batch)
+                registered += len(batch)
+            commit_seconds = time.perf_counter() - commit_start
+            # saved only after the batch is committed; redoing a batch is harmless
+            checkpoint.offset = offset
+            checkpoint.batch += 1
+            checkpoint.rows = i
+            self.save_checkpoint(key=label, checkpoint=checkpoint)
+            chunk_offset = offset
+            logger.info(f"{label}: {i} ...")
+            batch_end = time.perf_counter()
+            tuner.record(
+                rows=rows,
+                seconds=batch_end - batch_start,
+                commit_seconds=commit_seconds,
             )
-            i += 1
-            if i % limit == 0:
-                self.ratings_repository.bulk_insert(records=records)
-                logger.info(f"ratings: {i} ...")
-        if len(records) > 0:
-            self.ratings_repository.bulk_insert(records=records)
-            logger.info(f"ratings: {i} ...")
-
-    def register_tags(self):
-        data = read_csv_to_list(
-            csv_file=self.tags_filepath,
-            header=None,
-            is_first_line_header=True,
+            batch_start = batch_end
+        checkpoint.completed = True
+        self.save_checkpoint(key=label, checkpoint=checkpoint)
+        self.log_throughput(label, i - resumed_rows, time.perf_counter() - start)
+        logger.info(f"{label}: {tuner.summary()}")
+        if watermark is not None:
+            logger.info(f"{label}: merged {registered} rows newer than the watermark")
+        elif not self.fast_load:
+            logger.info(
+                f"{label}: inserted {checkpoint.inserted} rows, "
+                f"skipped {i - checkpoint.inserted} rows of duplicated keys"
+            )
+        return RegisterResult(rows=i, inserted=checkpoint.inserted)
+
+    def register_movies(self) -> RegisterResult:
+        return self.register_table(
+            table_name=TABLES.MOVIES.value,
+            filepath=self.movies_filepath,
+            schema=ColumnarSchema(model=Movies),
+            repository=self.movies_repository,
         )
-        limit = 10000
-        i = 0
-        records = []
-        while i < len(data):
-            d = data[i]
-            records.append(
-                Tags(
-                    user_id=d["user_id"],
-                    movie_id=d["movie_id"],
-                    tag=d["tag"],
-                    timestamp=d["timestamp"],
+
+    def register_ratings(self) -> RegisterResult:
+        return self.register_table(
+            table_name=TABLES.RATINGS.value,
+            filepath=self.ratings_filepath,
+            schema=ColumnarSchema(model=Ratings),
+            repository=self.ratings_repository,
+        )
+
+    def register_ratings_sharded(self, shards: int) -> RegisterResult:
+        if is_compressed_file(self.ratings_filepath):
+            logger.warning(
+                f"ratings: cannot split compressed file {self.ratings_filepath}, "
+                "register without shards"
+            )
+            return self.register_ratings()
+        start = time.perf_counter()
+        offsets = split_file_into_shards(
+            file_path=self.ratings_filepath,
+            shards=shards,
+            is_first_line_header=not is_dat_file(self.ratings_filepath),
+        )
+        logger.info(f"ratings: split into {len(offsets)} shards: {offsets}")
+        # each shard is parsed and loaded by its own process and connection
+        with ProcessPoolExecutor(max_workers=len(offsets)) as executor:
+            futures = [
+                executor.submit(
+                    self.register_table,
+                    table_name=TABLES.RATINGS.value,
+                    filepath=self.ratings_filepath,
+                    schema=ColumnarSchema(model=Ratings),
+                    repository=self.ratings_repository,
+                    start_offset=start_offset,
+                    end_offset=end_offset,
+                    label=f"{TABLES.RATINGS.value}[shard {k}]",
+                )
+                for k, (start_offset, end_offset) in enumerate(offsets)
+            ]
+            results = [future.result() for future in futures]
+        rows = sum(result.rows for result in results)
+        self.log_throughput(TABLES.RATINGS.value, rows, time.perf_counter() - start)
+        return RegisterResult(
+            rows=rows,
+            inserted=sum(result.inserted for result in results),
+        )
+
+    def register_tags(self) -> RegisterResult:
+        return self.register_table(
+            table_name=TABLES.TAGS.value,
+            filepath=self.tags_filepath,
+            schema=ColumnarSchema(model=Tags),
+            repository=self.tags_repository,
+        )
+
+    def register_tables(
+        self,
+        workers: int = 1,
+        ratings_shards: int = 1,
+    ) -> Dict[str, RegisterResult]:
+        registers: Dict[str, Callable[[], RegisterResult]] = {
+            TABLES.MOVIES.value: self.register_movies,
+            TABLES.RATINGS.value: self.register_ratings,
+            TABLES.TAGS.value: self.register_tags,
+        }
+        if ratings_shards > 1:
+            registers[TABLES.RATINGS.value] = partial(
+                self.register_ratings_sharded,
+                shards=ratings_shards,
+            )
+        if self.checkpoint_store is not None and not self.resume:
+            self.checkpoint_store.clear()
+
+        if (
+            self.incremental
+            and self.watermarks_repository is not None
+            and not self.resume
+        ):
+            for table_name in WATERMARKED_TABLES:
+                self.watermarks_repository.reset_pending_watermark(
+                    table_name=table_name
                 )
+
+        phases: Dict[str, float] = {}
+        if self.fast_load:
+            # tables stay unlogged and keyless until finalize_fast_load succeeds
+            phases.update(self.prepare_fast_load(table_names=list(registers.keys())))
+
+        start = time.perf_counter()
+        results: Dict[str, RegisterResult] = {}
+        if workers <= 1:
+            for table_name, register in registers.items():
+                results[table_name] = timed_register(register)
+        else:
+            # each worker process opens its own connections through the repositories
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    table_name: executor.submit(timed_register, register)
+                    for table_name, register in registers.items()
+                }
+                for table_name, future in futures.items():
+                    results[table_name] = future.result()
+        elapsed = time.perf_counter() - start
+
+        if self.fast_load:
+            phases["load"] = elapsed
+            finalize_phases, duplicates = self.finalize_fast_load(
+                table_names=list(registers.keys())
             )
-            i += 1
-            if i % limit == 0:
-                self.tags_repository.bulk_insert(records=records)
-                logger.info(f"tags: {i} ...")
-        if len(records) > 0:
-            self.tags_repository.bulk_insert(records=records)
-            logger.info(f"tags: {i} ...")
+            phases.update(finalize_phases)
+            # rows of duplicated keys were appended and deleted only afterwards
+            for table_name, deleted in duplicates.items():
+                results[table_name] = replace(
+                    results[table_name],
+                    inserted=results[table_name].inserted - deleted,
+                )
+            phase_summary = "\n".join(
+                f"{phase}: {seconds:.2f} sec" for phase, seconds in phases.items()
+            )
+            logger.info(
+                f"""fast load phases in {sum(phases.values()):.2f} sec:
+{phase_summary}
+            """
+            )
+
+        if self.incremental and self.watermarks_repository is not None:
+            for table_name in WATERMARKED_TABLES:
+                self.watermarks_repository.commit_pending_watermark(
+                    table_name=table_name
+                )
+
+        if self.checkpoint_store is not None:
+            # a later --resume must not skip tables of a new registration
+            self.checkpoint_store.clear()
+
+        summary = "\n".join(
+            f"{table_name}: {result.rows} rows, {result.inserted} inserted "
+            f"in {result.seconds:.2f} sec"
+            for table_name, result in results.items()
+        )
+        logger.info(
+            f"""registered tables with {workers} workers in {elapsed:.2f} sec:
+{summary}
+        """
+        )
+        return results
+
+    def verify_row_counts(self, expected_rows: Dict[str, int]) -> bool:
+        repositories: Dict[
+            str,
+            Union[
+                AbstractMoviesRepository,
+                AbstractRatingsRepository,
+                AbstractTagsRepository,
+            ],
+        ] = {
+            TABLES.MOVIES.value: self.movies_repository,
+            TABLES.RATINGS.value: self.ratings_repository,
+            TABLES.TAGS.value: self.tags_repository,
+        }
+        verified = True
+        for table_name, rows in expected_rows.items():
+            count = repositories[table_name].count()
+            if count == rows:
+                logger.info(f"{table_name}: verified {count} rows")
+            else:
+                # preexisting rows also cause this
+                logger.warning(
+                    f"{table_name}: row count mismatch, "
+                    f"inserted: {rows}, table: {count}"
+                )
+                verified = False
+        return verified
+
+
+def timed_register(register: Callable[[], RegisterResult]) -> RegisterResult:
+    start = time.perf_counter()
+    result = register()
+    return replace(result, seconds=time.perf_counter() - start)
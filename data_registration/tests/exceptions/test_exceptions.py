@@ -0,0 +1,15 @@
+import pickle
+
+from src.exceptions.exceptions import DatabaseException, ValidationException
+
+
+def test_exceptions_pickle():
+    for exception in [
+        DatabaseException(message="failed to copy", detail="ratings: error"),
+        ValidationException(message="1 invalid rows", detail="row 2: error"),
+    ]:
+        got = pickle.loads(pickle.dumps(exception))
+        assert type(got) is type(exception)
+        assert got.message == exception.message
+        assert got.detail == exception.detail
+        assert str(got) == str(exception)
@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock
+
+from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.repository.tags_repository import TagsRepository
+from src.infrastructure.schema.columnar_schema import ColumnarBatch
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+def test_bulk_upsert_latest_timestamp_wins():
+    db_client = MagicMock(spec=AbstractDBClient)
+    db_client.execute_copy_query.return_value = 1
+    tags_repository = TagsRepository(db_client=db_client)
+    batch = ColumnarBatch(
+        columns={
+            "user_id": [1, 1],
+            "movie_id": [2, 2],
+            "tag": ["a", "b"],
+            "timestamp": [10, 10],
+        }
+    )
+
+    assert tags_repository.bulk_upsert(batch=batch) == 1
+
+    merge_query = normalize(
+        db_client.execute_copy_query.call_args.kwargs["merge_query"]
+    )
+    # duplicated keys in a batch: latest timestamp, then greatest tag, not file order
+    assert "ORDER BY user_id, movie_id, timestamp DESC, tag DESC" in merge_query
+    # across batches and shards the same rule, so their order does not matter;
+    # the upsert runs last, as its rowcount is returned
+    assert merge_query.endswith(
+        "WHERE (EXCLUDED.timestamp, EXCLUDED.tag) > " "(tags.timestamp, tags.tag) ;"
+    )
@@ -0,0 +1,16 @@
+from src.middleware.batch_size_tuner import BatchSizeTuner
+
+
+def test_summary_not_measured():
+    batch_size_tuner = BatchSizeTuner(batch_size=1000, samples=3)
+    batch_size_tuner.record(rows=10, seconds=1.0, commit_seconds=0.1)
+
+    assert batch_size_tuner.summary() == "batch size 1000 (not measured)"
+
+
+def test_summary():
+    batch_size_tuner = BatchSizeTuner(batch_size=1000, samples=2, adaptive=False)
+    for _ in range(2):
+        batch_size_tuner.record(rows=1000, seconds=0.5, commit_seconds=0.1)
+
+    assert batch_size_tuner.summary() == "batch size 1000 (2000 rows/sec)"
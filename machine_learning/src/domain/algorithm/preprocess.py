@@ -1,12 +1,20 @@
 import itertools
 from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Callable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from src.domain.model.common_data import DTYPES
+from src.domain.model.id_dictionary import MOVIE_INDEX, USER_INDEX, IdDictionary
 from src.domain.model.preprocessed_data import (
+    CompactExtractedRatingsSchema,
     ExtractedGenreSchema,
     ExtractedRatingsSchema,
 )
+from src.domain.model.ratings_matrix import RatingsMatrix
+from src.domain.repository.ratings_repository import AbstractRatingsRepository
 from src.middleware.logger import configure_logger
 
 logger = configure_logger(__name__)
@@ -21,42 +29,150 @@ class AbstractExtractor(ABC):
         self,
         df1: pd.DataFrame,
         df2: pd.DataFrame,
+        ratings_matrix: RatingsMatrix,
     ) -> pd.DataFrame:
         raise NotImplementedError
 
 
+class RATINGS_EXTRACTOR(Enum):
+    PANDAS = "pandas"
+    SQL = "sql"
+
+    @staticmethod
+    def get_list() -> List[str]:
+        return [v.value for v in RATINGS_EXTRACTOR.__members__.values()]
+
+
 class RatingsExtractor(AbstractExtractor):
-    def __init__(self):
-        pass
+    aggregators: List[str] = ["min", "max", "mean"]
+
+    def __init__(
+        self,
+        dtypes: str = DTYPES.DEFAULT.value,
+    ):
+        """Rating statistics aggregated with pandas.
+
+        Args:
+            dtypes (str): "compact" takes half-star uint8 ratings and makes float32 statistics.
+        """
+        if dtypes not in DTYPES.get_list():
+            raise ValueError(
+                f"invalid dtypes: {dtypes}. Choose from {DTYPES.get_list()}"
+            )
+        self.dtypes = dtypes
 
     def run(
         self,
         ratings_train: pd.DataFrame,
         df: pd.DataFrame,
+        ratings_matrix: RatingsMatrix,
     ) -> pd.DataFrame:
-        """Extract statistics from price column.
+        """Extract rating statistics of users and movies.
 
         Args:
-            df (pd.DataFrame): Input Pandas DataFrame.
+            ratings_train (pd.DataFrame): Not used, statistics are computed from ratings_matrix.
+            df (pd.DataFrame): rows with user_index and movie_index.
+            ratings_matrix (RatingsMatrix): ratings for training in users x movies.
 
         Returns:
-            pd.DataFrame: DataFrame with year, month and day of week extracted.
+            pd.DataFrame: u_* and m_* statistics aligned with df.
         """
-        df_ratings = df[["user_id", "timestamp_rank", "movie_id", "rating"]].copy()
-        aggregators: list = ["min", "max", "mean"]
-        user_features = (
-            ratings_train.groupby("user_id").rating.agg(aggregators).to_dict()
+        # users are rows and movies are columns, so no regrouping is needed
+        by_movie = ratings_matrix.by_movie
+        return self.map_features(
+            df=df,
+            user_features=self.aggregate(
+                indptr=ratings_matrix.ratings.indptr,
+                data=ratings_matrix.ratings.data,
+            ),
+            movie_features=self.aggregate(
+                indptr=by_movie.indptr,
+                data=by_movie.data,
+            ),
         )
-        movie_features = (
-            ratings_train.groupby("movie_id").rating.agg(aggregators).to_dict()
-        )
-        for agg in aggregators:
-            df_ratings[f"u_{agg}"] = df_ratings["user_id"].map(user_features[agg])
-            df_ratings[f"m_{agg}"] = df_ratings["movie_id"].map(movie_features[agg])
 
-        df = df_ratings.iloc[:, 4:]
+    def aggregate(
+        self,
+        indptr: np.ndarray,
+        data: np.ndarray,
+    ) -> np.ndarray:
+        """Aggregate ratings in each row or column slice of a sparse matrix.
+
+        Args:
+            indptr (np.ndarray): offsets of the slices in data.
+            data (np.ndarray): ratings of the slices laid out in order.
+
+        Returns:
+            np.ndarray: statistics of each slice in a row, NaN for those without ratings.
+        """
+        counts = np.diff(indptr)
+        has_ratings = counts > 0
+        dtype = np.float32 if self.dtypes == DTYPES.COMPACT.value else np.float64
+        dense = np.full((len(counts), len(self.aggregators)), np.nan, dtype=dtype)
+        if not has_ratings.any():
+            return dense
+
+        # empty slices are skipped, so each slice ends where the next one starts
+        starts = indptr[:-1][has_ratings]
+        statistics = {
+            "min": np.minimum.reduceat(data, starts),
+            "max": np.maximum.reduceat(data, starts),
+            "mean": np.add.reduceat(data, starts, dtype=np.float64)
+            / counts[has_ratings],
+        }
+        # compact ratings are counted in half stars
+        scale = 2 if self.dtypes == DTYPES.COMPACT.value else 1
+        for i, agg in enumerate(self.aggregators):
+            dense[has_ratings, i] = statistics[agg] / scale
+        return dense
+
+    def to_dense(
+        self,
+        features: pd.DataFrame,
+        size: int,
+    ) -> np.ndarray:
+        """Lay out statistics indexed by dense index in an array.
+
+        Args:
+            features (pd.DataFrame): min, max and mean of rating indexed by dense index.
+            size (int): number of dense indices.
+
+        Returns:
+            np.ndarray: statistics of each dense index in a row, NaN for those without ratings.
+        """
+        dtype = np.float32 if self.dtypes == DTYPES.COMPACT.value else np.float64
+        dense = np.full((size, len(self.aggregators)), np.nan, dtype=dtype)
+        dense[features.index.to_numpy()] = features[self.aggregators].to_numpy()
+        return dense
 
-        ExtractedRatingsSchema.validate(df)
+    def map_features(
+        self,
+        df: pd.DataFrame,
+        user_features: np.ndarray,
+        movie_features: np.ndarray,
+    ) -> pd.DataFrame:
+        """Map user and movie rating statistics onto rows.
+
+        Args:
+            df (pd.DataFrame): rows with user_index and movie_index.
+            user_features (np.ndarray): min, max and mean of rating in rows of user_index.
+            movie_features (np.ndarray): min, max and mean of rating in rows of movie_index.
+
+        Returns:
+            pd.DataFrame: u_* and m_* statistics aligned with df.
+        """
+        user_index = df[USER_INDEX].to_numpy()
+        movie_index = df[MOVIE_INDEX].to_numpy()
+        features = {}
+        for i, agg in enumerate(self.aggregators):
+            features[f"u_{agg}"] = user_features[user_index, i]
+            features[f"m_{agg}"] = movie_features[movie_index, i]
+        df = pd.DataFrame(features, index=df.index)
+
+        if self.dtypes == DTYPES.COMPACT.value:
+            CompactExtractedRatingsSchema.validate(df)
+        else:
+            ExtractedRatingsSchema.validate(df)
         logger.info(
             f"""rating data extracted:
 {df}
@@ -69,6 +185,91 @@ type:
         return df
 
 
+class SQLRatingsExtractor(RatingsExtractor):
+    def __init__(
+        self,
+        ratings_repository: AbstractRatingsRepository,
+        validation_records: int,
+        dtypes: str = DTYPES.DEFAULT.value,
+    ):
+        """Rating statistics aggregated inside the database.
+
+        The training cutoff is applied in SQL with the same timestamp rank per user
+        as PreprocessUsecase.split_records, so only the aggregates are transferred.
+
+        Args:
+            ratings_repository (AbstractRatingsRepository): Repository to aggregate ratings.
+            validation_records (int): Latest records per user excluded from training.
+            dtypes (str): "compact" makes float32 statistics.
+        """
+        super().__init__(dtypes=dtypes)
+        self.ratings_repository = ratings_repository
+        self.validation_records = validation_records
+        self.__features: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.__id_dictionary: Optional[IdDictionary] = None
+
+    def run(
+        self,
+        ratings_train: pd.DataFrame,
+        df: pd.DataFrame,
+        ratings_matrix: RatingsMatrix,
+    ) -> pd.DataFrame:
+        """Extract rating statistics aggregated by the database.
+
+        Args:
+            ratings_train (pd.DataFrame): Not used, statistics are computed from the ratings table.
+            df (pd.DataFrame): rows with user_index and movie_index.
+            ratings_matrix (RatingsMatrix): Only its id dictionary is used to lay out statistics.
+
+        Returns:
+            pd.DataFrame: u_* and m_* statistics aligned with df.
+        """
+        id_dictionary = ratings_matrix.id_dictionary
+        if self.__features is None or self.__id_dictionary is not id_dictionary:
+            user_features = self.select_dense_statistics(
+                group_by="user_id",
+                index=id_dictionary.user_index,
+                size=id_dictionary.n_users,
+            )
+            movie_features = self.select_dense_statistics(
+                group_by="movie_id",
+                index=id_dictionary.movie_index,
+                size=id_dictionary.n_movies,
+            )
+            self.__features = (user_features, movie_features)
+            self.__id_dictionary = id_dictionary
+        return self.map_features(
+            df=df,
+            user_features=self.__features[0],
+            movie_features=self.__features[1],
+        )
+
+    def select_dense_statistics(
+        self,
+        group_by: str,
+        index: Callable[[np.ndarray], np.ndarray],
+        size: int,
+    ) -> np.ndarray:
+        """Select statistics from the database and lay them out by dense index.
+
+        Args:
+            group_by (str): user_id or movie_id.
+            index (Callable[[np.ndarray], np.ndarray]): encodes ids of group_by into dense indices.
+            size (int): number of dense indices.
+
+        Returns:
+            np.ndarray: statistics of each dense index in a row.
+        """
+        statistics = self.ratings_repository.select_rating_statistics(
+            group_by=group_by,
+            validation_records=self.validation_records,
+        )
+        # ids missing from the dataset, e.g. filtered out users, have no rows
+        statistics.index = pd.Index(index(statistics[group_by].to_numpy()))
+        statistics = statistics[statistics.index >= 0]
+        return self.to_dense(features=statistics, size=size)
+
+
 class GenreExtractor(AbstractExtractor):
     def __init__(self):
         pass
@@ -77,34 +278,52 @@ class GenreExtractor(AbstractExtractor):
         self,
         movies: pd.DataFrame,
         df: pd.DataFrame,
+        ratings_matrix: RatingsMatrix,
     ) -> pd.DataFrame:
-        """Extract statistics from price column.
+        """Extract genre flags of movies.
 
         Args:
-            df (pd.DataFrame): Input Pandas DataFrame.
+            movies (pd.DataFrame): movies with movie_id and list of genre.
+            df (pd.DataFrame): rows with movie_index.
+            ratings_matrix (RatingsMatrix): Only its id dictionary is used to index movies.
 
         Returns:
-            pd.DataFrame: DataFrame with year, month and day of week extracted.
+            pd.DataFrame: is_* flags of genres aligned with df.
         """
-        df_genre = df[["user_id", "timestamp_rank", "movie_id", "rating"]].copy()
-        movie_genres = movies[["movie_id", "genre"]].copy()
-        genres = list(set(itertools.chain(*movie_genres.genre)))
-        genres = sorted(genres)
-
-        for genre in genres:
-            movie_genres.loc[:, f"is_{genre}"] = movie_genres.genre.apply(
-                lambda x: genre in x
+        id_dictionary = ratings_matrix.id_dictionary
+        genres = sorted(set(itertools.chain(*movies.genre)))
+        if len(genres) > 32:
+            raise ValueError(f"too many genres to pack into flags: {len(genres)}")
+
+        # genres of a movie are packed into the bits of one flag, so a single
+        # lookup per row replaces merging every genre column
+        movie_index = id_dictionary.movie_index(movies.movie_id.to_numpy())
+        movies = movies[movie_index >= 0]
+        movie_index = movie_index[movie_index >= 0]
+        movie_flags = np.zeros(id_dictionary.n_movies, dtype=np.uint32)
+        for bit, genre in enumerate(genres):
+            has_genre = np.fromiter(
+                (genre in x for x in movies.genre),
+                dtype=bool,
+                count=len(movies),
             )
-        movie_genres.drop("genre", axis=1, inplace=True)
-        df_genre = df_genre.merge(movie_genres, on="movie_id")
+            movie_flags[movie_index] |= has_genre.astype(np.uint32) << np.uint32(bit)
+        flags = movie_flags[df[MOVIE_INDEX].to_numpy()]
 
-        df_genre = df_genre.rename(
-            columns={"is_(no genres listed)": "is_no_genres_listed"}
+        df = pd.DataFrame(
+            {
+                f"is_{genre}": ((flags >> np.uint32(bit)) & 1).astype(bool)
+                for bit, genre in enumerate(genres)
+            },
+            index=df.index,
+        )
+        df = df.rename(
+            columns={
+                "is_(no genres listed)": "is_no_genres_listed",
+                "is_Film-Noir": "is_Film_Noir",
+                "is_Sci-Fi": "is_Sci_Fi",
+            }
         )
-        df_genre = df_genre.rename(columns={"is_Film-Noir": "is_Film_Noir"})
-        df_genre = df_genre.rename(columns={"is_Sci-Fi": "is_Sci_Fi"})
-
-        df = df_genre.iloc[:, 4:]
 
         ExtractedGenreSchema.validate(df)
         logger.info(
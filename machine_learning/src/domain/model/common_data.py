@@ -1,20 +1,39 @@
 import os
 from dataclasses import dataclass
+from enum import Enum
 from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 from pandera import Field, SchemaModel
 from pandera.typing import Series
 
 
+class DTYPES(Enum):
+    DEFAULT = "default"
+    COMPACT = "compact"
+
+    @staticmethod
+    def get_list() -> List[str]:
+        return [v.value for v in DTYPES.__members__.values()]
+
+
 @dataclass(frozen=True)
 class XY:
     keys: pd.DataFrame
     x: pd.DataFrame
     y: pd.DataFrame
+    dtypes: str = DTYPES.DEFAULT.value
 
     def __post_init__(self):
-        KeyDataSchema.validate(self.keys)
+        if self.dtypes == DTYPES.COMPACT.value:
+            CompactKeyDataSchema.validate(self.keys)
+        elif self.dtypes == DTYPES.DEFAULT.value:
+            KeyDataSchema.validate(self.keys)
+        else:
+            raise ValueError(
+                f"invalid dtypes: {self.dtypes}. Choose from {DTYPES.get_list()}"
+            )
 
     def save(
         self,
@@ -75,3 +94,23 @@ class KeyDataSchema(SchemaModel):
         name = "KeyDataSchema"
         strict = True
         coerce = True
+
+
+class CompactKeyDataSchema(SchemaModel):
+    user_id: Series[np.int32] = Field(
+        nullable=False,
+        coerce=True,
+    )
+    timestamp_rank: Series[np.int32] = Field(
+        nullable=False,
+        coerce=True,
+    )
+    movie_id: Series[np.int32] = Field(
+        nullable=False,
+        coerce=True,
+    )
+
+    class Config:
+        name = "CompactKeyDataSchema"
+        strict = True
+        coerce = True
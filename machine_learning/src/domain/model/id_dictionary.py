@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.domain.model.raw_data import RawDataset
+
+INDEX_DTYPE = np.int32
+USER_INDEX = "user_index"
+MOVIE_INDEX = "movie_index"
+
+
+@dataclass(frozen=True)
+class IdDictionary:
+    user_ids: np.ndarray
+    movie_ids: np.ndarray
+
+    def __post_init__(self):
+        for name, ids in [
+            ("user_ids", self.user_ids),
+            ("movie_ids", self.movie_ids),
+        ]:
+            if len(ids) > 1 and not (ids[1:] > ids[:-1]).all():
+                raise ValueError(f"{name} of id dictionary must be sorted and unique")
+
+    @staticmethod
+    def from_raw_dataset(dataset: RawDataset) -> "IdDictionary":
+        # movies without ratings are kept, so every movie has genre features
+        return IdDictionary(
+            user_ids=np.unique(dataset.ratings_data["user_id"].to_numpy()),
+            movie_ids=np.unique(
+                np.concatenate(
+                    [
+                        dataset.ratings_data["movie_id"].to_numpy(),
+                        dataset.movies_tags_data["movie_id"].to_numpy(),
+                    ]
+                )
+            ),
+        )
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_movies(self) -> int:
+        return len(self.movie_ids)
+
+    def user_index(self, user_ids) -> np.ndarray:
+        return encode(ids=self.user_ids, values=user_ids)
+
+    def movie_index(self, movie_ids) -> np.ndarray:
+        return encode(ids=self.movie_ids, values=movie_ids)
+
+    def user_id(self, user_index) -> np.ndarray:
+        return self.user_ids[np.asarray(user_index)]
+
+    def movie_id(self, movie_index) -> np.ndarray:
+        return self.movie_ids[np.asarray(movie_index)]
+
+
+def encode(
+    ids: np.ndarray,
+    values,
+) -> np.ndarray:
+    # positions in the sorted ids are the dense indices, -1 for unknown ids
+    values = np.asarray(values)
+    if len(ids) == 0:
+        return np.full(len(values), -1, dtype=INDEX_DTYPE)
+    index = np.searchsorted(ids, values)
+    clipped = np.minimum(index, len(ids) - 1)
+    return np.where(ids[clipped] == values, clipped, -1).astype(INDEX_DTYPE)
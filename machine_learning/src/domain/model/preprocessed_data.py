@@ -1,9 +1,12 @@
 from dataclasses import dataclass
 
+import numpy as np
 from pandera import Field, SchemaModel
 from pandera.typing import Series
 
 from src.domain.model.common_data import XY
+from src.domain.model.id_dictionary import IdDictionary
+from src.domain.model.ratings_matrix import RatingsMatrix
 
 
 class ExtractedRatingsSchema(SchemaModel):
@@ -50,6 +53,50 @@ class ExtractedRatingsSchema(SchemaModel):
         coerce = True
 
 
+class CompactExtractedRatingsSchema(SchemaModel):
+    u_min: Series[np.float32] = Field(
+        ge=0.5,
+        le=5.0,
+        nullable=True,
+        coerce=True,
+    )
+    m_min: Series[np.float32] = Field(
+        ge=0.5,
+        le=5.0,
+        nullable=True,
+        coerce=True,
+    )
+    u_max: Series[np.float32] = Field(
+        ge=0.5,
+        le=5.0,
+        nullable=True,
+        coerce=True,
+    )
+    m_max: Series[np.float32] = Field(
+        ge=0.5,
+        le=5.0,
+        nullable=True,
+        coerce=True,
+    )
+    u_mean: Series[np.float32] = Field(
+        ge=0.5,
+        le=5.0,
+        nullable=True,
+        coerce=True,
+    )
+    m_mean: Series[np.float32] = Field(
+        ge=0.5,
+        le=5.0,
+        nullable=True,
+        coerce=True,
+    )
+
+    class Config:
+        name = "CompactExtractedRatingsSchema"
+        strict = True
+        coerce = True
+
+
 class ExtractedGenreSchema(SchemaModel):
     is_no_genres_listed: Series[bool] = Field(
         nullable=True,
@@ -142,3 +189,6 @@ class ExtractedGenreSchema(SchemaModel):
 class PreprocessedDataset:
     training_data: XY
     validation_data: XY
+    id_dictionary: IdDictionary
+    # ratings of the training period, for models working on users x movies
+    ratings_matrix: RatingsMatrix
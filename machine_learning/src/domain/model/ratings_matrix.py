@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse  # type: ignore
+
+from src.domain.model.id_dictionary import (
+    INDEX_DTYPE,
+    MOVIE_INDEX,
+    USER_INDEX,
+    IdDictionary,
+)
+from src.domain.model.raw_data import RawDataset
+
+
+@dataclass(frozen=True)
+class RatingsMatrix:
+    # users x movies in dense indices; timestamps and timestamp_ranks are aligned
+    # with ratings.data, movies of a user in ascending order
+    ratings: sparse.csr_matrix
+    timestamps: np.ndarray
+    timestamp_ranks: np.ndarray
+    id_dictionary: IdDictionary
+
+    def __post_init__(self):
+        if self.ratings.shape != (
+            self.id_dictionary.n_users,
+            self.id_dictionary.n_movies,
+        ):
+            raise ValueError(
+                f"shape of ratings matrix {self.ratings.shape} does not match "
+                "id dictionary"
+            )
+        if not len(self.timestamps) == len(self.timestamp_ranks) == self.n_ratings:
+            raise ValueError("timestamps of ratings matrix are not aligned")
+
+    @staticmethod
+    def from_raw_dataset(
+        dataset: RawDataset,
+        id_dictionary: IdDictionary,
+    ) -> "RatingsMatrix":
+        ratings_data = dataset.ratings_data
+        user_index = id_dictionary.user_index(ratings_data["user_id"].to_numpy())
+        movie_index = id_dictionary.movie_index(ratings_data["movie_id"].to_numpy())
+        if (user_index < 0).any() or (movie_index < 0).any():
+            raise ValueError("ratings have ids missing from id dictionary")
+
+        order = argsort_in_rows(rows=user_index, values=movie_index)
+        indptr = np.zeros(id_dictionary.n_users + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(user_index, minlength=id_dictionary.n_users),
+            out=indptr[1:],
+        )
+        ratings = sparse.csr_matrix(
+            (
+                ratings_data["rating"].to_numpy()[order],
+                movie_index[order],
+                indptr,
+            ),
+            shape=(id_dictionary.n_users, id_dictionary.n_movies),
+        )
+        timestamps = ratings_data["timestamp"].to_numpy()[order]
+        return RatingsMatrix(
+            ratings=ratings,
+            timestamps=timestamps,
+            timestamp_ranks=rank_in_rows(
+                indptr=ratings.indptr,
+                values=timestamps,
+            ),
+            id_dictionary=id_dictionary,
+        )
+
+    @property
+    def n_ratings(self) -> int:
+        return self.ratings.nnz
+
+    @cached_property
+    def user_indices(self) -> np.ndarray:
+        return np.repeat(
+            np.arange(self.id_dictionary.n_users, dtype=INDEX_DTYPE),
+            np.diff(self.ratings.indptr),
+        )
+
+    @cached_property
+    def by_movie(self) -> sparse.csc_matrix:
+        # column slices of movies, converted once
+        return self.ratings.tocsc()
+
+    def user_ratings(
+        self,
+        user_index: int,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        start, end = self.ratings.indptr[user_index : user_index + 2]
+        return (
+            self.ratings.indices[start:end],
+            self.ratings.data[start:end],
+            self.timestamps[start:end],
+        )
+
+    def movie_ratings(
+        self,
+        movie_index: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.by_movie.indptr[movie_index : movie_index + 2]
+        return (
+            self.by_movie.indices[start:end],
+            self.by_movie.data[start:end],
+        )
+
+    def select(
+        self,
+        mask: np.ndarray,
+    ) -> "RatingsMatrix":
+        indptr = np.zeros(self.id_dictionary.n_users + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(
+                self.user_indices[mask],
+                minlength=self.id_dictionary.n_users,
+            ),
+            out=indptr[1:],
+        )
+        return RatingsMatrix(
+            ratings=sparse.csr_matrix(
+                (self.ratings.data[mask], self.ratings.indices[mask], indptr),
+                shape=self.ratings.shape,
+            ),
+            timestamps=self.timestamps[mask],
+            timestamp_ranks=self.timestamp_ranks[mask],
+            id_dictionary=self.id_dictionary,
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        movie_indices = self.ratings.indices.astype(INDEX_DTYPE)
+        df = pd.DataFrame(
+            {
+                "user_id": self.id_dictionary.user_id(self.user_indices),
+                "movie_id": self.id_dictionary.movie_id(movie_indices),
+                "rating": self.ratings.data,
+                "timestamp": self.timestamps,
+                "timestamp_rank": self.timestamp_ranks,
+                USER_INDEX: self.user_indices,
+                MOVIE_INDEX: movie_indices,
+            }
+        )
+        # rows of a user are in movie order, ranks are unique within a user
+        order = argsort_in_rows(rows=self.user_indices, values=self.timestamp_ranks)
+        return df.iloc[order].reset_index(drop=True)
+
+
+def rank_in_rows(
+    indptr: np.ndarray,
+    values: np.ndarray,
+) -> np.ndarray:
+    # 1 for the largest value of each row; ties are ranked in column order, as
+    # rank(method="first") does on ratings sorted by user_id and movie_id
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = argsort_in_rows(rows=rows, values=-values.astype(np.int64))
+    ranks = np.empty(len(values), dtype=INDEX_DTYPE)
+    ranks[order] = np.arange(len(values)) - indptr[rows] + 1
+    return ranks
+
+
+def argsort_in_rows(
+    rows: np.ndarray,
+    values: np.ndarray,
+) -> np.ndarray:
+    # stable order by rows, then values; a single int64 key sorts far faster than
+    # lexsort over two keys when rows times the span of values fits
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = values.astype(np.int64) - values.min()
+    span = int(offsets.max()) + 1
+    if (int(rows.max()) + 1) * span >= 2**62:
+        return np.lexsort((values, rows))
+    return np.argsort(rows.astype(np.int64) * span + offsets, kind="stable")
@@ -1,18 +1,99 @@
 from dataclasses import dataclass
+from typing import Any, Dict
 
+import numpy as np
 import pandas as pd
 from pandera import Field, SchemaModel
 from pandera.typing import Series
 
+from src.domain.model.common_data import DTYPES
+
+# compact ratings are counted in half stars, 0.5 to 5.0 stars being 1 to 10
+RATINGS_DTYPES: Dict[str, Dict[str, Any]] = {
+    DTYPES.DEFAULT.value: {
+        "user_id": np.int64,
+        "movie_id": np.int64,
+        "rating": np.float64,
+        "timestamp": np.int64,
+    },
+    DTYPES.COMPACT.value: {
+        "user_id": np.int32,
+        "movie_id": np.int32,
+        "rating": np.uint8,
+        "timestamp": np.uint32,
+    },
+}
+MOVIES_TAGS_DTYPES: Dict[str, Dict[str, Any]] = {
+    DTYPES.DEFAULT.value: {"movie_id": np.int64},
+    DTYPES.COMPACT.value: {"movie_id": np.int32},
+}
+
 
 @dataclass(frozen=True)
 class RawDataset:
     ratings_data: pd.DataFrame
     movies_tags_data: pd.DataFrame
+    dtypes: str = DTYPES.DEFAULT.value
 
     def __post_init__(self):
-        RawDataRatingsSchema.validate(self.ratings_data)
-        RawDataMoviesTagsSchema.validate(self.movies_tags_data)
+        if self.dtypes == DTYPES.COMPACT.value:
+            CompactRawDataRatingsSchema.validate(self.ratings_data)
+            CompactRawDataMoviesTagsSchema.validate(self.movies_tags_data)
+        elif self.dtypes == DTYPES.DEFAULT.value:
+            RawDataRatingsSchema.validate(self.ratings_data)
+            RawDataMoviesTagsSchema.validate(self.movies_tags_data)
+        else:
+            raise ValueError(
+                f"invalid dtypes: {self.dtypes}. Choose from {DTYPES.get_list()}"
+            )
+
+    def with_dtypes(self, dtypes: str) -> "RawDataset":
+        if dtypes == self.dtypes:
+            return self
+        return RawDataset(
+            ratings_data=convert_ratings_data(
+                ratings_data=self.ratings_data,
+                dtypes=dtypes,
+            ),
+            movies_tags_data=convert_movies_tags_data(
+                movies_tags_data=self.movies_tags_data,
+                dtypes=dtypes,
+            ),
+            dtypes=dtypes,
+        )
+
+
+def convert_ratings_data(
+    ratings_data: pd.DataFrame,
+    dtypes: str,
+) -> pd.DataFrame:
+    # the scale of rating is told by its dtype, so converted data is kept as is
+    if "rating" in ratings_data.columns:
+        half_stars = ratings_data["rating"].dtype == np.uint8
+        if dtypes == DTYPES.COMPACT.value and not half_stars:
+            ratings_data = ratings_data.assign(
+                rating=(ratings_data["rating"] * 2).round()
+            )
+        elif dtypes == DTYPES.DEFAULT.value and half_stars:
+            ratings_data = ratings_data.assign(rating=ratings_data["rating"] / 2)
+    return cast_columns(df=ratings_data, dtypes=RATINGS_DTYPES[dtypes])
+
+
+def convert_movies_tags_data(
+    movies_tags_data: pd.DataFrame,
+    dtypes: str,
+) -> pd.DataFrame:
+    return cast_columns(df=movies_tags_data, dtypes=MOVIES_TAGS_DTYPES[dtypes])
+
+
+def cast_columns(
+    df: pd.DataFrame,
+    dtypes: Dict[str, Any],
+) -> pd.DataFrame:
+    dtypes = {c: t for c, t in dtypes.items() if c in df.columns and df[c].dtype != t}
+    if len(dtypes) == 0:
+        return df
+    return df.astype(dtypes)
 
 
 class RawDataRatingsSchema(SchemaModel):
@@ -66,6 +147,56 @@ class RawDataMoviesTagsSchema(SchemaModel):
         coerce = True
 
 
+class CompactRawDataRatingsSchema(SchemaModel):
+    user_id: Series[np.int32] = Field(
+        nullable=False,
+        coerce=True,
+    )
+    movie_id: Series[np.int32] = Field(
+        nullable=False,
+        coerce=True,
+    )
+    rating: Series[np.uint8] = Field(
+        ge=1,
+        le=10,
+        nullable=False,
+        coerce=True,
+    )
+    timestamp: Series[np.uint32] = Field(
+        nullable=False,
+        coerce=True,
+    )
+
+    class Config:
+        name = "CompactRawDataRatingsSchema"
+        strict = True
+        coerce = True
+
+
+class CompactRawDataMoviesTagsSchema(SchemaModel):
+    movie_id: Series[np.int32] = Field(
+        nullable=False,
+        coerce=True,
+    )
+    title: Series[str] = Field(
+        nullable=False,
+        coerce=True,
+    )
+    genre: Series[str] = Field(
+        nullable=False,
+        coerce=True,
+    )
+    tag: Series[str] = Field(
+        nullable=True,
+        coerce=True,
+    )
+
+    class Config:
+        name = "CompactRawDataMoviesTagsSchema"
+        strict = True
+        coerce = True
+
+
 class RawDataMoviesSchema(SchemaModel):
     movie_id: Series[int] = Field(
         nullable=False,
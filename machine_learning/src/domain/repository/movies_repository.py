@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
 
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
 from src.infrastructure.schema.movies_schema import Movies
+from src.infrastructure.schema.query_schema import QueryFilter
 
 
 class AbstractMoviesRepository(ABC):
@@ -16,6 +20,29 @@ class AbstractMoviesRepository(ABC):
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Movies]:
         raise NotImplementedError
+
+    @abstractmethod
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Movies]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_movies_tags_frame(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_fingerprint(self) -> TableFingerprint:
+        raise NotImplementedError
@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
 
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.ratings_schema import Ratings
 
 
@@ -16,6 +20,38 @@ class AbstractRatingsRepository(ABC):
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Ratings]:
         raise NotImplementedError
+
+    @abstractmethod
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Ratings]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+        row_hash: bool = False,
+    ) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_user_id_range(self) -> Optional[Tuple[int, int]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_rating_statistics(
+        self,
+        group_by: str,
+        validation_records: int,
+    ) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_fingerprint(self) -> TableFingerprint:
+        raise NotImplementedError
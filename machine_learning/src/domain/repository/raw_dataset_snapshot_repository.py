@@ -0,0 +1,57 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import pandas as pd
+
+from src.domain.model.raw_data import RawDataset
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
+
+
+class AbstractRawDatasetSnapshotRepository(ABC):
+    def __init__(
+        self,
+        snapshot_dir: str,
+    ):
+        self.snapshot_dir = snapshot_dir
+
+    @abstractmethod
+    def load_fingerprints(self) -> Optional[List[TableFingerprint]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load(self) -> Optional[RawDataset]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(
+        self,
+        raw_dataset: RawDataset,
+        fingerprints: List[TableFingerprint],
+        row_hashes: pd.DataFrame,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def merge_ratings(
+        self,
+        ratings_data: pd.DataFrame,
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_ratings_checksum(self) -> Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_movies_tags(
+        self,
+        movies_tags_data: pd.DataFrame,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_fingerprints(
+        self,
+        fingerprints: List[TableFingerprint],
+    ):
+        raise NotImplementedError
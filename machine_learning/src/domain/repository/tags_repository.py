@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
 
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.tags_schema import Tags
 
 
@@ -16,6 +20,25 @@ class AbstractTagsRepository(ABC):
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Tags]:
         raise NotImplementedError
+
+    @abstractmethod
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Tags]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_fingerprint(self) -> TableFingerprint:
+        raise NotImplementedError
@@ -1,16 +1,32 @@
+import io
 import os
+import sqlite3
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import pandas as pd
 import psycopg2
-from psycopg2 import extras
+from psycopg2 import extras, pool
 from psycopg2.extras import DictCursor
 
 from src.exceptions.exceptions import DatabaseException
+from src.infrastructure.database.query_profiler import (
+    QueryProfiler,
+    approximate_bytes,
+    profile_connection,
+    profile_query,
+)
 from src.middleware.logger import configure_logger
 
 logger = configure_logger(__name__)
 
+# NULL in COPY csv output; by default it is an empty field, as "" is read by pandas
+COPY_NULL = "\\N"
+
 
 class AbstractDBClient(ABC):
     def __init__(self):
@@ -44,15 +60,50 @@ class AbstractDBClient(ABC):
     ) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
+    @abstractmethod
+    def execute_select_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def execute_select_columns_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Dict[str, List[Any]]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def execute_select_frame(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        dtypes: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        raise NotImplementedError
+
 
 class PostgreSQLClient(AbstractDBClient):
-    def __init__(self):
+    def __init__(
+        self,
+        profiler: Optional[QueryProfiler] = None,
+    ):
         self.__postgres_user = os.getenv("POSTGRES_USER")
         self.__postgres_password = os.getenv("POSTGRES_PASSWORD")
         self.__postgres_port = int(os.getenv("POSTGRES_PORT", 5432))
         self.__postgres_dbname = os.getenv("POSTGRES_DBNAME")
         self.__postgres_host = os.getenv("POSTGRES_HOST")
         self.__connection_string = f"host={self.__postgres_host} port={self.__postgres_port} dbname={self.__postgres_dbname} user={self.__postgres_user} password={self.__postgres_password}"
+        self.profiler = profiler if profiler is not None else QueryProfiler()
+
+    @property
+    def connection_string(self) -> str:
+        return self.__connection_string
 
     def get_connection(self):
         return psycopg2.connect(self.__connection_string)
@@ -63,36 +114,373 @@ class PostgreSQLClient(AbstractDBClient):
         parameters: Optional[Tuple] = None,
     ):
         logger.debug(f"create query: {query}, parameters: {parameters}")
-        with self.get_connection() as conn:
-            try:
+        with profile_query(self.profiler, "execute_create_query") as profile:
+            with profile_connection(self.get_connection, profile) as conn:
+                try:
+                    with conn.cursor(cursor_factory=DictCursor) as cursor:
+                        cursor.execute(query, parameters)
+                        profile["rows"] = max(cursor.rowcount, 0)
+                    conn.commit()
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    raise DatabaseException(
+                        message=f"failed to insert or update query: {e}",
+                        detail=f"{query} {parameters}: {e}",
+                    )
+
+    def execute_bulk_insert_or_update_query(
+        self,
+        query: str,
+        parameters: Optional[List[Tuple]] = None,
+    ) -> bool:
+        logger.debug(
+            f"bulk insert or update query: {query}, "
+            f"parameters: {len(parameters or [])} rows"
+        )
+        with profile_query(
+            self.profiler, "execute_bulk_insert_or_update_query"
+        ) as profile:
+            with profile_connection(self.get_connection, profile) as conn:
+                try:
+                    with conn.cursor(cursor_factory=DictCursor) as cursor:
+                        extras.execute_values(cursor, query, parameters)
+                    profile["rows"] = len(parameters or [])
+                    conn.commit()
+                    return True
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    raise DatabaseException(
+                        message=f"failed to bulk insert or update query: {e}",
+                        detail=f"{query} {parameters}: {e}",
+                    )
+
+    def execute_select(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+    ) -> List[Dict[str, Any]]:
+        logger.debug(f"select query: {query}, parameters: {parameters}")
+        with profile_query(self.profiler, "execute_select") as profile:
+            with profile_connection(self.get_connection, profile) as conn:
                 with conn.cursor(cursor_factory=DictCursor) as cursor:
                     cursor.execute(query, parameters)
-                conn.commit()
-            except psycopg2.Error as e:
-                conn.rollback()
-                raise DatabaseException(
-                    message=f"failed to insert or update query: {e}",
-                    detail=f"{query} {parameters}: {e}",
+                    columns = [desc[0] for desc in cursor.description]
+                    records = cursor.fetchall()
+            rows = [dict(zip(columns, row)) for row in records]
+            profile["rows"] = len(rows)
+            profile["bytes"] = approximate_bytes(records)
+        logger.debug(f"selected {len(rows)} rows")
+        return rows
+
+    def execute_select_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        for columns, rows in self.__select_in_batches(
+            query=query,
+            parameters=parameters,
+            batch_size=batch_size,
+        ):
+            yield [dict(zip(columns, row)) for row in rows]
+
+    def execute_select_columns_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Dict[str, List[Any]]]:
+        for columns, rows in self.__select_in_batches(
+            query=query,
+            parameters=parameters,
+            batch_size=batch_size,
+        ):
+            yield {c: list(values) for c, values in zip(columns, zip(*rows))}
+
+    def execute_select_frame(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        dtypes: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        logger.debug(f"select frame query: {query}, parameters: {parameters}")
+        buffer = io.BytesIO()
+        with profile_query(self.profiler, "execute_select_frame") as profile:
+            with profile_connection(self.get_connection, profile) as conn:
+                try:
+                    with conn.cursor() as cursor:
+                        # COPY takes no bind parameters, so they are inlined by mogrify
+                        select_query = cursor.mogrify(
+                            query.strip().rstrip(";"), parameters
+                        ).decode()
+                        cursor.copy_expert(
+                            f"COPY ({select_query}) TO STDOUT "
+                            f"WITH (FORMAT csv, HEADER, NULL '{COPY_NULL}')",
+                            buffer,
+                        )
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    raise DatabaseException(
+                        message=f"failed to copy select query: {e}",
+                        detail=f"{query} {parameters}: {e}",
+                    )
+            buffer.seek(0)
+            # only NULL is missing; strings such as "NA" or "" stay as they are
+            df = pd.read_csv(
+                buffer,
+                dtype=dtypes,
+                keep_default_na=False,
+                na_values=[COPY_NULL],
+            )
+            profile["rows"] = len(df)
+            profile["bytes"] = buffer.getbuffer().nbytes
+        logger.debug(f"selected {len(df)} rows, {buffer.getbuffer().nbytes} bytes")
+        return df
+
+    def __select_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Tuple[List[str], List[Tuple]]]:
+        logger.debug(
+            f"select query: {query}, parameters: {parameters}, batch size: {batch_size}"
+        )
+        # only the time spent in the database counts, not that of the consumer
+        with profile_query(self.profiler, "execute_select_in_batches") as profile:
+            seconds = 0.0
+            start = time.perf_counter()
+            consuming = False
+            try:
+                with profile_connection(self.get_connection, profile) as conn:
+                    try:
+                        # a named cursor keeps the result on the server
+                        # and sends it in batches
+                        cursor_name = f"select_{uuid.uuid4().hex}"
+                        with conn.cursor(name=cursor_name) as cursor:
+                            cursor.itersize = batch_size
+                            cursor.execute(query, parameters)
+                            while True:
+                                rows = cursor.fetchmany(batch_size)
+                                if len(rows) == 0:
+                                    break
+                                columns = [desc[0] for desc in cursor.description]
+                                profile["rows"] += len(rows)
+                                profile["bytes"] += approximate_bytes(rows)
+                                seconds += time.perf_counter() - start
+                                consuming = True
+                                yield columns, rows
+                                consuming = False
+                                start = time.perf_counter()
+                    except psycopg2.Error as e:
+                        conn.rollback()
+                        raise DatabaseException(
+                            message=f"failed to select query: {e}",
+                            detail=f"{query} {parameters}: {e}",
+                        )
+            finally:
+                if not consuming:
+                    seconds += time.perf_counter() - start
+                profile["seconds"] = seconds
+
+
+class PooledPostgreSQLClient(PostgreSQLClient):
+    def __init__(
+        self,
+        min_connections: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        profiler: Optional[QueryProfiler] = None,
+    ):
+        """PostgreSQL client sharing a thread-safe pool of connections.
+
+        Args:
+            min_connections (Optional[int]): connections kept open. Defaults to
+                POSTGRES_POOL_MIN_CONNECTIONS or 1.
+            max_connections (Optional[int]): upper bound of open connections. Defaults
+                to POSTGRES_POOL_MAX_CONNECTIONS or 4.
+            profiler (Optional[QueryProfiler]): profiler recording each query. A new one
+                if None.
+        """
+        super().__init__(profiler=profiler)
+        self.min_connections = (
+            min_connections
+            if min_connections is not None
+            else int(os.getenv("POSTGRES_POOL_MIN_CONNECTIONS", 1))
+        )
+        self.max_connections = max(
+            (
+                max_connections
+                if max_connections is not None
+                else int(os.getenv("POSTGRES_POOL_MAX_CONNECTIONS", 4))
+            ),
+            self.min_connections,
+            1,
+        )
+        self.__pool: Optional[pool.ThreadedConnectionPool] = None
+        # ThreadedConnectionPool raises instead of blocking when exhausted
+        self.__available = threading.BoundedSemaphore(self.max_connections)
+        self.__lock = threading.Lock()
+        self.__connection_ids: set = set()
+        self.__checkouts = 0
+        self.__waits = 0
+        self.__wait_seconds = 0.0
+        self.__discarded = 0
+
+    def __get_pool(self) -> pool.ThreadedConnectionPool:
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = pool.ThreadedConnectionPool(
+                    self.min_connections,
+                    self.max_connections,
+                    self.connection_string,
                 )
+            return self.__pool
+
+    @contextmanager
+    def get_connection(self) -> Iterator[Any]:
+        connection_pool = self.__get_pool()
+        start = time.perf_counter()
+        waited = not self.__available.acquire(blocking=False)
+        if waited:
+            self.__available.acquire()
+        wait_seconds = time.perf_counter() - start
+        try:
+            conn = connection_pool.getconn()
+        except psycopg2.Error as e:
+            self.__available.release()
+            raise DatabaseException(
+                message=f"failed to get connection from pool: {e}",
+                detail=f"{e}",
+            )
+        with self.__lock:
+            self.__checkouts += 1
+            if waited:
+                self.__waits += 1
+                self.__wait_seconds += wait_seconds
+            self.__connection_ids.add(id(conn))
+
+        broken = False
+        try:
+            with conn:
+                yield conn
+        except psycopg2.Error:
+            broken = bool(conn.closed)
+            raise
+        finally:
+            broken = broken or bool(conn.closed)
+            if broken:
+                with self.__lock:
+                    self.__discarded += 1
+                    self.__connection_ids.discard(id(conn))
+            connection_pool.putconn(conn, close=broken)
+            self.__available.release()
+
+    def stats(self) -> Dict[str, float]:
+        with self.__lock:
+            connections = len(self.__connection_ids) + self.__discarded
+            return {
+                "checkouts": self.__checkouts,
+                "connections": connections,
+                "reuses": self.__checkouts - connections,
+                "waits": self.__waits,
+                "wait_seconds": self.__wait_seconds,
+                "discarded": self.__discarded,
+            }
+
+    def close(self):
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.closeall()
+                self.__pool = None
+
+
+class SQLiteClient(AbstractDBClient):
+    def __init__(
+        self,
+        database_path: Optional[str] = None,
+        profiler: Optional[QueryProfiler] = None,
+    ):
+        """Client of a file-backed SQLite database populated by data_registration.
+
+        Queries are written for PostgreSQL; placeholders are translated, while
+        features without an SQLite counterpart raise DatabaseException.
+
+        Args:
+            database_path (Optional[str]): database file. Defaults to
+                SQLITE_DATABASE_PATH or movielens.sqlite3.
+            profiler (Optional[QueryProfiler]): profiler recording each query. A new one
+                if None.
+        """
+        self.database_path = (
+            database_path
+            if database_path is not None
+            else os.getenv("SQLITE_DATABASE_PATH", "movielens.sqlite3")
+        )
+        self.timeout = float(os.getenv("SQLITE_TIMEOUT", 60))
+        self.profiler = profiler if profiler is not None else QueryProfiler()
+
+    @contextmanager
+    def get_connection(self) -> Iterator[sqlite3.Connection]:
+        # a connection per query, so that threads never share one
+        conn = sqlite3.connect(self.database_path, timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def to_sqlite_query(self, query: str) -> str:
+        return query.replace("%s", "?")
+
+    def execute_create_query(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+    ):
+        logger.debug(f"create query: {query}, parameters: {parameters}")
+        with profile_query(self.profiler, "execute_create_query") as profile:
+            with profile_connection(self.get_connection, profile) as conn:
+                try:
+                    cursor = conn.execute(self.to_sqlite_query(query), parameters or ())
+                    profile["rows"] = max(cursor.rowcount, 0)
+                    conn.commit()
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    raise DatabaseException(
+                        message=f"failed to insert or update query: {e}",
+                        detail=f"{query} {parameters}: {e}",
+                    )
 
     def execute_bulk_insert_or_update_query(
         self,
         query: str,
         parameters: Optional[List[Tuple]] = None,
     ) -> bool:
-        logger.debug(f"bulk insert or update query: {query}, parameters: {parameters}")
-        with self.get_connection() as conn:
-            try:
-                with conn.cursor(cursor_factory=DictCursor) as cursor:
-                    extras.execute_values(cursor, query, parameters)
-                conn.commit()
-                return True
-            except psycopg2.Error as e:
-                conn.rollback()
-                raise DatabaseException(
-                    message=f"failed to bulk insert or update query: {e}",
-                    detail=f"{query} {parameters}: {e}",
-                )
+        logger.debug(
+            f"bulk insert or update query: {query}, "
+            f"parameters: {len(parameters or [])} rows"
+        )
+        parameters = parameters or []
+        if len(parameters) == 0:
+            return True
+        # VALUES %s of execute_values becomes one placeholder row per parameter
+        placeholders = "(" + ",".join("?" * len(parameters[0])) + ")"
+        sqlite_query = self.to_sqlite_query(query.replace("%s", placeholders, 1))
+        with profile_query(
+            self.profiler, "execute_bulk_insert_or_update_query"
+        ) as profile:
+            with profile_connection(self.get_connection, profile) as conn:
+                try:
+                    conn.executemany(sqlite_query, parameters)
+                    profile["rows"] = len(parameters)
+                    conn.commit()
+                    return True
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    raise DatabaseException(
+                        message=f"failed to bulk insert or update query: {e}",
+                        detail=f"{query} {len(parameters)} rows: {e}",
+                    )
 
     def execute_select(
         self,
@@ -100,10 +488,121 @@ class PostgreSQLClient(AbstractDBClient):
         parameters: Optional[Tuple] = None,
     ) -> List[Dict[str, Any]]:
         logger.debug(f"select query: {query}, parameters: {parameters}")
-        with self.get_connection() as conn:
-            with conn.cursor(cursor_factory=DictCursor) as cursor:
-                cursor.execute(query, parameters)
-                columns = [desc[0] for desc in cursor.description]
-                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        logger.debug(f"rows: {rows}")
+        with profile_query(self.profiler, "execute_select") as profile:
+            columns, records = self.__select(
+                query=query,
+                parameters=parameters,
+                profile=profile,
+            )
+            rows = [dict(zip(columns, row)) for row in records]
+            profile["rows"] = len(rows)
+            profile["bytes"] = approximate_bytes(records)
+        logger.debug(f"selected {len(rows)} rows")
         return rows
+
+    def execute_select_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        for columns, rows in self.__select_in_batches(
+            query=query,
+            parameters=parameters,
+            batch_size=batch_size,
+        ):
+            yield [dict(zip(columns, row)) for row in rows]
+
+    def execute_select_columns_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Dict[str, List[Any]]]:
+        for columns, rows in self.__select_in_batches(
+            query=query,
+            parameters=parameters,
+            batch_size=batch_size,
+        ):
+            yield {c: list(values) for c, values in zip(columns, zip(*rows))}
+
+    def execute_select_frame(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        dtypes: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        logger.debug(f"select frame query: {query}, parameters: {parameters}")
+        with profile_query(self.profiler, "execute_select_frame") as profile:
+            columns, records = self.__select(
+                query=query,
+                parameters=parameters,
+                profile=profile,
+            )
+            df = pd.DataFrame.from_records(records, columns=columns)
+            if dtypes is not None:
+                df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+            profile["rows"] = len(df)
+            profile["bytes"] = approximate_bytes(records)
+        logger.debug(f"selected {len(df)} rows")
+        return df
+
+    def __select(
+        self,
+        query: str,
+        parameters: Optional[Tuple],
+        profile: Dict[str, Any],
+    ) -> Tuple[List[str], List[Tuple]]:
+        with profile_connection(self.get_connection, profile) as conn:
+            try:
+                cursor = conn.execute(self.to_sqlite_query(query), parameters or ())
+                columns = [desc[0] for desc in cursor.description]
+                return columns, cursor.fetchall()
+            except sqlite3.Error as e:
+                raise DatabaseException(
+                    message=f"failed to select query: {e}",
+                    detail=f"{query} {parameters}: {e}",
+                )
+
+    def __select_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Tuple[List[str], List[Tuple]]]:
+        logger.debug(
+            f"select query: {query}, parameters: {parameters}, batch size: {batch_size}"
+        )
+        # only the time spent in the database counts, not that of the consumer
+        with profile_query(self.profiler, "execute_select_in_batches") as profile:
+            seconds = 0.0
+            start = time.perf_counter()
+            consuming = False
+            try:
+                with profile_connection(self.get_connection, profile) as conn:
+                    try:
+                        # sqlite steps through the result as rows are fetched
+                        cursor = conn.execute(
+                            self.to_sqlite_query(query), parameters or ()
+                        )
+                        columns = [desc[0] for desc in cursor.description]
+                        while True:
+                            rows = cursor.fetchmany(batch_size)
+                            if len(rows) == 0:
+                                break
+                            profile["rows"] += len(rows)
+                            profile["bytes"] += approximate_bytes(rows)
+                            seconds += time.perf_counter() - start
+                            consuming = True
+                            yield columns, rows
+                            consuming = False
+                            start = time.perf_counter()
+                    except sqlite3.Error as e:
+                        raise DatabaseException(
+                            message=f"failed to select query: {e}",
+                            detail=f"{query} {parameters}: {e}",
+                        )
+            finally:
+                if not consuming:
+                    seconds += time.perf_counter() - start
+                profile["seconds"] = seconds
@@ -0,0 +1,197 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.middleware.logger import configure_logger
+
+logger = configure_logger(__name__)
+
+NO_STAGE = "none"
+UNKNOWN_CALLER = "unknown"
+
+
+@dataclass(frozen=True)
+class QueryRecord:
+    stage: str
+    caller: str
+    method: str
+    seconds: float
+    connect_seconds: float
+    rows: int
+    bytes: int
+
+
+class QueryProfiler(object):
+    def __init__(self):
+        """Collect wall time, rows and bytes of each query by stage and caller."""
+        self.__lock = threading.Lock()
+        self.__records: List[QueryRecord] = []
+        # shared by all threads, so queries of worker threads count to the stage
+        self.__stage = NO_STAGE
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Attribute queries run inside the block to a stage.
+
+        Args:
+            name (str): name of the stage.
+        """
+        with self.__lock:
+            previous = self.__stage
+            self.__stage = name
+        try:
+            yield
+        finally:
+            with self.__lock:
+                self.__stage = previous
+
+    def record(
+        self,
+        method: str,
+        seconds: float,
+        connect_seconds: float,
+        rows: int,
+        bytes: int,
+    ):
+        """Record a query.
+
+        Args:
+            method (str): method of the client running the query.
+            seconds (float): wall time of the query including connection setup.
+            connect_seconds (float): time to get a connection.
+            rows (int): rows returned or affected.
+            bytes (int): approximate size of the result.
+        """
+        caller = find_caller()
+        with self.__lock:
+            record = QueryRecord(
+                stage=self.__stage,
+                caller=caller,
+                method=method,
+                seconds=seconds,
+                connect_seconds=connect_seconds,
+                rows=rows,
+                bytes=bytes,
+            )
+            self.__records.append(record)
+        logger.debug(f"query: {record}")
+
+    def records(self) -> List[QueryRecord]:
+        with self.__lock:
+            return list(self.__records)
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Sum up queries by stage and caller.
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, float]]]: queries, seconds, connect_seconds, rows and bytes by stage and caller.
+        """
+        summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for r in self.records():
+            total = summary.setdefault(r.stage, {}).setdefault(
+                r.caller,
+                {
+                    "queries": 0,
+                    "seconds": 0.0,
+                    "connect_seconds": 0.0,
+                    "rows": 0,
+                    "bytes": 0,
+                },
+            )
+            total["queries"] += 1
+            total["seconds"] += r.seconds
+            total["connect_seconds"] += r.connect_seconds
+            total["rows"] += r.rows
+            total["bytes"] += r.bytes
+        return summary
+
+    def log_summary(self, stage: Optional[str] = None):
+        """Log the summary of a stage, or of all stages if None.
+
+        Args:
+            stage (Optional[str]): name of the stage.
+        """
+        for stage_name, callers in self.summary().items():
+            if stage is not None and stage_name != stage:
+                continue
+            lines = [
+                f"{caller}: {t['queries']} queries, {t['seconds']:.3f} sec "
+                f"(connect {t['connect_seconds']:.3f} sec), {t['rows']} rows, "
+                f"{t['bytes'] / 1024 / 1024:.2f} MiB"
+                for caller, t in sorted(
+                    callers.items(), key=lambda c: c[1]["seconds"], reverse=True
+                )
+            ]
+            logger.info(f"database time of stage {stage_name}:\n" + "\n".join(lines))
+
+    def metrics(self) -> Dict[str, float]:
+        """Aggregate the summary into flat metrics of each stage and the whole run.
+
+        Returns:
+            Dict[str, float]: metrics named db_<stage>_<name> and db_total_<name>.
+        """
+        metrics: Dict[str, float] = {}
+        for stage_name, callers in self.summary().items():
+            for total in callers.values():
+                for name, value in total.items():
+                    for key in [f"db_{stage_name}_{name}", f"db_total_{name}"]:
+                        metrics[key] = metrics.get(key, 0) + value
+        return metrics
+
+
+@contextmanager
+def profile_query(
+    profiler: QueryProfiler,
+    method: str,
+) -> Iterator[Dict[str, Any]]:
+    # filled in by the query; "seconds" replaces the wall time if set
+    profile: Dict[str, Any] = {"connect_seconds": 0.0, "rows": 0, "bytes": 0}
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profiler.record(
+            method=method,
+            seconds=profile.pop("seconds", time.perf_counter() - start),
+            **profile,
+        )
+
+
+@contextmanager
+def profile_connection(
+    get_connection: Callable[[], Any],
+    profile: Dict[str, Any],
+) -> Iterator[Any]:
+    start = time.perf_counter()
+    with get_connection() as conn:
+        profile["connect_seconds"] += time.perf_counter() - start
+        yield conn
+
+
+def find_caller() -> str:
+    # the closest method of a repository or usecase on the stack, else its function
+    frame: Any = sys._getframe(1)
+    fallback = UNKNOWN_CALLER
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("src.") and not module.startswith(
+            "src.infrastructure.database"
+        ):
+            instance = frame.f_locals.get("self")
+            if instance is not None:
+                return f"{type(instance).__name__}.{frame.f_code.co_name}"
+            if fallback == UNKNOWN_CALLER:
+                fallback = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback
+
+
+def approximate_bytes(rows: List[Any]) -> int:
+    # the text size of the first row stands for all rows
+    if len(rows) == 0:
+        return 0
+    row = rows[0].values() if isinstance(rows[0], dict) else rows[0]
+    return sum(len(str(v)) + 1 for v in row) * len(rows)
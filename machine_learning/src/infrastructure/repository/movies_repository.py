@@ -1,8 +1,17 @@
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 from src.domain.repository.movies_repository import AbstractMoviesRepository
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.repository.query_builder import (
+    build_fingerprint_query,
+    build_select_query,
+)
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
 from src.infrastructure.schema.movies_schema import Movies
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.tables_schema import TABLES
 
 
@@ -13,11 +22,14 @@ class MoviesRepository(AbstractMoviesRepository):
     ):
         super().__init__(db_client=db_client)
         self.table_name = TABLES.MOVIES.value
+        self.columns = list(Movies.model_fields.keys())
+        self.primary_keys = ["movie_id"]
+        self.tags_table_name = TABLES.TAGS.value
 
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Movies]:
         query = f"""
         SELECT
@@ -28,15 +40,119 @@ class MoviesRepository(AbstractMoviesRepository):
             {self.table_name}
         """
 
+        parameters: Optional[Tuple[int, ...]] = None
+        if after is not None:
+            query += f"""
+        WHERE
+            {self.table_name}.movie_id > %s
+        """
+            parameters = tuple(after)
+
+        # keyset pagination on the primary key, which is served by its index
         query += f"""
+        ORDER BY
+            {self.table_name}.movie_id
         LIMIT
             {limit}
-        OFFSET
-            {offset}
         ;
         """
         records = self.db_client.execute_select(
             query=query,
+            parameters=parameters,
         )
         data = [Movies(**r) for r in records]
         return data
+
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Movies]]:
+        if query_filter is not None and query_filter.columns is not None:
+            raise ValueError("columns can be selected only into a frame")
+        query, _, parameters = build_select_query(
+            table_name=self.table_name,
+            columns=self.columns,
+            order_by=self.primary_keys,
+            query_filter=query_filter,
+        )
+        for records in self.db_client.execute_select_in_batches(
+            query=query,
+            parameters=parameters,
+            batch_size=batch_size,
+        ):
+            yield [Movies(**r) for r in records]
+
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> pd.DataFrame:
+        query, columns, parameters = build_select_query(
+            table_name=self.table_name,
+            columns=self.columns,
+            order_by=self.primary_keys,
+            query_filter=query_filter,
+        )
+        dtypes = Movies.dtypes()
+        return self.db_client.execute_select_frame(
+            query=query,
+            parameters=parameters,
+            dtypes={c: dtypes[c] for c in columns},
+        )
+
+    def select_movies_tags_frame(self) -> pd.DataFrame:
+        # tags are lowercased and collected per movie in the database,
+        # so only one row per movie is transferred
+        query = f"""
+        SELECT
+            {self.table_name}.movie_id as movie_id,
+            {self.table_name}.title as title,
+            string_to_array({self.table_name}.genre, '|') as genre,
+            movie_tags.tag as tag
+        FROM
+            {self.table_name}
+        LEFT JOIN
+            (
+                SELECT
+                    {self.tags_table_name}.movie_id as movie_id,
+                    array_agg(
+                        lower({self.tags_table_name}.tag)
+                        ORDER BY {self.tags_table_name}.user_id
+                    ) as tag
+                FROM
+                    {self.tags_table_name}
+                GROUP BY
+                    {self.tags_table_name}.movie_id
+            ) AS movie_tags
+        ON
+            {self.table_name}.movie_id = movie_tags.movie_id
+        ORDER BY
+            {self.table_name}.movie_id
+        ;
+        """
+        columns: Dict[str, List] = {
+            "movie_id": [],
+            "title": [],
+            "genre": [],
+            "tag": [],
+        }
+        for batch in self.db_client.execute_select_columns_in_batches(
+            query=query,
+        ):
+            for name, values in columns.items():
+                values.extend(batch[name])
+        df = pd.DataFrame(columns)
+        df["movie_id"] = df["movie_id"].astype(Movies.dtypes()["movie_id"])
+        # movies without tags are NaN, as with a left merge in pandas
+        df["tag"] = df["tag"].where(df["tag"].notna(), np.nan)
+        return df
+
+    def select_fingerprint(self) -> TableFingerprint:
+        query = build_fingerprint_query(
+            table_name=self.table_name,
+            columns=self.columns,
+        )
+        records = self.db_client.execute_select(
+            query=query,
+        )
+        return TableFingerprint(**records[0])
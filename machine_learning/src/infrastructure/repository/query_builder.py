@@ -0,0 +1,105 @@
+from typing import Any, List, Optional, Tuple
+
+from src.infrastructure.schema.fingerprint_schema import ROW_HASH
+from src.infrastructure.schema.query_schema import QueryFilter
+
+
+def build_select_query(
+    table_name: str,
+    columns: List[str],
+    order_by: List[str],
+    query_filter: Optional[QueryFilter] = None,
+    row_hash: bool = False,
+) -> Tuple[str, List[str], Optional[Tuple[Any, ...]]]:
+    query_filter = query_filter if query_filter is not None else QueryFilter()
+    selected = query_filter.columns if query_filter.columns is not None else columns
+    unknown = [c for c in selected if c not in columns]
+    if len(selected) == 0 or len(unknown) > 0:
+        raise ValueError(f"invalid columns for {table_name}: {selected}")
+
+    parameters: List[Any] = []
+    sample = ""
+    if query_filter.sample_percent is not None:
+        sample = f"TABLESAMPLE {query_filter.sample_method.value} (%s)"
+        parameters.append(query_filter.sample_percent)
+        if query_filter.sample_seed is not None:
+            sample += " REPEATABLE (%s)"
+            parameters.append(query_filter.sample_seed)
+
+    # every filter is evaluated in the database, ranges are half-open
+    conditions: List[str] = []
+    if query_filter.user_id_range is not None:
+        require_column(table_name=table_name, columns=columns, column="user_id")
+        conditions.append(f"{table_name}.user_id >= %s")
+        conditions.append(f"{table_name}.user_id < %s")
+        parameters.extend(query_filter.user_id_range)
+    if query_filter.user_ids is not None:
+        require_column(table_name=table_name, columns=columns, column="user_id")
+        conditions.append(f"{table_name}.user_id = ANY(%s)")
+        parameters.append(list(query_filter.user_ids))
+    if query_filter.timestamp_range is not None:
+        require_column(table_name=table_name, columns=columns, column="timestamp")
+        conditions.append(f"{table_name}.timestamp >= %s")
+        conditions.append(f"{table_name}.timestamp < %s")
+        parameters.extend(query_filter.timestamp_range)
+    if query_filter.created_since is not None:
+        conditions.append(f"{table_name}.created_at >= %s")
+        parameters.append(query_filter.created_since)
+
+    select = ",\n            ".join(f"{table_name}.{c} as {c}" for c in selected)
+    if row_hash:
+        # hashed over every column, the same as the fingerprint checksum
+        row = build_row_hash(table_name=table_name, columns=columns)
+        select += f",\n            {row} as {ROW_HASH}"
+    where = ""
+    if len(conditions) > 0:
+        where = "WHERE\n            " + "\n            AND ".join(conditions)
+    order = ",\n            ".join(f"{table_name}.{c}" for c in order_by)
+    query = f"""
+        SELECT
+            {select}
+        FROM
+            {table_name} {sample}
+        {where}
+        ORDER BY
+            {order}
+        ;
+        """
+    return query, selected, tuple(parameters) if len(parameters) > 0 else None
+
+
+def build_row_hash(
+    table_name: str,
+    columns: List[str],
+) -> str:
+    row = ", ".join(f"{table_name}.{c}" for c in columns)
+    return f"hashtext(ROW({row})::text)"
+
+
+def build_fingerprint_query(
+    table_name: str,
+    columns: List[str],
+) -> str:
+    # an order independent checksum catches updates that keep created_at
+    return f"""
+        SELECT
+            '{table_name}' as table_name,
+            COUNT(*) as rows,
+            MAX({table_name}.created_at) as max_created_at,
+            COALESCE(
+                SUM({build_row_hash(table_name=table_name, columns=columns)}),
+                0
+            ) as checksum
+        FROM
+            {table_name}
+        ;
+        """
+
+
+def require_column(
+    table_name: str,
+    columns: List[str],
+    column: str,
+):
+    if column not in columns:
+        raise ValueError(f"{table_name} cannot be filtered by {column}")
@@ -1,7 +1,15 @@
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
 
 from src.domain.repository.ratings_repository import AbstractRatingsRepository
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.repository.query_builder import (
+    build_fingerprint_query,
+    build_select_query,
+)
+from src.infrastructure.schema.fingerprint_schema import ROW_HASH, TableFingerprint
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.ratings_schema import Ratings
 from src.infrastructure.schema.tables_schema import TABLES
 
@@ -13,11 +21,13 @@ class RatingsRepository(AbstractRatingsRepository):
     ):
         super().__init__(db_client=db_client)
         self.table_name = TABLES.RATINGS.value
+        self.columns = list(Ratings.model_fields.keys())
+        self.primary_keys = ["user_id", "movie_id"]
 
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Ratings]:
         query = f"""
         SELECT
@@ -29,15 +39,140 @@ class RatingsRepository(AbstractRatingsRepository):
             {self.table_name}
         """
 
+        parameters: Optional[Tuple[int, ...]] = None
+        if after is not None:
+            query += f"""
+        WHERE
+            ({self.table_name}.user_id, {self.table_name}.movie_id) > (%s, %s)
+        """
+            parameters = tuple(after)
+
+        # keyset pagination on the primary key, which is served by its index
         query += f"""
+        ORDER BY
+            {self.table_name}.user_id,
+            {self.table_name}.movie_id
         LIMIT
             {limit}
-        OFFSET
-            {offset}
         ;
         """
         records = self.db_client.execute_select(
             query=query,
+            parameters=parameters,
         )
         data = [Ratings(**r) for r in records]
         return data
+
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Ratings]]:
+        if query_filter is not None and query_filter.columns is not None:
+            raise ValueError("columns can be selected only into a frame")
+        query, _, parameters = build_select_query(
+            table_name=self.table_name,
+            columns=self.columns,
+            order_by=self.primary_keys,
+            query_filter=query_filter,
+        )
+        for records in self.db_client.execute_select_in_batches(
+            query=query,
+            parameters=parameters,
+            batch_size=batch_size,
+        ):
+            yield [Ratings(**r) for r in records]
+
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+        row_hash: bool = False,
+    ) -> pd.DataFrame:
+        query, columns, parameters = build_select_query(
+            table_name=self.table_name,
+            columns=self.columns,
+            order_by=self.primary_keys,
+            query_filter=query_filter,
+            row_hash=row_hash,
+        )
+        dtypes = Ratings.dtypes()
+        frame_dtypes = {c: dtypes[c] for c in columns}
+        if row_hash:
+            frame_dtypes[ROW_HASH] = int
+        return self.db_client.execute_select_frame(
+            query=query,
+            parameters=parameters,
+            dtypes=frame_dtypes,
+        )
+
+    def select_user_id_range(self) -> Optional[Tuple[int, int]]:
+        query = f"""
+        SELECT
+            MIN({self.table_name}.user_id) as min_user_id,
+            MAX({self.table_name}.user_id) as max_user_id
+        FROM
+            {self.table_name}
+        ;
+        """
+        records = self.db_client.execute_select(
+            query=query,
+        )
+        if len(records) == 0 or records[0]["min_user_id"] is None:
+            return None
+        return int(records[0]["min_user_id"]), int(records[0]["max_user_id"])
+
+    def select_rating_statistics(
+        self,
+        group_by: str,
+        validation_records: int,
+    ) -> pd.DataFrame:
+        if group_by not in ["user_id", "movie_id"]:
+            raise ValueError(f"invalid group_by: {group_by}")
+        # same ranking as PreprocessUsecase.split_records, where ties of timestamp
+        # keep the loaded order of movie_id
+        query = f"""
+        WITH ranked AS (
+            SELECT
+                {self.table_name}.user_id as user_id,
+                {self.table_name}.movie_id as movie_id,
+                {self.table_name}.rating as rating,
+                ROW_NUMBER() OVER (
+                    PARTITION BY
+                        {self.table_name}.user_id
+                    ORDER BY
+                        {self.table_name}.timestamp DESC,
+                        {self.table_name}.movie_id
+                ) as timestamp_rank
+            FROM
+                {self.table_name}
+        )
+        SELECT
+            ranked.{group_by} as {group_by},
+            MIN(ranked.rating) as min,
+            MAX(ranked.rating) as max,
+            AVG(ranked.rating) as mean
+        FROM
+            ranked
+        WHERE
+            ranked.timestamp_rank > %s
+        GROUP BY
+            ranked.{group_by}
+        ORDER BY
+            ranked.{group_by}
+        ;
+        """
+        return self.db_client.execute_select_frame(
+            query=query,
+            parameters=(validation_records,),
+            dtypes={group_by: int, "min": float, "max": float, "mean": float},
+        )
+
+    def select_fingerprint(self) -> TableFingerprint:
+        query = build_fingerprint_query(
+            table_name=self.table_name,
+            columns=self.columns,
+        )
+        records = self.db_client.execute_select(
+            query=query,
+        )
+        return TableFingerprint(**records[0])
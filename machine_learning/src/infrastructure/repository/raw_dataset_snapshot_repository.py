@@ -0,0 +1,252 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.domain.model.common_data import DTYPES
+from src.domain.model.raw_data import (
+    RawDataset,
+    convert_movies_tags_data,
+    convert_ratings_data,
+)
+from src.domain.repository.raw_dataset_snapshot_repository import (
+    AbstractRawDatasetSnapshotRepository,
+)
+from src.infrastructure.schema.fingerprint_schema import ROW_HASH, TableFingerprint
+from src.middleware.logger import configure_logger
+
+logger = configure_logger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+RATINGS_DIR = "ratings_data"
+MOVIES_TAGS_FILE = "movies_tags_data.parquet"
+LIST_COLUMNS = ["genre", "tag"]
+RATINGS_KEYS = ["user_id", "movie_id"]
+
+
+class ParquetRawDatasetSnapshotRepository(AbstractRawDatasetSnapshotRepository):
+    def __init__(
+        self,
+        snapshot_dir: str,
+        partition_users: int = 10000,
+    ):
+        super().__init__(snapshot_dir=snapshot_dir)
+        self.partition_users = partition_users
+        os.makedirs(self.path(RATINGS_DIR), exist_ok=True)
+
+    def path(self, *names: str) -> str:
+        return os.path.join(self.snapshot_dir, *names)
+
+    def partition_name(self, user_id: int) -> str:
+        # ratings are partitioned by user_id range, so deltas touch few files
+        return f"part-{user_id // self.partition_users:06d}.parquet"
+
+    def load_manifest(self) -> Optional[Dict]:
+        path = self.path(MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                manifest = json.load(f)
+        except ValueError as e:
+            logger.warning(f"ignore broken snapshot manifest {path}: {e}")
+            return None
+        if "fingerprints" not in manifest or "ratings_partitions" not in manifest:
+            logger.warning(f"ignore snapshot manifest {path} of another format")
+            return None
+        return manifest
+
+    def save_manifest(self, manifest: Dict):
+        path = self.path(MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def load_fingerprints(self) -> Optional[List[TableFingerprint]]:
+        manifest = self.load_manifest()
+        if manifest is None:
+            return None
+        return [TableFingerprint(**f) for f in manifest["fingerprints"].values()]
+
+    def load(self) -> Optional[RawDataset]:
+        manifest = self.load_manifest()
+        if manifest is None:
+            return None
+
+        ratings_dfs = [
+            pd.read_parquet(self.path(RATINGS_DIR, name))
+            for name in sorted(manifest["ratings_partitions"])
+        ]
+        if len(ratings_dfs) == 0:
+            return None
+        # row hashes only verify refreshes, they are not part of the dataset
+        ratings_df = pd.concat(ratings_dfs, ignore_index=True).drop(
+            columns=[ROW_HASH],
+            errors="ignore",
+        )
+        movies_tags_df = pd.read_parquet(self.path(MOVIES_TAGS_FILE))
+        # parquet lists are read back as arrays and missing lists as None
+        for column in LIST_COLUMNS:
+            movies_tags_df[column] = [
+                list(v) if v is not None else np.nan for v in movies_tags_df[column]
+            ]
+        logger.info(
+            f"loaded snapshot of {len(ratings_dfs)} ratings partitions "
+            f"from {self.snapshot_dir}"
+        )
+        return RawDataset(
+            ratings_data=ratings_df,
+            movies_tags_data=movies_tags_df,
+            dtypes=manifest_dtypes(manifest=manifest),
+        )
+
+    def save(
+        self,
+        raw_dataset: RawDataset,
+        fingerprints: List[TableFingerprint],
+        row_hashes: pd.DataFrame,
+    ):
+        # a partial save is never loaded, as the manifest is written last
+        manifest_path = self.path(MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for name in os.listdir(self.path(RATINGS_DIR)):
+            os.remove(self.path(RATINGS_DIR, name))
+
+        # rows missing from row_hashes get 0, so the checksum of the snapshot no
+        # longer matches the table and its next refresh reloads it
+        ratings_data = raw_dataset.ratings_data.merge(
+            row_hashes[RATINGS_KEYS + [ROW_HASH]],
+            on=RATINGS_KEYS,
+            how="left",
+        )
+        ratings_data[ROW_HASH] = ratings_data[ROW_HASH].fillna(0).astype(np.int64)
+        ratings_partitions, ratings_checksums = self.write_ratings_partitions(
+            ratings_data=ratings_data,
+            ratings_partitions={},
+            ratings_checksums={},
+        )
+        self.write_parquet(
+            df=raw_dataset.movies_tags_data,
+            path=self.path(MOVIES_TAGS_FILE),
+        )
+        self.save_manifest(
+            manifest={
+                "fingerprints": to_json(fingerprints=fingerprints),
+                "ratings_partitions": ratings_partitions,
+                "ratings_checksums": ratings_checksums,
+                "dtypes": raw_dataset.dtypes,
+            }
+        )
+        logger.info(
+            f"saved snapshot of {len(ratings_partitions)} ratings partitions "
+            f"to {self.snapshot_dir}"
+        )
+
+    def merge_ratings(
+        self,
+        ratings_data: pd.DataFrame,
+    ) -> int:
+        manifest = self.load_manifest()
+        if manifest is None:
+            raise ValueError(f"no snapshot to merge ratings into: {self.snapshot_dir}")
+
+        ratings_partitions, ratings_checksums = self.write_ratings_partitions(
+            ratings_data=convert_ratings_data(
+                ratings_data=ratings_data,
+                dtypes=manifest_dtypes(manifest=manifest),
+            ),
+            ratings_partitions=manifest["ratings_partitions"],
+            ratings_checksums=manifest.get("ratings_checksums", {}),
+        )
+        # the fingerprints are kept until the whole refresh is done; merging the
+        # same rows again after an interruption leaves partitions unchanged
+        manifest["ratings_partitions"] = ratings_partitions
+        manifest["ratings_checksums"] = ratings_checksums
+        self.save_manifest(manifest=manifest)
+        return sum(ratings_partitions.values())
+
+    def load_ratings_checksum(self) -> Optional[int]:
+        manifest = self.load_manifest()
+        if manifest is None:
+            return None
+        # snapshots saved before row hashes were kept cannot be verified
+        ratings_checksums = manifest.get("ratings_checksums", {})
+        if ratings_checksums.keys() != manifest["ratings_partitions"].keys():
+            return None
+        return sum(ratings_checksums.values())
+
+    def save_movies_tags(
+        self,
+        movies_tags_data: pd.DataFrame,
+    ):
+        manifest = self.load_manifest()
+        if manifest is not None:
+            movies_tags_data = convert_movies_tags_data(
+                movies_tags_data=movies_tags_data,
+                dtypes=manifest_dtypes(manifest=manifest),
+            )
+        self.write_parquet(df=movies_tags_data, path=self.path(MOVIES_TAGS_FILE))
+        logger.info(f"saved movies_tags snapshot to {self.snapshot_dir}")
+
+    def save_fingerprints(
+        self,
+        fingerprints: List[TableFingerprint],
+    ):
+        manifest = self.load_manifest()
+        if manifest is None:
+            raise ValueError(f"no snapshot to save fingerprints: {self.snapshot_dir}")
+        manifest["fingerprints"] = to_json(fingerprints=fingerprints)
+        self.save_manifest(manifest=manifest)
+
+    def write_ratings_partitions(
+        self,
+        ratings_data: pd.DataFrame,
+        ratings_partitions: Dict[str, int],
+        ratings_checksums: Dict[str, int],
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        if ROW_HASH not in ratings_data.columns:
+            raise ValueError(f"ratings to write into snapshot need {ROW_HASH}")
+        ratings_partitions = dict(ratings_partitions)
+        ratings_checksums = dict(ratings_checksums)
+        partition_keys = ratings_data.user_id // self.partition_users
+        for _, df in ratings_data.groupby(partition_keys, sort=True):
+            name = self.partition_name(user_id=int(df.user_id.iloc[0]))
+            path = self.path(RATINGS_DIR, name)
+            if name in ratings_partitions:
+                # rows of the delta replace snapshot rows with the same key
+                df = pd.concat([pd.read_parquet(path), df], ignore_index=True)
+                df = df.drop_duplicates(subset=RATINGS_KEYS, keep="last")
+            df = df.sort_values(RATINGS_KEYS).reset_index(drop=True)
+            self.write_parquet(df=df, path=path)
+            ratings_partitions[name] = len(df)
+            if df[ROW_HASH].isna().any():
+                # rows of a partition saved without row hashes
+                ratings_checksums.pop(name, None)
+            else:
+                ratings_checksums[name] = int(df[ROW_HASH].sum())
+            logger.debug(f"wrote ratings partition {name}: {len(df)} rows")
+        return ratings_partitions, ratings_checksums
+
+    def write_parquet(
+        self,
+        df: pd.DataFrame,
+        path: str,
+    ):
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+def manifest_dtypes(manifest: Dict) -> str:
+    # snapshots saved before dtypes were recorded hold default dtypes
+    return manifest.get("dtypes", DTYPES.DEFAULT.value)
+
+
+def to_json(fingerprints: List[TableFingerprint]) -> Dict[str, Dict]:
+    return {f.table_name: f.model_dump(mode="json") for f in fingerprints}
@@ -1,7 +1,15 @@
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
 
 from src.domain.repository.tags_repository import AbstractTagsRepository
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.repository.query_builder import (
+    build_fingerprint_query,
+    build_select_query,
+)
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.tables_schema import TABLES
 from src.infrastructure.schema.tags_schema import Tags
 
@@ -13,11 +21,13 @@ class TagsRepository(AbstractTagsRepository):
     ):
         super().__init__(db_client=db_client)
         self.table_name = TABLES.TAGS.value
+        self.columns = list(Tags.model_fields.keys())
+        self.primary_keys = ["user_id", "movie_id"]
 
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Tags]:
         query = f"""
         SELECT
@@ -29,15 +39,73 @@ class TagsRepository(AbstractTagsRepository):
             {self.table_name}
         """
 
+        parameters: Optional[Tuple[int, ...]] = None
+        if after is not None:
+            query += f"""
+        WHERE
+            ({self.table_name}.user_id, {self.table_name}.movie_id) > (%s, %s)
+        """
+            parameters = tuple(after)
+
+        # keyset pagination on the primary key, which is served by its index
         query += f"""
+        ORDER BY
+            {self.table_name}.user_id,
+            {self.table_name}.movie_id
         LIMIT
             {limit}
-        OFFSET
-            {offset}
         ;
         """
         records = self.db_client.execute_select(
             query=query,
+            parameters=parameters,
         )
         data = [Tags(**r) for r in records]
         return data
+
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Tags]]:
+        if query_filter is not None and query_filter.columns is not None:
+            raise ValueError("columns can be selected only into a frame")
+        query, _, parameters = build_select_query(
+            table_name=self.table_name,
+            columns=self.columns,
+            order_by=self.primary_keys,
+            query_filter=query_filter,
+        )
+        for records in self.db_client.execute_select_in_batches(
+            query=query,
+            parameters=parameters,
+            batch_size=batch_size,
+        ):
+            yield [Tags(**r) for r in records]
+
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> pd.DataFrame:
+        query, columns, parameters = build_select_query(
+            table_name=self.table_name,
+            columns=self.columns,
+            order_by=self.primary_keys,
+            query_filter=query_filter,
+        )
+        dtypes = Tags.dtypes()
+        return self.db_client.execute_select_frame(
+            query=query,
+            parameters=parameters,
+            dtypes={c: dtypes[c] for c in columns},
+        )
+
+    def select_fingerprint(self) -> TableFingerprint:
+        query = build_fingerprint_query(
+            table_name=self.table_name,
+            columns=self.columns,
+        )
+        records = self.db_client.execute_select(
+            query=query,
+        )
+        return TableFingerprint(**records[0])
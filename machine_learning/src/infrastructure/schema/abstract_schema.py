@@ -1,5 +1,9 @@
+from typing import Any, Dict
+
 from pydantic import BaseModel
 
 
 class AbstractSchema(BaseModel):
-    pass
+    @classmethod
+    def dtypes(cls) -> Dict[str, Any]:
+        return {name: field.annotation for name, field in cls.model_fields.items()}
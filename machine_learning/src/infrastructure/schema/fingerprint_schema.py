@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional
+
+from src.infrastructure.schema.abstract_schema import AbstractSchema
+
+# hash of a row, summed into TableFingerprint.checksum
+ROW_HASH = "row_hash"
+
+
+class TableFingerprint(AbstractSchema):
+    table_name: str
+    rows: int
+    max_created_at: Optional[datetime]
+    checksum: int
+
+    class Config:
+        frozen = True
+        extra = "forbid"
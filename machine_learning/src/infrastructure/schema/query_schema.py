@@ -0,0 +1,29 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class SAMPLE_METHOD(Enum):
+    BERNOULLI = "BERNOULLI"
+    SYSTEM = "SYSTEM"
+
+    @staticmethod
+    def get_list() -> List[str]:
+        return [v.value for v in SAMPLE_METHOD.__members__.values()]
+
+
+class QueryFilter(BaseModel):
+    columns: Optional[List[str]] = None
+    user_id_range: Optional[Tuple[int, int]] = None
+    user_ids: Optional[List[int]] = None
+    timestamp_range: Optional[Tuple[int, int]] = None
+    created_since: Optional[datetime] = None
+    sample_percent: Optional[float] = Field(default=None, gt=0, le=100)
+    sample_method: SAMPLE_METHOD = SAMPLE_METHOD.BERNOULLI
+    sample_seed: Optional[int] = None
+
+    class Config:
+        frozen = True
+        extra = "forbid"
@@ -1,18 +1,32 @@
 import os
+from typing import Any, Dict, Union, cast
 
 import mlflow  # type: ignore
-from omegaconf import DictConfig
+from omegaconf import DictConfig, OmegaConf
 
 import hydra
 from src.domain.algorithm.lightgbm_regressor import LightGBMRegression
 from src.domain.algorithm.models import get_model
-from src.domain.algorithm.preprocess import GenreExtractor, RatingsExtractor
+from src.domain.algorithm.preprocess import (
+    RATINGS_EXTRACTOR,
+    AbstractExtractor,
+    GenreExtractor,
+    RatingsExtractor,
+    SQLRatingsExtractor,
+)
 from src.domain.model.prediction_data import PredictionDataset
 from src.domain.model.training_data import TrainingDataset
-from src.infrastructure.database.db_client import PostgreSQLClient
+from src.infrastructure.database.db_client import (
+    PooledPostgreSQLClient,
+    SQLiteClient,
+)
 from src.infrastructure.repository.movies_repository import MoviesRepository
 from src.infrastructure.repository.ratings_repository import RatingsRepository
+from src.infrastructure.repository.raw_dataset_snapshot_repository import (
+    ParquetRawDatasetSnapshotRepository,
+)
 from src.infrastructure.repository.tags_repository import TagsRepository
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.middleware.logger import configure_logger
 from src.usecase.data_loader_usecase import DataLoaderUsecase
 from src.usecase.evaluation_usecase import EvaluationUsecase
@@ -39,6 +53,15 @@ def main(cfg: DictConfig):
     logger.info(
         f"""parameters:
     validation_records: {cfg.period.validation.user_recency_records}
+    database_sqlite_path: {cfg.database.sqlite_path}
+    data_loader: {cfg.data.loader}
+    data_workers: {cfg.data.workers}
+    data_ratings_partitions: {cfg.data.ratings_partitions}
+    data_movies_tags_loader: {cfg.data.movies_tags_loader}
+    data_snapshot_dir: {cfg.data.snapshot_dir}
+    data_ratings_filter: {cfg.data.ratings_filter}
+    data_dtypes: {cfg.data.dtypes}
+    ratings_extractor: {cfg.preprocess.ratings_extractor}
         """
     )
 
@@ -53,32 +76,93 @@ def main(cfg: DictConfig):
         mlflow.log_param(
             "validation_records", cfg.period.validation.user_recency_records
         )
-
-        db_client = PostgreSQLClient()
+        mlflow.log_param("data_loader", cfg.data.loader)
+        mlflow.log_param("data_dtypes", cfg.data.dtypes)
+        mlflow.log_param("ratings_extractor", cfg.preprocess.ratings_extractor)
+
+        db_client: Union[PooledPostgreSQLClient, SQLiteClient] = (
+            SQLiteClient(database_path=cfg.database.sqlite_path)
+            if cfg.database.sqlite_path is not None
+            else PooledPostgreSQLClient()
+        )
         movies_repository = MoviesRepository(db_client=db_client)
         ratings_repository = RatingsRepository(db_client=db_client)
         tags_repository = TagsRepository(db_client=db_client)
 
+        ratings_filter_config = cast(
+            Dict[str, Any],
+            OmegaConf.to_container(cfg.data.ratings_filter),
+        )
+        ratings_filter_params = {
+            k: v for k, v in ratings_filter_config.items() if v is not None
+        }
+        ratings_filter = (
+            QueryFilter(**ratings_filter_params)
+            if any(k != "sample_method" for k in ratings_filter_params)
+            else None
+        )
+        # statistics aggregated in database would include filtered out ratings
+        if (
+            ratings_filter is not None
+            and cfg.preprocess.ratings_extractor == RATINGS_EXTRACTOR.SQL.value
+        ):
+            raise ValueError("ratings_filter cannot be used with sql ratings_extractor")
+
         data_loader_usecase = DataLoaderUsecase(
             movies_repository=movies_repository,
             ratings_repository=ratings_repository,
             tags_repository=tags_repository,
+            loader=cfg.data.loader,
+            workers=cfg.data.workers,
+            ratings_partitions=cfg.data.ratings_partitions,
+            movies_tags_loader=cfg.data.movies_tags_loader,
+            snapshot_repository=(
+                ParquetRawDatasetSnapshotRepository(
+                    snapshot_dir=cfg.data.snapshot_dir,
+                )
+                if cfg.data.snapshot_dir is not None
+                else None
+            ),
+            ratings_filter=ratings_filter,
+            dtypes=cfg.data.dtypes,
         )
 
-        raw_dataset = data_loader_usecase.load_dataset()
+        with db_client.profiler.stage("load_dataset"):
+            raw_dataset = data_loader_usecase.load_dataset()
+        db_client.profiler.log_summary(stage="load_dataset")
 
-        ratings_extractor = RatingsExtractor()
+        ratings_extractor: AbstractExtractor
+        if cfg.preprocess.ratings_extractor == RATINGS_EXTRACTOR.SQL.value:
+            ratings_extractor = SQLRatingsExtractor(
+                ratings_repository=ratings_repository,
+                validation_records=cfg.period.validation.user_recency_records,
+                dtypes=cfg.data.dtypes,
+            )
+        elif cfg.preprocess.ratings_extractor == RATINGS_EXTRACTOR.PANDAS.value:
+            ratings_extractor = RatingsExtractor(dtypes=cfg.data.dtypes)
+        else:
+            raise ValueError(
+                f"invalid ratings extractor: {cfg.preprocess.ratings_extractor}. "
+                f"Choose from {RATINGS_EXTRACTOR.get_list()}"
+            )
         genre_extractor = GenreExtractor()
 
         preprocess_usecase = PreprocessUsecase(
             ratings_extractor=ratings_extractor,
             genre_extractor=genre_extractor,
+            dtypes=cfg.data.dtypes,
         )
 
-        preprocessed_dataset = preprocess_usecase.preprocess_dataset(
-            dataset=raw_dataset,
-            validation_records=cfg.period.validation.user_recency_records,
-        )
+        with db_client.profiler.stage("preprocess"):
+            preprocessed_dataset = preprocess_usecase.preprocess_dataset(
+                dataset=raw_dataset,
+                validation_records=cfg.period.validation.user_recency_records,
+            )
+        db_client.profiler.log_summary(stage="preprocess")
+        mlflow.log_metrics(db_client.profiler.metrics())
+        if isinstance(db_client, PooledPostgreSQLClient):
+            logger.info(f"connection pool stats: {db_client.stats()}")
+            db_client.close()
 
         training_data_paths = preprocessed_dataset.training_data.save(
             directory=cwd, prefix=f"{run_name}_training_"
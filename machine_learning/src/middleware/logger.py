@@ -1,7 +1,7 @@
 import logging
 import os
 
-LOG_LEVEL = os.getenv("LOG_LEVEL", logging.DEBUG)
+LOG_LEVEL = os.getenv("LOG_LEVEL", logging.INFO)
 
 
 def configure_logger(name) -> logging.Logger:
@@ -1,25 +1,65 @@
-from typing import List
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import List, Optional, Tuple
 
 import pandas as pd
 
-from src.domain.model.raw_data import RawDataset
+from src.domain.model.common_data import DTYPES
+from src.domain.model.raw_data import (
+    RawDataset,
+    convert_movies_tags_data,
+    convert_ratings_data,
+)
 from src.domain.repository.movies_repository import AbstractMoviesRepository
 from src.domain.repository.ratings_repository import AbstractRatingsRepository
+from src.domain.repository.raw_dataset_snapshot_repository import (
+    AbstractRawDatasetSnapshotRepository,
+)
 from src.domain.repository.tags_repository import AbstractTagsRepository
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
 from src.infrastructure.schema.movies_schema import Movies
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.ratings_schema import Ratings
+from src.infrastructure.schema.tables_schema import TABLES
 from src.infrastructure.schema.tags_schema import Tags
 from src.middleware.logger import configure_logger
 
 logger = configure_logger(__name__)
 
 
+class DATA_LOADER(Enum):
+    ROWS = "rows"
+    COLUMNAR = "columnar"
+
+    @staticmethod
+    def get_list() -> List[str]:
+        return [v.value for v in DATA_LOADER.__members__.values()]
+
+
+class MOVIES_TAGS_LOADER(Enum):
+    PANDAS = "pandas"
+    SQL = "sql"
+
+    @staticmethod
+    def get_list() -> List[str]:
+        return [v.value for v in MOVIES_TAGS_LOADER.__members__.values()]
+
+
 class DataLoaderUsecase(object):
     def __init__(
         self,
         movies_repository: AbstractMoviesRepository,
         ratings_repository: AbstractRatingsRepository,
         tags_repository: AbstractTagsRepository,
+        loader: str = DATA_LOADER.ROWS.value,
+        workers: int = 1,
+        ratings_partitions: int = 1,
+        movies_tags_loader: str = MOVIES_TAGS_LOADER.PANDAS.value,
+        snapshot_repository: Optional[AbstractRawDatasetSnapshotRepository] = None,
+        ratings_filter: Optional[QueryFilter] = None,
+        dtypes: str = DTYPES.DEFAULT.value,
     ):
         """Data loader usecase.
 
@@ -27,29 +67,177 @@ class DataLoaderUsecase(object):
             movies_repository (AbstractMoviesRepository): Repository to load data for movies.
             ratings_repository (AbstractRatingsRepository): Repository to load data for ratings.
             tags_repository  (AbstractTagsRepository): Repository to load data for tags.
+            loader (str): "rows" builds DataFrames from pydantic models, "columnar"
+                copies tables into typed columns.
+            workers (int): Threads loading tables and ratings partitions at the same
+                time. Sequential if 1.
+            ratings_partitions (int): Number of user_id ranges ratings are split into
+                when workers > 1.
+            movies_tags_loader (str): "pandas" joins movies and tags after loading both,
+                "sql" queries joined movies_tags.
+            snapshot_repository (Optional[AbstractRawDatasetSnapshotRepository]): Local
+                snapshot reused while tables are unchanged. Always loads from database
+                if None.
+            ratings_filter (Optional[QueryFilter]): Filters and sampling of ratings,
+                applied in database. Snapshot is not used if set.
+            dtypes (str): "compact" converts each ratings partition to int32 ids and
+                half-star uint8 ratings as it is loaded.
         """
 
+        if loader not in DATA_LOADER.get_list():
+            raise ValueError(
+                f"invalid loader: {loader}. Choose from {DATA_LOADER.get_list()}"
+            )
+        if movies_tags_loader not in MOVIES_TAGS_LOADER.get_list():
+            raise ValueError(
+                f"invalid movies_tags_loader: {movies_tags_loader}. "
+                f"Choose from {MOVIES_TAGS_LOADER.get_list()}"
+            )
+        if dtypes not in DTYPES.get_list():
+            raise ValueError(
+                f"invalid dtypes: {dtypes}. Choose from {DTYPES.get_list()}"
+            )
+        if ratings_filter is not None and ratings_filter.columns is not None:
+            raise ValueError("ratings_filter cannot select columns of dataset")
         self.movies_repository = movies_repository
         self.ratings_repository = ratings_repository
         self.tags_repository = tags_repository
+        self.loader = loader
+        self.workers = workers
+        self.ratings_partitions = ratings_partitions
+        self.movies_tags_loader = movies_tags_loader
+        self.snapshot_repository = snapshot_repository
+        self.ratings_filter = ratings_filter
+        self.dtypes = dtypes
 
     def load_dataset(self) -> RawDataset:
         """Load dataset for training and validation.
 
+        Returns:
+            RawDataset: Data loaded from snapshot, refreshed with changes of tables.
+        """
+
+        # a snapshot holds whole tables, not a filtered sample of them
+        if self.snapshot_repository is None or self.ratings_filter is not None:
+            return self.load_dataset_from_database()
+
+        # fingerprinted before loading, so changes during the load outdate the snapshot
+        fingerprints = self.select_fingerprints()
+        snapshot_fingerprints = self.snapshot_repository.load_fingerprints()
+        raw_dataset: Optional[RawDataset] = None
+        if snapshot_fingerprints == fingerprints:
+            raw_dataset = self.snapshot_repository.load()
+        elif snapshot_fingerprints is not None:
+            raw_dataset = self.refresh_snapshot(
+                snapshot_fingerprints=snapshot_fingerprints,
+                fingerprints=fingerprints,
+            )
+        if raw_dataset is None:
+            raw_dataset = self.load_dataset_from_database()
+            self.snapshot_repository.save(
+                raw_dataset=raw_dataset,
+                fingerprints=fingerprints,
+                row_hashes=self.ratings_repository.select_frame(
+                    query_filter=QueryFilter(columns=["user_id", "movie_id"]),
+                    row_hash=True,
+                ),
+            )
+        # a snapshot saved with other dtypes is still usable
+        return raw_dataset.with_dtypes(dtypes=self.dtypes)
+
+    def refresh_snapshot(
+        self,
+        snapshot_fingerprints: List[TableFingerprint],
+        fingerprints: List[TableFingerprint],
+    ) -> Optional[RawDataset]:
+        """Merge rows created after the snapshot into it.
+
+        Ratings created since the snapshot's max created_at are merged into the ratings
+        partitions they belong to, with the hash of each row. The snapshot is reloaded
+        unless its rows and the sum of its row hashes match the ratings fingerprint,
+        which catches deletes and updates that keep created_at. movies_tags is small
+        and rebuilt when movies or tags have changed.
+
+        Args:
+            snapshot_fingerprints (List[TableFingerprint]): fingerprints the snapshot
+                was made at.
+            fingerprints (List[TableFingerprint]): current fingerprints of the tables.
+
+        Returns:
+            Optional[RawDataset]: Refreshed snapshot, None if it has to be reloaded.
+        """
+
+        if self.snapshot_repository is None:
+            return None
+        before = {f.table_name: f for f in snapshot_fingerprints}
+        after = {f.table_name: f for f in fingerprints}
+        if before.keys() != after.keys():
+            return None
+
+        ratings = TABLES.RATINGS.value
+        if before[ratings] != after[ratings]:
+            created_since = before[ratings].max_created_at
+            if created_since is None:
+                return None
+            # inclusive, since rows created in the same instant as the watermark
+            # may have been committed after it was read
+            ratings_df = self.ratings_repository.select_frame(
+                query_filter=QueryFilter(created_since=created_since),
+                row_hash=True,
+            )
+            rows = self.snapshot_repository.merge_ratings(ratings_data=ratings_df)
+            checksum = self.snapshot_repository.load_ratings_checksum()
+            logger.info(
+                f"merged {len(ratings_df)} ratings created since {created_since} "
+                f"into snapshot of {rows} ratings"
+            )
+            # deleted rows and updates that keep created_at are not in the delta
+            if rows != after[ratings].rows or checksum != after[ratings].checksum:
+                logger.info(
+                    f"snapshot has {rows} ratings of checksum {checksum} but table "
+                    f"has {after[ratings].rows} of checksum {after[ratings].checksum}, "
+                    "reload snapshot"
+                )
+                return None
+
+        if any(before[t] != after[t] for t in [TABLES.MOVIES.value, TABLES.TAGS.value]):
+            self.snapshot_repository.save_movies_tags(
+                movies_tags_data=self.make_movies_tags_data(),
+            )
+
+        self.snapshot_repository.save_fingerprints(fingerprints=fingerprints)
+        return self.snapshot_repository.load()
+
+    def select_fingerprints(self) -> List[TableFingerprint]:
+        """Select fingerprints of the tables the dataset is made from.
+
+        Returns:
+            List[TableFingerprint]: fingerprints of movies, ratings and tags.
+        """
+
+        fingerprints = [
+            self.movies_repository.select_fingerprint(),
+            self.ratings_repository.select_fingerprint(),
+            self.tags_repository.select_fingerprint(),
+        ]
+        logger.info(f"table fingerprints: {fingerprints}")
+        return fingerprints
+
+    def load_dataset_from_database(self) -> RawDataset:
+        """Load dataset from database.
+
         Returns:
             RawDataset: Data loaded from database.
         """
 
         logger.info(f"load data from database")
 
-        movies_df = self.make_movies_data()
-        ratings_df = self.make_ratings_data()
-        tags_df = self.make_tags_data()
+        if self.workers > 1:
+            ratings_df, movies_tags_df = self.make_data_concurrently()
+        else:
+            ratings_df = self.make_ratings_data()
+            movies_tags_df = self.make_movies_tags_data()
 
-        tags_df["tag"] = tags_df["tag"].str.lower()
-        tags_agg_df = tags_df.groupby("movie_id").agg({"tag": list})
-        movies_tags_df = movies_df.merge(tags_agg_df, on="movie_id", how="left")
-        movies_tags_df["genre"] = movies_tags_df.genre.apply(lambda x: x.split("|"))
         logger.info(f"done dataload")
         logger.info(
             f"""load ratings:
@@ -63,9 +251,137 @@ class DataLoaderUsecase(object):
         )
         return RawDataset(
             ratings_data=ratings_df,
-            movies_tags_data=movies_tags_df,
+            movies_tags_data=convert_movies_tags_data(
+                movies_tags_data=movies_tags_df,
+                dtypes=self.dtypes,
+            ),
+            dtypes=self.dtypes,
         )
 
+    def make_data_concurrently(
+        self,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """make ratings and movies_tags DataFrames at the same time.
+
+        Ratings are split into user_id ranges, each read over its own connection.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: ratings and movies_tags data.
+        """
+
+        user_id_ranges = self.split_user_id_range()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # the largest reads are submitted first
+            ratings_futures = [
+                executor.submit(
+                    self.make_ratings_data,
+                    user_id_range=user_id_range,
+                )
+                for user_id_range in user_id_ranges
+            ]
+            if self.movies_tags_loader == MOVIES_TAGS_LOADER.SQL.value:
+                movies_tags_future = executor.submit(self.make_movies_tags_data)
+            else:
+                movies_future = executor.submit(self.make_movies_data)
+                tags_future = executor.submit(self.make_tags_data)
+            ratings_dfs = [future.result() for future in ratings_futures]
+            if self.movies_tags_loader == MOVIES_TAGS_LOADER.SQL.value:
+                movies_tags_df = movies_tags_future.result()
+            else:
+                movies_tags_df = self.merge_movies_tags(
+                    movies_df=movies_future.result(),
+                    tags_df=tags_future.result(),
+                )
+
+        # empty partitions would turn the concatenated columns into object dtype
+        ratings_dfs = [df for df in ratings_dfs if len(df) > 0] or ratings_dfs[:1]
+        ratings_df = pd.concat(ratings_dfs, ignore_index=True)
+        logger.info(
+            f"loaded {len(user_id_ranges)} ratings partitions, movies and tags "
+            f"with {self.workers} workers in {time.perf_counter() - start:.2f} sec"
+        )
+        return ratings_df, movies_tags_df
+
+    def split_user_id_range(self) -> List[Optional[Tuple[int, int]]]:
+        """Split ratings into half-open user_id ranges of equal width.
+
+        Returns:
+            List[Optional[Tuple[int, int]]]: user_id ranges, [None] for the whole table.
+        """
+
+        if self.ratings_partitions <= 1:
+            return [None]
+        user_id_range = self.ratings_repository.select_user_id_range()
+        if user_id_range is None:
+            return [None]
+        low, high = user_id_range
+        width = math.ceil((high - low + 1) / self.ratings_partitions)
+        return [
+            (start, min(start + width, high + 1))
+            for start in range(low, high + 1, width)
+        ]
+
+    def make_ratings_filter(
+        self,
+        user_id_range: Optional[Tuple[int, int]] = None,
+    ) -> Optional[QueryFilter]:
+        """Narrow ratings_filter down to a user_id range.
+
+        Args:
+            user_id_range (Optional[Tuple[int, int]]): half-open user_id range to load.
+                All users if None.
+
+        Returns:
+            Optional[QueryFilter]: filter of ratings to load, None for the whole table.
+        """
+
+        if user_id_range is None:
+            return self.ratings_filter
+        if self.ratings_filter is None:
+            return QueryFilter(user_id_range=user_id_range)
+        if self.ratings_filter.user_id_range is not None:
+            low = max(user_id_range[0], self.ratings_filter.user_id_range[0])
+            high = min(user_id_range[1], self.ratings_filter.user_id_range[1])
+            user_id_range = (low, max(low, high))
+        return self.ratings_filter.model_copy(update={"user_id_range": user_id_range})
+
+    def make_movies_tags_data(self) -> pd.DataFrame:
+        """make movies DataFrame with genre and lowercased tags as lists.
+
+        Returns:
+            pd.DataFrame: movies_tags data.
+        """
+
+        if self.movies_tags_loader == MOVIES_TAGS_LOADER.SQL.value:
+            return self.movies_repository.select_movies_tags_frame()
+
+        return self.merge_movies_tags(
+            movies_df=self.make_movies_data(),
+            tags_df=self.make_tags_data(),
+        )
+
+    def merge_movies_tags(
+        self,
+        movies_df: pd.DataFrame,
+        tags_df: pd.DataFrame,
+    ) -> pd.DataFrame:
+        """Join tags to movies in pandas.
+
+        Args:
+            movies_df (pd.DataFrame): movies data.
+            tags_df (pd.DataFrame): tags data.
+
+        Returns:
+            pd.DataFrame: movies_tags data.
+        """
+
+        tags_df["tag"] = tags_df["tag"].str.lower()
+        tags_agg_df = tags_df.groupby("movie_id").agg({"tag": list})
+        movies_tags_df = movies_df.merge(tags_agg_df, on="movie_id", how="left")
+        movies_tags_df["genre"] = movies_tags_df.genre.apply(lambda x: x.split("|"))
+        return movies_tags_df
+
     def make_movies_data(self) -> pd.DataFrame:
         """make movies DataFrame.
 
@@ -73,22 +389,38 @@ class DataLoaderUsecase(object):
             pd.DataFrame: movies data.
         """
 
+        if self.loader == DATA_LOADER.COLUMNAR.value:
+            return self.movies_repository.select_frame()
+
         movies_data = self.load_movies_data()
         movies_dataset_dict = [d.model_dump() for d in movies_data]
         movies_df = pd.DataFrame(movies_dataset_dict)
         return movies_df
 
-    def make_ratings_data(self) -> pd.DataFrame:
+    def make_ratings_data(
+        self,
+        user_id_range: Optional[Tuple[int, int]] = None,
+    ) -> pd.DataFrame:
         """make ratings DataFrame.
 
+        Args:
+            user_id_range (Optional[Tuple[int, int]]): half-open user_id range to load.
+                All users if None.
+
         Returns:
             pd.DataFrame: ratings data.
         """
 
-        ratings_data = self.load_ratings_data()
-        ratings_dataset_dict = [d.model_dump() for d in ratings_data]
-        ratings_df = pd.DataFrame(ratings_dataset_dict)
-        return ratings_df
+        if self.loader == DATA_LOADER.COLUMNAR.value:
+            ratings_df = self.ratings_repository.select_frame(
+                query_filter=self.make_ratings_filter(user_id_range=user_id_range),
+            )
+        else:
+            ratings_data = self.load_ratings_data(user_id_range=user_id_range)
+            ratings_dataset_dict = [d.model_dump() for d in ratings_data]
+            ratings_df = pd.DataFrame(ratings_dataset_dict)
+        # converted per partition, so the full ratings are never held in int64
+        return convert_ratings_data(ratings_data=ratings_df, dtypes=self.dtypes)
 
     def make_tags_data(self) -> pd.DataFrame:
         """make tags DataFrame.
@@ -97,6 +429,9 @@ class DataLoaderUsecase(object):
             pd.DataFrame: tags data.
         """
 
+        if self.loader == DATA_LOADER.COLUMNAR.value:
+            return self.tags_repository.select_frame()
+
         tags_data = self.load_tags_data()
         tags_dataset_dict = [d.model_dump() for d in tags_data]
         tags_df = pd.DataFrame(tags_dataset_dict)
@@ -110,40 +445,34 @@ class DataLoaderUsecase(object):
         """
 
         data: List[Movies] = []
-        position = 0
-        limit = 10000
-        while True:
-            movies_data = self.movies_repository.select(
-                limit=limit,
-                offset=position,
-            )
-            if len(movies_data) == 0:
-                break
+        for movies_data in self.movies_repository.select_in_batches(
+            batch_size=10000,
+        ):
             data.extend(movies_data)
-            position += len(movies_data)
-            logger.info(f"done loading {position}...")
+            logger.info(f"done loading {len(data)}...")
         return data
 
-    def load_ratings_data(self) -> List[Ratings]:
+    def load_ratings_data(
+        self,
+        user_id_range: Optional[Tuple[int, int]] = None,
+    ) -> List[Ratings]:
         """Load data from ratings table.
 
+        Args:
+            user_id_range (Optional[Tuple[int, int]]): half-open user_id range to load.
+                All users if None.
+
         Returns:
             List[Ratings]: ratings data.
         """
 
         data: List[Ratings] = []
-        position = 0
-        limit = 10000
-        while True:
-            ratings_data = self.ratings_repository.select(
-                limit=limit,
-                offset=position,
-            )
-            if len(ratings_data) == 0:
-                break
+        for ratings_data in self.ratings_repository.select_in_batches(
+            batch_size=10000,
+            query_filter=self.make_ratings_filter(user_id_range=user_id_range),
+        ):
             data.extend(ratings_data)
-            position += len(ratings_data)
-            logger.info(f"done loading {position}...")
+            logger.info(f"done loading {len(data)}...")
         return data
 
     def load_tags_data(self) -> List[Tags]:
@@ -154,16 +483,9 @@ class DataLoaderUsecase(object):
         """
 
         data: List[Tags] = []
-        position = 0
-        limit = 10000
-        while True:
-            tags_data = self.tags_repository.select(
-                limit=limit,
-                offset=position,
-            )
-            if len(tags_data) == 0:
-                break
+        for tags_data in self.tags_repository.select_in_batches(
+            batch_size=10000,
+        ):
             data.extend(tags_data)
-            position += len(tags_data)
-            logger.info(f"done loading {position}...")
+            logger.info(f"done loading {len(data)}...")
         return data
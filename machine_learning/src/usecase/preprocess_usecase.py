@@ -1,10 +1,13 @@
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
 
 from src.domain.algorithm.preprocess import AbstractExtractor
-from src.domain.model.common_data import XY
+from src.domain.model.common_data import DTYPES, XY
+from src.domain.model.id_dictionary import MOVIE_INDEX, USER_INDEX, IdDictionary
 from src.domain.model.preprocessed_data import PreprocessedDataset
+from src.domain.model.ratings_matrix import RatingsMatrix
 from src.domain.model.raw_data import RawDataset
 from src.middleware.logger import configure_logger
 
@@ -16,15 +19,22 @@ class PreprocessUsecase(object):
         self,
         ratings_extractor: AbstractExtractor,
         genre_extractor: AbstractExtractor,
+        dtypes: str = DTYPES.DEFAULT.value,
     ):
         """Preprocess usecase.
 
         Args:
             ratings_extractor (AbstractExtractor): Algorithm to extract ratings statitics.
             genre_extractor (AbstractExtractor): Algorithm to extract genre boolean.
+            dtypes (str): "compact" makes int32 keys, float32 features and target, "default" int64 and float64.
         """
+        if dtypes not in DTYPES.get_list():
+            raise ValueError(
+                f"invalid dtypes: {dtypes}. Choose from {DTYPES.get_list()}"
+            )
         self.ratings_extractor = ratings_extractor
         self.genre_extractor = genre_extractor
+        self.dtypes = dtypes
 
     def preprocess_dataset(
         self,
@@ -40,9 +50,23 @@ class PreprocessUsecase(object):
             PreprocessedDataset: Preprocessed data with separated to training and validation.
         """
 
-        ratings_train, ratings_test = self.split_records(
-            dataset.ratings_data, validation_records
+        dataset = dataset.with_dtypes(dtypes=self.dtypes)
+        # ids are mapped to dense indices once, features are looked up by them
+        id_dictionary = IdDictionary.from_raw_dataset(dataset=dataset)
+        logger.info(
+            f"id dictionary: {id_dictionary.n_users} users, "
+            f"{id_dictionary.n_movies} movies"
+        )
+        # ratings are laid out in users x movies once, split and features use slices
+        ratings_matrix = RatingsMatrix.from_raw_dataset(
+            dataset=dataset,
+            id_dictionary=id_dictionary,
+        )
+        train_matrix, test_matrix = self.split_records(
+            ratings_matrix, validation_records
         )
+        ratings_train = self.to_frame(ratings_matrix=train_matrix)
+        ratings_test = self.to_frame(ratings_matrix=test_matrix)
 
         logger.info(f"done split records")
         logger.info(
@@ -65,22 +89,38 @@ type:
         """
         )
 
-        train_keys_y = ratings_train[
-            ["user_id", "timestamp_rank", "movie_id", "rating"]
-        ]
-        test_keys_y = ratings_test[["user_id", "timestamp_rank", "movie_id", "rating"]]
+        keys_y_columns = ["user_id", "timestamp_rank", "movie_id", "rating"]
+        train_keys_y = ratings_train[keys_y_columns + [USER_INDEX, MOVIE_INDEX]]
+        test_keys_y = ratings_test[keys_y_columns + [USER_INDEX, MOVIE_INDEX]]
 
         df_train = train_keys_y.copy()
         df_test = test_keys_y.copy()
+        if self.dtypes == DTYPES.COMPACT.value:
+            # the target is rated in stars while compact ratings are in half stars
+            df_train["rating"] = (df_train["rating"] / 2).astype(np.float32)
+            df_test["rating"] = (df_test["rating"] / 2).astype(np.float32)
 
-        df_train_rating = self.ratings_extractor.run(ratings_train, df_train)
-        df_test_rating = self.ratings_extractor.run(ratings_train, df_test)
+        df_train_rating = self.ratings_extractor.run(
+            ratings_train, df_train, train_matrix
+        )
+        df_test_rating = self.ratings_extractor.run(
+            ratings_train, df_test, train_matrix
+        )
 
-        df_train_genre = self.genre_extractor.run(dataset.movies_tags_data, df_train)
-        df_test_genre = self.genre_extractor.run(dataset.movies_tags_data, df_test)
+        df_train_genre = self.genre_extractor.run(
+            dataset.movies_tags_data, df_train, train_matrix
+        )
+        df_test_genre = self.genre_extractor.run(
+            dataset.movies_tags_data, df_test, train_matrix
+        )
 
-        df_train = pd.concat([df_train, df_train_rating, df_train_genre], axis=1)
-        df_test = pd.concat([df_test, df_test_rating, df_test_genre], axis=1)
+        # keys of the outputs stay in the original ids
+        df_train = pd.concat(
+            [df_train[keys_y_columns], df_train_rating, df_train_genre], axis=1
+        )
+        df_test = pd.concat(
+            [df_test[keys_y_columns], df_test_rating, df_test_genre], axis=1
+        )
 
         average_rating = df_train["rating"].mean()
         df_test.fillna(average_rating, inplace=True)
@@ -98,30 +138,46 @@ type:
         return PreprocessedDataset(
             training_data=training_data,
             validation_data=validation_data,
+            id_dictionary=id_dictionary,
+            ratings_matrix=train_matrix,
         )
 
     def split_records(
         self,
-        ratings: pd.DataFrame,
+        ratings_matrix: RatingsMatrix,
         validation_records: int,
-    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    ) -> Tuple[RatingsMatrix, RatingsMatrix]:
+        """Split the latest ratings of each user off for validation.
 
-        ratings["timestamp_rank"] = (
-            ratings.groupby("user_id")["timestamp"]
-            .rank(ascending=False, method="first")
-            .astype(int)
+        Args:
+            ratings_matrix (RatingsMatrix): ratings of users ranked by timestamp.
+            validation_records (int): Latest records per user used for validation.
+
+        Returns:
+            Tuple[RatingsMatrix, RatingsMatrix]: ratings for training and validation.
+        """
+        is_validation = ratings_matrix.timestamp_ranks <= validation_records
+        return (
+            ratings_matrix.select(mask=~is_validation),
+            ratings_matrix.select(mask=is_validation),
         )
-        ratings_train = ratings[ratings["timestamp_rank"] > validation_records]
-        ratings_test = ratings[ratings["timestamp_rank"] <= validation_records]
 
-        ratings_train = ratings_train.sort_values(
-            ["user_id", "timestamp_rank"]
-        ).reset_index(drop=True)
-        ratings_test = ratings_test.sort_values(
-            ["user_id", "timestamp_rank"]
-        ).reset_index(drop=True)
+    def to_frame(
+        self,
+        ratings_matrix: RatingsMatrix,
+    ) -> pd.DataFrame:
+        """Make ratings DataFrame ordered by user_id and timestamp_rank.
 
-        return (ratings_train, ratings_test)
+        Args:
+            ratings_matrix (RatingsMatrix): ratings to be listed.
+
+        Returns:
+            pd.DataFrame: ratings with timestamp_rank and dense indices.
+        """
+        ratings = ratings_matrix.to_frame()
+        if self.dtypes == DTYPES.DEFAULT.value:
+            ratings["timestamp_rank"] = ratings["timestamp_rank"].astype(int)
+        return ratings
 
     def split_columns(
         self,
@@ -181,4 +237,5 @@ y:
             keys=keys,
             x=x,
             y=y,
+            dtypes=self.dtypes,
         )
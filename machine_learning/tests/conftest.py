@@ -1,12 +1,15 @@
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import pandas as pd
 import pytest
 
 from src.domain.repository.movies_repository import AbstractMoviesRepository
 from src.domain.repository.ratings_repository import AbstractRatingsRepository
 from src.domain.repository.tags_repository import AbstractTagsRepository
 from src.infrastructure.database.db_client import AbstractDBClient
+from src.infrastructure.schema.fingerprint_schema import TableFingerprint
 from src.infrastructure.schema.movies_schema import Movies
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.ratings_schema import Ratings
 from src.infrastructure.schema.tags_schema import Tags
 
@@ -39,6 +42,30 @@ class MockPostgreSQLClient(AbstractDBClient):
     ) -> List[Dict[str, Any]]:
         return []
 
+    def execute_select_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        return iter([])
+
+    def execute_select_columns_in_batches(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Dict[str, List[Any]]]:
+        return iter([])
+
+    def execute_select_frame(
+        self,
+        query: str,
+        parameters: Optional[Tuple] = None,
+        dtypes: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        return pd.DataFrame()
+
 
 class MockMoviesRepository(AbstractMoviesRepository):
     def __init__(
@@ -50,10 +77,34 @@ class MockMoviesRepository(AbstractMoviesRepository):
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Movies]:
         return []
 
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Movies]]:
+        return iter([])
+
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    def select_movies_tags_frame(self) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    def select_fingerprint(self) -> TableFingerprint:
+        return TableFingerprint(
+            table_name="movies",
+            rows=0,
+            max_created_at=None,
+            checksum=0,
+        )
+
 
 class MockRatingsRepository(AbstractRatingsRepository):
     def __init__(
@@ -65,10 +116,42 @@ class MockRatingsRepository(AbstractRatingsRepository):
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Ratings]:
         return []
 
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Ratings]]:
+        return iter([])
+
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+        row_hash: bool = False,
+    ) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    def select_user_id_range(self) -> Optional[Tuple[int, int]]:
+        return None
+
+    def select_rating_statistics(
+        self,
+        group_by: str,
+        validation_records: int,
+    ) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    def select_fingerprint(self) -> TableFingerprint:
+        return TableFingerprint(
+            table_name="ratings",
+            rows=0,
+            max_created_at=None,
+            checksum=0,
+        )
+
 
 class MockTagsRepository(AbstractTagsRepository):
     def __init__(
@@ -80,10 +163,31 @@ class MockTagsRepository(AbstractTagsRepository):
     def select(
         self,
         limit: int = 200,
-        offset: int = 0,
+        after: Optional[Tuple[int, ...]] = None,
     ) -> List[Tags]:
         return []
 
+    def select_in_batches(
+        self,
+        batch_size: int = 10000,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> Iterator[List[Tags]]:
+        return iter([])
+
+    def select_frame(
+        self,
+        query_filter: Optional[QueryFilter] = None,
+    ) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    def select_fingerprint(self) -> TableFingerprint:
+        return TableFingerprint(
+            table_name="tags",
+            rows=0,
+            max_created_at=None,
+            checksum=0,
+        )
+
 
 class Mocks(object):
     def __init__(self):
@@ -0,0 +1,94 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from src.infrastructure.database.db_client import PostgreSQLClient
+
+
+class FakeCursor(object):
+    def __init__(self, csv: bytes):
+        self.csv = csv
+        self.copy_queries: List[str] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def mogrify(self, query, parameters=None):
+        if parameters is not None:
+            query = query % tuple(repr(p) for p in parameters)
+        return query.encode()
+
+    def copy_expert(self, sql, file):
+        self.copy_queries.append(sql)
+        file.write(self.csv)
+
+
+class FakeConnection(object):
+    def __init__(self, cursor: FakeCursor):
+        self.__cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def cursor(self, *args, **kwargs):
+        return self.__cursor
+
+    def rollback(self):
+        pass
+
+
+def test_execute_select_frame(
+    mocker,
+):
+    # COPY writes NULL as \N, quotes fields with commas and keeps "NA" as text
+    cursor = FakeCursor(
+        csv=(
+            b"movie_id,title,mean,count\n"
+            b'1,"Toy Story, the",4.5,2\n'
+            b"2,NA,\\N,0\n"
+            b'3,"",3.0,1\n'
+        )
+    )
+    db_client = PostgreSQLClient()
+    mocker.patch.object(
+        db_client,
+        "get_connection",
+        return_value=FakeConnection(cursor=cursor),
+    )
+
+    got = db_client.execute_select_frame(
+        query="SELECT * FROM movies WHERE movies.movie_id < %s;",
+        parameters=(4,),
+        dtypes={"movie_id": int, "title": str, "mean": float, "count": int},
+    )
+
+    assert cursor.copy_queries == [
+        "COPY (SELECT * FROM movies WHERE movies.movie_id < 4) TO STDOUT "
+        "WITH (FORMAT csv, HEADER, NULL '\\N')"
+    ]
+    want = pd.DataFrame(
+        {
+            "movie_id": [1, 2, 3],
+            "title": ["Toy Story, the", "NA", ""],
+            "mean": [4.5, np.nan, 3.0],
+            "count": [2, 0, 1],
+        }
+    )
+    assert_frame_equal(got, want)
+    assert got.dtypes.to_dict() == {
+        "movie_id": np.dtype("int64"),
+        "title": np.dtype("object"),
+        "mean": np.dtype("float64"),
+        "count": np.dtype("int64"),
+    }
+    record = db_client.profiler.records()[-1]
+    assert record.method == "execute_select_frame"
+    assert record.rows == 3
@@ -0,0 +1,125 @@
+import pytest
+
+from src.infrastructure.database.db_client import SQLiteClient
+from src.infrastructure.database.query_profiler import (
+    NO_STAGE,
+    UNKNOWN_CALLER,
+    QueryProfiler,
+)
+from src.infrastructure.repository.ratings_repository import RatingsRepository
+
+
+@pytest.fixture
+def db_client(tmp_path) -> SQLiteClient:
+    db_client = SQLiteClient(database_path=str(tmp_path / "movielens.sqlite3"))
+    db_client.execute_create_query(
+        query="CREATE TABLE ratings (user_id INTEGER, movie_id INTEGER);"
+    )
+    db_client.execute_bulk_insert_or_update_query(
+        query="INSERT INTO ratings (user_id, movie_id) VALUES %s",
+        parameters=[(1, 1), (2, 1), (3, 2)],
+    )
+    return db_client
+
+
+def test_query_profiler_stage(
+    db_client,
+):
+    profiler = QueryProfiler()
+    ratings_repository = RatingsRepository(
+        db_client=SQLiteClient(
+            database_path=db_client.database_path,
+            profiler=profiler,
+        )
+    )
+
+    with profiler.stage("load_dataset"):
+        assert ratings_repository.select_user_id_range() == (1, 3)
+        with profiler.stage("preprocess"):
+            ratings_repository.select_user_id_range()
+    ratings_repository.select_user_id_range()
+
+    got = [(r.stage, r.caller, r.method, r.rows) for r in profiler.records()]
+    caller = "RatingsRepository.select_user_id_range"
+    assert got == [
+        ("load_dataset", caller, "execute_select", 1),
+        ("preprocess", caller, "execute_select", 1),
+        (NO_STAGE, caller, "execute_select", 1),
+    ]
+
+
+def test_query_profiler_summary():
+    profiler = QueryProfiler()
+    with profiler.stage("load_dataset"):
+        for seconds, rows in [(1.0, 10), (2.0, 20)]:
+            profiler.record(
+                method="execute_select_frame",
+                seconds=seconds,
+                connect_seconds=0.5,
+                rows=rows,
+                bytes=rows * 8,
+            )
+    profiler.record(
+        method="execute_select",
+        seconds=4.0,
+        connect_seconds=0.0,
+        rows=1,
+        bytes=8,
+    )
+
+    assert profiler.summary() == {
+        "load_dataset": {
+            UNKNOWN_CALLER: {
+                "queries": 2,
+                "seconds": 3.0,
+                "connect_seconds": 1.0,
+                "rows": 30,
+                "bytes": 240,
+            },
+        },
+        NO_STAGE: {
+            UNKNOWN_CALLER: {
+                "queries": 1,
+                "seconds": 4.0,
+                "connect_seconds": 0.0,
+                "rows": 1,
+                "bytes": 8,
+            },
+        },
+    }
+    metrics = profiler.metrics()
+    assert metrics["db_load_dataset_queries"] == 2
+    assert metrics["db_load_dataset_seconds"] == 3.0
+    assert metrics[f"db_{NO_STAGE}_rows"] == 1
+    assert metrics["db_total_queries"] == 3
+    assert metrics["db_total_seconds"] == 7.0
+    assert metrics["db_total_bytes"] == 248
+
+
+def test_query_profiler_batches(
+    mocker,
+    db_client,
+):
+    # every read of the clock takes a second, the consumer takes 100 per batch
+    clock = {"now": 0.0}
+
+    def perf_counter():
+        clock["now"] += 1
+        return clock["now"] - 1
+
+    mocked_time = mocker.patch("src.infrastructure.database.db_client.time")
+    mocked_time.perf_counter.side_effect = perf_counter
+    batches = 0
+    for _ in db_client.execute_select_in_batches(
+        query="SELECT user_id, movie_id FROM ratings;",
+        batch_size=1,
+    ):
+        batches += 1
+        clock["now"] += 100
+
+    record = db_client.profiler.records()[-1]
+    assert batches == 3
+    assert record.method == "execute_select_in_batches"
+    assert record.rows == 3
+    # a second for each batch and the last empty fetch, none of the consumer
+    assert record.seconds == 4.0
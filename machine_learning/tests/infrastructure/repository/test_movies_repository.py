@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.domain.model.raw_data import RawDataMoviesTagsSchema
+from src.infrastructure.repository.movies_repository import MoviesRepository
+from src.usecase.data_loader_usecase import DataLoaderUsecase
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+@pytest.mark.usefixtures("scope_class")
+def test_select_movies_tags_frame(
+    mocker,
+    scope_class,
+):
+    # columns as psycopg2 returns them: arrays as lists, movies without tags as None
+    mocked_execute_select_columns_in_batches = mocker.patch.object(
+        scope_class.db_client,
+        "execute_select_columns_in_batches",
+        return_value=iter(
+            [
+                {
+                    "movie_id": [1, 2],
+                    "title": ["a", "b, the"],
+                    "genre": [["Action", "Comedy"], ["Drama"]],
+                    "tag": [["funny", "fight"], None],
+                },
+                {
+                    "movie_id": [3],
+                    "title": ["c"],
+                    "genre": [["(no genres listed)"]],
+                    "tag": [["sad"]],
+                },
+            ]
+        ),
+    )
+    movies_repository = MoviesRepository(db_client=scope_class.db_client)
+
+    got = movies_repository.select_movies_tags_frame()
+
+    query = normalize(
+        mocked_execute_select_columns_in_batches.call_args.kwargs["query"]
+    )
+    assert "string_to_array(movies.genre, '|') as genre" in query
+    assert (
+        "array_agg( lower(tags.tag) ORDER BY tags.user_id ) as tag FROM tags "
+        "GROUP BY tags.movie_id ) AS movie_tags"
+    ) in query
+    assert "LEFT JOIN" in query
+    assert query.endswith("ORDER BY movies.movie_id ;")
+
+    # the same frame as tags joined to movies in pandas
+    want = DataLoaderUsecase(
+        movies_repository=movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+    ).merge_movies_tags(
+        movies_df=pd.DataFrame(
+            {
+                "movie_id": [1, 2, 3],
+                "title": ["a", "b, the", "c"],
+                "genre": ["Action|Comedy", "Drama", "(no genres listed)"],
+            }
+        ),
+        tags_df=pd.DataFrame(
+            {
+                "user_id": [1, 2, 1],
+                "movie_id": [1, 1, 3],
+                "tag": ["Funny", "FIGHT", "Sad"],
+                "timestamp": [1, 2, 3],
+            }
+        ),
+    )
+    assert_frame_equal(got, want)
+    assert got["movie_id"].dtype == "int64"
+    assert got["tag"].isna().tolist() == [False, True, False]
+    RawDataMoviesTagsSchema.validate(got)
@@ -0,0 +1,98 @@
+import pytest
+
+from src.infrastructure.repository.query_builder import build_select_query
+from src.infrastructure.schema.query_schema import SAMPLE_METHOD, QueryFilter
+
+COLUMNS = ["user_id", "movie_id", "rating", "timestamp"]
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+@pytest.mark.parametrize(
+    ("query_filter", "want_query", "want_columns", "want_parameters"),
+    [
+        (
+            None,
+            "SELECT ratings.user_id as user_id, ratings.movie_id as movie_id, "
+            "ratings.rating as rating, ratings.timestamp as timestamp "
+            "FROM ratings ORDER BY ratings.user_id, ratings.movie_id ;",
+            COLUMNS,
+            None,
+        ),
+        (
+            QueryFilter(
+                columns=["user_id", "rating"],
+                sample_percent=10,
+                sample_method=SAMPLE_METHOD.SYSTEM,
+                sample_seed=42,
+            ),
+            "SELECT ratings.user_id as user_id, ratings.rating as rating "
+            "FROM ratings TABLESAMPLE SYSTEM (%s) REPEATABLE (%s) "
+            "ORDER BY ratings.user_id, ratings.movie_id ;",
+            ["user_id", "rating"],
+            (10.0, 42),
+        ),
+        (
+            QueryFilter(
+                columns=["user_id"],
+                user_id_range=(1, 5),
+                user_ids=[2, 3],
+                timestamp_range=(100, 200),
+            ),
+            "SELECT ratings.user_id as user_id FROM ratings "
+            "WHERE ratings.user_id >= %s AND ratings.user_id < %s "
+            "AND ratings.user_id = ANY(%s) "
+            "AND ratings.timestamp >= %s AND ratings.timestamp < %s "
+            "ORDER BY ratings.user_id, ratings.movie_id ;",
+            ["user_id"],
+            (1, 5, [2, 3], 100, 200),
+        ),
+    ],
+)
+def test_build_select_query(
+    query_filter,
+    want_query,
+    want_columns,
+    want_parameters,
+):
+    query, columns, parameters = build_select_query(
+        table_name="ratings",
+        columns=COLUMNS,
+        order_by=["user_id", "movie_id"],
+        query_filter=query_filter,
+    )
+    assert normalize(query) == want_query
+    assert columns == want_columns
+    assert parameters == want_parameters
+
+
+@pytest.mark.parametrize(
+    ("columns", "query_filter", "want_message"),
+    [
+        (
+            COLUMNS,
+            QueryFilter(columns=["user_id", "title"]),
+            "invalid columns for ratings",
+        ),
+        (COLUMNS, QueryFilter(columns=[]), "invalid columns for ratings"),
+        (
+            ["user_id", "movie_id"],
+            QueryFilter(timestamp_range=(100, 200)),
+            "ratings cannot be filtered by timestamp",
+        ),
+    ],
+)
+def test_build_select_query_invalid(
+    columns,
+    query_filter,
+    want_message,
+):
+    with pytest.raises(ValueError, match=want_message):
+        build_select_query(
+            table_name="ratings",
+            columns=columns,
+            order_by=["user_id", "movie_id"],
+            query_filter=query_filter,
+        )
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.infrastructure.database.db_client import SQLiteClient
+from src.infrastructure.repository.ratings_repository import RatingsRepository
+
+
+@pytest.fixture
+def ratings_repository(tmp_path) -> RatingsRepository:
+    db_client = SQLiteClient(database_path=str(tmp_path / "movielens.sqlite3"))
+    db_client.execute_create_query(
+        query="""
+        CREATE TABLE ratings (
+            user_id INTEGER,
+            movie_id INTEGER,
+            rating REAL,
+            timestamp INTEGER
+        );
+        """
+    )
+    # the latest ratings of user 1 tie on timestamp, movie 1 is ranked first
+    db_client.execute_bulk_insert_or_update_query(
+        query="INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES %s",
+        parameters=[
+            (1, 1, 4.0, 3),
+            (1, 2, 2.0, 1),
+            (1, 3, 5.0, 3),
+            (2, 1, 3.0, 5),
+            (2, 2, 1.0, 2),
+        ],
+    )
+    return RatingsRepository(db_client=db_client)
+
+
+@pytest.mark.parametrize(
+    ("group_by", "want"),
+    [
+        (
+            "user_id",
+            pd.DataFrame(
+                {
+                    "user_id": [1, 2],
+                    "min": [2.0, 1.0],
+                    "max": [5.0, 1.0],
+                    "mean": [3.5, 1.0],
+                }
+            ),
+        ),
+        (
+            "movie_id",
+            pd.DataFrame(
+                {
+                    "movie_id": [2, 3],
+                    "min": [1.0, 5.0],
+                    "max": [2.0, 5.0],
+                    "mean": [1.5, 5.0],
+                }
+            ),
+        ),
+    ],
+)
+def test_select_rating_statistics(
+    ratings_repository,
+    group_by,
+    want,
+):
+    got = ratings_repository.select_rating_statistics(
+        group_by=group_by,
+        validation_records=1,
+    )
+    assert_frame_equal(got, want)
+
+
+def test_select_rating_statistics_invalid_group_by(
+    ratings_repository,
+):
+    with pytest.raises(ValueError, match="invalid group_by"):
+        ratings_repository.select_rating_statistics(
+            group_by="timestamp",
+            validation_records=1,
+        )
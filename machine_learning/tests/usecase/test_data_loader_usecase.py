@@ -1,16 +1,34 @@
+from datetime import datetime, timezone
+
+import numpy as np
 import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
 
 from src.domain.model.raw_data import (
     RawDataMoviesSchema,
+    RawDataMoviesTagsSchema,
     RawDataRatingsSchema,
     RawDataTagsSchema,
 )
+from src.exceptions.exceptions import DatabaseException
+from src.infrastructure.database.db_client import SQLiteClient
+from src.infrastructure.repository.movies_repository import MoviesRepository
+from src.infrastructure.repository.ratings_repository import RatingsRepository
+from src.infrastructure.repository.raw_dataset_snapshot_repository import (
+    ParquetRawDatasetSnapshotRepository,
+)
+from src.infrastructure.repository.tags_repository import TagsRepository
+from src.infrastructure.schema.fingerprint_schema import ROW_HASH, TableFingerprint
 from src.infrastructure.schema.movies_schema import Movies
+from src.infrastructure.schema.query_schema import QueryFilter
 from src.infrastructure.schema.ratings_schema import Ratings
 from src.infrastructure.schema.tags_schema import Tags
-from src.usecase.data_loader_usecase import DataLoaderUsecase
+from src.usecase.data_loader_usecase import (
+    DATA_LOADER,
+    MOVIES_TAGS_LOADER,
+    DataLoaderUsecase,
+)
 
 
 @pytest.mark.usefixtures("scope_class")
@@ -117,3 +135,480 @@ def test_load_data(
     want_tags = pd.DataFrame([d.model_dump() for d in tags_data])
     assert_frame_equal(got_tags, want_tags)
     RawDataTagsSchema.validate(got_tags)
+
+
+@pytest.mark.usefixtures("scope_class")
+@pytest.mark.parametrize(
+    ("n_users", "n_movies", "batch_size"),
+    [(3, 9000, 10000)],
+)
+def test_load_ratings_data(
+    mocker,
+    scope_class,
+    n_users,
+    n_movies,
+    batch_size,
+):
+    ratings_data = [
+        Ratings(
+            user_id=user_id,
+            movie_id=movie_id,
+            rating=1.0,
+            timestamp=1,
+        )
+        for user_id in range(1, n_users + 1)
+        for movie_id in range(1, n_movies + 1)
+    ]
+    batches = [
+        ratings_data[i : i + batch_size]
+        for i in range(0, len(ratings_data), batch_size)
+    ]
+
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=scope_class.movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+    )
+    mocked_select_in_batches = mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_in_batches",
+        return_value=iter(batches),
+    )
+
+    got = data_loader_usecase.load_ratings_data()
+    assert got == ratings_data
+    mocked_select_in_batches.assert_called_once_with(
+        batch_size=batch_size,
+        query_filter=None,
+    )
+
+
+@pytest.mark.usefixtures("scope_class")
+def test_make_data_columnar(
+    mocker,
+    scope_class,
+):
+    ratings_df = pd.DataFrame(
+        {
+            "user_id": [1, 2],
+            "movie_id": [1, 2],
+            "rating": [1.0, 2.0],
+            "timestamp": [1, 2],
+        }
+    )
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=scope_class.movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+        loader=DATA_LOADER.COLUMNAR.value,
+    )
+    mocker.patch.object(
+        scope_class.ratings_repository, "select_frame", return_value=ratings_df
+    )
+    mocked_load_ratings_data = mocker.patch.object(
+        data_loader_usecase, "load_ratings_data"
+    )
+
+    got_ratings = data_loader_usecase.make_ratings_data()
+    assert_frame_equal(got_ratings, ratings_df)
+    RawDataRatingsSchema.validate(got_ratings)
+    mocked_load_ratings_data.assert_not_called()
+
+
+@pytest.mark.usefixtures("scope_class")
+@pytest.mark.parametrize(
+    ("user_id_range", "ratings_partitions", "want_user_id_ranges", "want_user_ids"),
+    [
+        ((1, 10), 3, [(1, 5), (5, 9), (9, 11)], list(range(1, 11))),
+        ((1, 2), 4, [(1, 2), (2, 3)], [1, 2]),
+        (None, 4, [None], list(range(1, 11))),
+    ],
+)
+def test_make_data_concurrently(
+    mocker,
+    scope_class,
+    user_id_range,
+    ratings_partitions,
+    want_user_id_ranges,
+    want_user_ids,
+):
+    def select_frame(query_filter=None):
+        low, high = query_filter.user_id_range if query_filter is not None else (1, 11)
+        return pd.DataFrame(
+            {
+                "user_id": list(range(low, high)),
+                "movie_id": [1] * (high - low),
+                "rating": [1.0] * (high - low),
+                "timestamp": [1] * (high - low),
+            }
+        )
+
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=scope_class.movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+        loader=DATA_LOADER.COLUMNAR.value,
+        workers=4,
+        ratings_partitions=ratings_partitions,
+        movies_tags_loader=MOVIES_TAGS_LOADER.SQL.value,
+    )
+    mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_user_id_range",
+        return_value=user_id_range,
+    )
+    mocked_select_frame = mocker.patch.object(
+        scope_class.ratings_repository, "select_frame", side_effect=select_frame
+    )
+
+    assert data_loader_usecase.split_user_id_range() == want_user_id_ranges
+    got_ratings, _ = data_loader_usecase.make_data_concurrently()
+    assert mocked_select_frame.call_count == len(want_user_id_ranges)
+    assert got_ratings.user_id.tolist() == want_user_ids
+    RawDataRatingsSchema.validate(got_ratings)
+
+
+@pytest.mark.usefixtures("scope_class")
+@pytest.mark.parametrize(
+    ("movies_tags_loader"),
+    [
+        (MOVIES_TAGS_LOADER.PANDAS.value),
+        (MOVIES_TAGS_LOADER.SQL.value),
+    ],
+)
+def test_make_movies_tags_data(
+    mocker,
+    scope_class,
+    movies_tags_loader,
+):
+    movies_df = pd.DataFrame(
+        {
+            "movie_id": [1, 2],
+            "title": ["a", "b"],
+            "genre": ["Action|Comedy", "Drama"],
+        }
+    )
+    tags_df = pd.DataFrame(
+        {
+            "user_id": [1, 2],
+            "movie_id": [1, 1],
+            "tag": ["Funny", "FIGHT"],
+            "timestamp": [1, 2],
+        }
+    )
+    movies_tags_df = pd.DataFrame(
+        {
+            "movie_id": [1, 2],
+            "title": ["a", "b"],
+            "genre": [["Action", "Comedy"], ["Drama"]],
+            "tag": [["funny", "fight"], np.nan],
+        }
+    )
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=scope_class.movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+        loader=DATA_LOADER.COLUMNAR.value,
+        movies_tags_loader=movies_tags_loader,
+    )
+    mocker.patch.object(
+        scope_class.movies_repository, "select_frame", return_value=movies_df
+    )
+    mocker.patch.object(
+        scope_class.tags_repository, "select_frame", return_value=tags_df
+    )
+    mocked_select_movies_tags_frame = mocker.patch.object(
+        scope_class.movies_repository,
+        "select_movies_tags_frame",
+        return_value=movies_tags_df,
+    )
+
+    got = data_loader_usecase.make_movies_tags_data()
+    assert_frame_equal(got, movies_tags_df)
+    RawDataMoviesTagsSchema.validate(got)
+    assert mocked_select_movies_tags_frame.call_count == (
+        1 if movies_tags_loader == MOVIES_TAGS_LOADER.SQL.value else 0
+    )
+
+
+@pytest.mark.usefixtures("scope_class")
+def test_load_dataset_from_snapshot(
+    mocker,
+    scope_class,
+    tmp_path,
+):
+    ratings_df = pd.DataFrame(
+        {
+            "user_id": [1, 2],
+            "movie_id": [1, 2],
+            "rating": [1.0, 2.0],
+            "timestamp": [1, 2],
+        }
+    )
+    movies_tags_df = pd.DataFrame(
+        {
+            "movie_id": [1, 2],
+            "title": ["a", "b"],
+            "genre": [["Action", "Comedy"], ["Drama"]],
+            "tag": [["funny", "fight"], np.nan],
+        }
+    )
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=scope_class.movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+        loader=DATA_LOADER.COLUMNAR.value,
+        movies_tags_loader=MOVIES_TAGS_LOADER.SQL.value,
+        snapshot_repository=ParquetRawDatasetSnapshotRepository(
+            snapshot_dir=str(tmp_path),
+        ),
+    )
+    row_hashes_df = ratings_df[["user_id", "movie_id"]].assign(**{ROW_HASH: [7, -3]})
+    # ratings and their row hashes are selected for each load from database
+    mocked_select_frame = mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_frame",
+        side_effect=lambda query_filter=None, row_hash=False: (
+            row_hashes_df if row_hash else ratings_df
+        ),
+    )
+    mocker.patch.object(
+        scope_class.movies_repository,
+        "select_movies_tags_frame",
+        return_value=movies_tags_df,
+    )
+
+    for _ in range(2):
+        got = data_loader_usecase.load_dataset()
+        assert_frame_equal(got.ratings_data, ratings_df)
+        assert_frame_equal(got.movies_tags_data, movies_tags_df)
+    assert mocked_select_frame.call_count == 2
+    assert data_loader_usecase.snapshot_repository.load_ratings_checksum() == 4
+
+    mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_fingerprint",
+        return_value=TableFingerprint(
+            table_name="ratings",
+            rows=3,
+            max_created_at=None,
+            checksum=1,
+        ),
+    )
+    data_loader_usecase.load_dataset()
+    assert mocked_select_frame.call_count == 4
+
+
+@pytest.mark.usefixtures("scope_class")
+@pytest.mark.parametrize(
+    ("table_ratings", "want_select_frame_calls"),
+    [
+        (
+            [(1, 1, 1.0), (1, 2, 5.0), (2, 1, 2.0), (3, 1, 3.0), (5, 1, 4.0)],
+            3,
+        ),
+        # user 1 has deleted a rating
+        (
+            [(1, 2, 5.0), (2, 1, 2.0), (3, 1, 3.0), (5, 1, 4.0)],
+            5,
+        ),
+        # user 3 has updated a rating without changing its created_at
+        (
+            [(1, 1, 1.0), (1, 2, 5.0), (2, 1, 2.0), (3, 1, 4.0), (5, 1, 4.0)],
+            5,
+        ),
+    ],
+)
+def test_refresh_snapshot(
+    mocker,
+    scope_class,
+    tmp_path,
+    table_ratings,
+    want_select_frame_calls,
+):
+    def hash_row(rating):
+        return rating[0] * 100 + rating[1] * 10 + int(rating[2] * 2)
+
+    def ratings_frame(ratings):
+        return pd.DataFrame(
+            {
+                "user_id": [r[0] for r in ratings],
+                "movie_id": [r[1] for r in ratings],
+                "rating": [r[2] for r in ratings],
+                "timestamp": [1] * len(ratings),
+            }
+        )
+
+    def ratings_fingerprint(ratings, day):
+        return TableFingerprint(
+            table_name="ratings",
+            rows=len(ratings),
+            max_created_at=datetime(2024, 1, day, tzinfo=timezone.utc),
+            checksum=sum(hash_row(r) for r in ratings),
+        )
+
+    snapshot_repository = ParquetRawDatasetSnapshotRepository(
+        snapshot_dir=str(tmp_path),
+        partition_users=2,
+    )
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=scope_class.movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+        loader=DATA_LOADER.COLUMNAR.value,
+        movies_tags_loader=MOVIES_TAGS_LOADER.SQL.value,
+        snapshot_repository=snapshot_repository,
+    )
+    mocker.patch.object(
+        scope_class.movies_repository,
+        "select_movies_tags_frame",
+        return_value=pd.DataFrame(
+            {
+                "movie_id": [1, 2],
+                "title": ["a", "b"],
+                "genre": [["Action"], ["Drama"]],
+                "tag": [["fight"], np.nan],
+            }
+        ),
+    )
+    snapshot_ratings = [(1, 1, 1.0), (2, 1, 1.0), (3, 1, 3.0)]
+    # user 2 is updated, user 1 and 5 get new ratings
+    delta = [(1, 2, 5.0), (2, 1, 2.0), (5, 1, 4.0)]
+    table = {"ratings": snapshot_ratings}
+
+    def select_frame(query_filter=None, row_hash=False):
+        query_filter = query_filter if query_filter is not None else QueryFilter()
+        ratings = delta if query_filter.created_since is not None else table["ratings"]
+        df = ratings_frame(ratings)
+        if query_filter.columns is not None:
+            df = df[query_filter.columns]
+        if row_hash:
+            df[ROW_HASH] = [hash_row(r) for r in ratings]
+        return df
+
+    mocked_select_frame = mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_frame",
+        side_effect=select_frame,
+    )
+    mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_fingerprint",
+        return_value=ratings_fingerprint(ratings=snapshot_ratings, day=1),
+    )
+    data_loader_usecase.load_dataset()
+
+    table["ratings"] = table_ratings
+    mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_fingerprint",
+        return_value=ratings_fingerprint(ratings=table_ratings, day=2),
+    )
+    got = data_loader_usecase.load_dataset()
+
+    mocked_select_frame.assert_any_call(
+        query_filter=QueryFilter(
+            created_since=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        ),
+        row_hash=True,
+    )
+    assert mocked_select_frame.call_count == want_select_frame_calls
+    assert_frame_equal(got.ratings_data, ratings_frame(table_ratings))
+    assert snapshot_repository.load_ratings_checksum() == sum(
+        hash_row(r) for r in table_ratings
+    )
+    assert snapshot_repository.load_fingerprints() == [
+        scope_class.movies_repository.select_fingerprint(),
+        ratings_fingerprint(ratings=table_ratings, day=2),
+        scope_class.tags_repository.select_fingerprint(),
+    ]
+
+
+@pytest.mark.usefixtures("scope_class")
+@pytest.mark.parametrize(
+    ("ratings_filter", "user_id_range", "want"),
+    [
+        (None, None, None),
+        (None, (1, 5), QueryFilter(user_id_range=(1, 5))),
+        (
+            QueryFilter(sample_percent=10),
+            (1, 5),
+            QueryFilter(sample_percent=10, user_id_range=(1, 5)),
+        ),
+        (
+            QueryFilter(user_id_range=(3, 10)),
+            (1, 5),
+            QueryFilter(user_id_range=(3, 5)),
+        ),
+        (
+            QueryFilter(user_id_range=(7, 10)),
+            (1, 5),
+            QueryFilter(user_id_range=(7, 7)),
+        ),
+    ],
+)
+def test_make_ratings_filter(
+    scope_class,
+    ratings_filter,
+    user_id_range,
+    want,
+):
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=scope_class.movies_repository,
+        ratings_repository=scope_class.ratings_repository,
+        tags_repository=scope_class.tags_repository,
+        ratings_filter=ratings_filter,
+    )
+
+    got = data_loader_usecase.make_ratings_filter(user_id_range=user_id_range)
+    assert got == want
+
+
+def test_load_dataset_from_sqlite(
+    tmp_path,
+):
+    db_client = SQLiteClient(database_path=str(tmp_path / "movielens.sqlite3"))
+    for table, columns in [
+        ("movies", "movie_id INTEGER, title TEXT, genre TEXT"),
+        (
+            "ratings",
+            "user_id INTEGER, movie_id INTEGER, rating REAL, timestamp INTEGER",
+        ),
+        ("tags", "user_id INTEGER, movie_id INTEGER, tag TEXT, timestamp INTEGER"),
+    ]:
+        db_client.execute_create_query(query=f"CREATE TABLE {table} ({columns});")
+    for query, parameters in [
+        (
+            "INSERT INTO movies (movie_id, title, genre) VALUES %s",
+            [(1, "a", "Action|Comedy"), (2, "b", "Drama")],
+        ),
+        (
+            "INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES %s",
+            [(2, 1, 4.5, 2), (1, 2, 1.0, 1), (3, 1, 3.0, 3)],
+        ),
+        (
+            "INSERT INTO tags (user_id, movie_id, tag, timestamp) VALUES %s",
+            [(2, 1, "FIGHT", 2), (1, 1, "Funny", 1)],
+        ),
+    ]:
+        db_client.execute_bulk_insert_or_update_query(
+            query=query,
+            parameters=parameters,
+        )
+    data_loader_usecase = DataLoaderUsecase(
+        movies_repository=MoviesRepository(db_client=db_client),
+        ratings_repository=RatingsRepository(db_client=db_client),
+        tags_repository=TagsRepository(db_client=db_client),
+        loader=DATA_LOADER.COLUMNAR.value,
+        workers=2,
+        ratings_partitions=2,
+        movies_tags_loader=MOVIES_TAGS_LOADER.PANDAS.value,
+    )
+
+    got = data_loader_usecase.load_dataset()
+    assert got.ratings_data.user_id.tolist() == [1, 2, 3]
+    assert got.ratings_data.rating.tolist() == [1.0, 4.5, 3.0]
+    assert got.movies_tags_data.genre.tolist() == [["Action", "Comedy"], ["Drama"]]
+    assert got.movies_tags_data.tag.tolist()[0] == ["funny", "fight"]
+    with pytest.raises(DatabaseException):
+        MoviesRepository(db_client=db_client).select_movies_tags_frame()
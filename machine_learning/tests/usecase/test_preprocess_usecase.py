@@ -1,9 +1,17 @@
+import numpy as np
 import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
 
-from src.domain.algorithm.preprocess import GenreExtractor, RatingsExtractor
-from src.domain.model.common_data import XY
+from src.domain.algorithm.preprocess import (
+    GenreExtractor,
+    RatingsExtractor,
+    SQLRatingsExtractor,
+)
+from src.domain.model.common_data import DTYPES, XY
+from src.domain.model.id_dictionary import IdDictionary
+from src.domain.model.ratings_matrix import RatingsMatrix
+from src.domain.model.raw_data import RawDataset
 from src.usecase.preprocess_usecase import PreprocessUsecase
 
 
@@ -235,3 +243,165 @@ def test_split_data_target(
     assert_frame_equal(got.keys, want.keys)
     assert_frame_equal(got.x, want.x)
     assert_frame_equal(got.y, want.y)
+
+
+@pytest.mark.usefixtures("scope_class")
+@pytest.mark.parametrize(
+    ("validation_records",),
+    [(1,), (2,)],
+)
+def test_sql_ratings_extractor(
+    mocker,
+    scope_class,
+    validation_records,
+):
+    ratings = pd.DataFrame(
+        [
+            dict(user_id=1, movie_id=1, rating=1.0, timestamp=3),
+            dict(user_id=1, movie_id=2, rating=2.0, timestamp=2),
+            dict(user_id=1, movie_id=3, rating=3.0, timestamp=2),
+            dict(user_id=2, movie_id=1, rating=4.0, timestamp=1),
+            dict(user_id=2, movie_id=3, rating=5.0, timestamp=5),
+            dict(user_id=2, movie_id=4, rating=0.5, timestamp=4),
+            dict(user_id=3, movie_id=2, rating=3.5, timestamp=1),
+        ]
+    )
+    ratings_matrix = RatingsMatrix.from_raw_dataset(
+        dataset=RawDataset(
+            ratings_data=ratings,
+            movies_tags_data=pd.DataFrame(
+                [
+                    dict(movie_id=m, title="a", genre=["Drama"], tag=np.nan)
+                    for m in [1, 2, 3, 4, 5]
+                ]
+            ),
+        ),
+        id_dictionary=IdDictionary(
+            user_ids=np.array([1, 2, 3]),
+            movie_ids=np.array([1, 2, 3, 4, 5]),
+        ),
+    )
+    preprocess_usecase = PreprocessUsecase(
+        ratings_extractor=RatingsExtractor(),
+        genre_extractor=GenreExtractor(),
+    )
+    train_matrix, test_matrix = preprocess_usecase.split_records(
+        ratings_matrix, validation_records
+    )
+    ratings_train = preprocess_usecase.to_frame(ratings_matrix=train_matrix)
+    ratings_test = preprocess_usecase.to_frame(ratings_matrix=test_matrix)
+
+    timestamp_rank = pd.concat([ratings_train, ratings_test]).set_index(
+        ["user_id", "movie_id"]
+    )["timestamp_rank"]
+    want_timestamp_rank = (
+        ratings.set_index(["user_id", "movie_id"])
+        .groupby("user_id")["timestamp"]
+        .rank(ascending=False, method="first")
+    )
+    assert (timestamp_rank.loc[want_timestamp_rank.index] == want_timestamp_rank).all()
+    assert (ratings_test["timestamp_rank"] <= validation_records).all()
+
+    def select_rating_statistics(group_by, validation_records):
+        # what the database returns for the same training cutoff
+        statistics = (
+            ratings_train.groupby(group_by)
+            .rating.agg(["min", "max", "mean"])
+            .reset_index()
+        )
+        # the table may have ids missing from the dataset
+        missing = pd.DataFrame([{group_by: 9, "min": 1.0, "max": 1.0, "mean": 1.0}])
+        return pd.concat([statistics, missing], ignore_index=True)
+
+    mocked_select_rating_statistics = mocker.patch.object(
+        scope_class.ratings_repository,
+        "select_rating_statistics",
+        side_effect=select_rating_statistics,
+    )
+    sql_ratings_extractor = SQLRatingsExtractor(
+        ratings_repository=scope_class.ratings_repository,
+        validation_records=validation_records,
+    )
+
+    for df in [ratings_train, ratings_test]:
+        want = RatingsExtractor().run(ratings_train, df, train_matrix)
+        got = sql_ratings_extractor.run(ratings_train, df, train_matrix)
+        assert_frame_equal(got, want)
+    assert mocked_select_rating_statistics.call_count == 2
+
+
+@pytest.mark.usefixtures("scope_function")
+def test_preprocess_dataset_compact(
+    mocker,
+    scope_function,
+):
+    genres = [
+        "(no genres listed)",
+        "Action",
+        "Adventure",
+        "Animation",
+        "Children",
+        "Comedy",
+        "Crime",
+        "Documentary",
+        "Drama",
+        "Fantasy",
+        "Film-Noir",
+        "Horror",
+        "IMAX",
+        "Musical",
+        "Mystery",
+        "Romance",
+        "Sci-Fi",
+        "Thriller",
+        "War",
+        "Western",
+    ]
+
+    def make_raw_dataset():
+        return RawDataset(
+            ratings_data=pd.DataFrame(
+                [
+                    dict(user_id=1, movie_id=1, rating=1.0, timestamp=3),
+                    dict(user_id=1, movie_id=2, rating=2.5, timestamp=2),
+                    dict(user_id=1, movie_id=3, rating=3.0, timestamp=1),
+                    dict(user_id=2, movie_id=1, rating=4.0, timestamp=1),
+                    dict(user_id=2, movie_id=3, rating=5.0, timestamp=5),
+                    dict(user_id=2, movie_id=4, rating=0.5, timestamp=4),
+                ]
+            ),
+            movies_tags_data=pd.DataFrame(
+                [
+                    dict(movie_id=1, title="a", genre=["Action"], tag=np.nan),
+                    dict(movie_id=2, title="b", genre=["Action", "Drama"], tag=["x"]),
+                    dict(movie_id=3, title="c", genre=["Drama"], tag=np.nan),
+                    dict(movie_id=4, title="d", genre=genres[10:], tag=np.nan),
+                    dict(movie_id=5, title="e", genre=genres[:10], tag=np.nan),
+                ]
+            ),
+        )
+
+    want = PreprocessUsecase(
+        ratings_extractor=RatingsExtractor(),
+        genre_extractor=GenreExtractor(),
+    ).preprocess_dataset(dataset=make_raw_dataset(), validation_records=1)
+    got = PreprocessUsecase(
+        ratings_extractor=RatingsExtractor(dtypes=DTYPES.COMPACT.value),
+        genre_extractor=GenreExtractor(),
+        dtypes=DTYPES.COMPACT.value,
+    ).preprocess_dataset(dataset=make_raw_dataset(), validation_records=1)
+
+    for want_xy, got_xy in [
+        (want.training_data, got.training_data),
+        (want.validation_data, got.validation_data),
+    ]:
+        assert got_xy.dtypes == DTYPES.COMPACT.value
+        assert (got_xy.keys.dtypes == np.int32).all()
+        assert (got_xy.y.dtypes == np.float32).all()
+        assert got_xy.x.dtypes.value_counts().to_dict() == {
+            np.dtype(bool): 20,
+            np.dtype(np.float32): 6,
+        }
+        assert_frame_equal(got_xy.keys, want_xy.keys, check_dtype=False)
+        assert_frame_equal(got_xy.x, want_xy.x, check_dtype=False)
+        assert_frame_equal(got_xy.y, want_xy.y, check_dtype=False)